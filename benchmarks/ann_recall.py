@@ -0,0 +1,133 @@
+"""Recall@k-vs-flat report for the approximate vector index types.
+
+Builds every RAG_VECTOR_INDEX type (and the compressed RAG_VECTOR_STORAGE
+variants of flat and hnsw) over the same vectors, then reports recall against
+exact fp32 flat search, per-query latency and index size for a sweep of search
+parameters. ``size MB`` is the serialized index; ``codes MB`` is what a query
+keeps resident: without the fp32 copy that compressed storage re-scores
+shortlists from, which stays memory-mapped on disk.
+
+Usage:
+    python benchmarks/ann_recall.py --synthetic 100000
+    python benchmarks/ann_recall.py --index-dir ./data/index   # vectors of a flat index
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import faiss
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import Settings  # noqa: E402
+from rag_server.search.vector_store import VectorStore  # noqa: E402
+
+
+def load_vectors(args: argparse.Namespace) -> np.ndarray:
+    """Load vectors from a saved flat index or generate clustered synthetic ones."""
+    if args.index_dir:
+        index = faiss.read_index(str(Path(args.index_dir) / "faiss.index"))
+        inner = faiss.downcast_index(index.index)
+        if not isinstance(inner, faiss.IndexFlat):
+            sys.exit("--index-dir must point at an index built with RAG_VECTOR_INDEX=flat")
+        return inner.reconstruct_n(0, inner.ntotal)
+
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(256, args.dim)).astype("float32")
+    assignment = rng.integers(0, len(centers), size=args.synthetic)
+    noise = rng.normal(scale=0.4, size=(args.synthetic, args.dim)).astype("float32")
+    return centers[assignment] + noise
+
+
+def evaluate(store: VectorStore, queries: np.ndarray, truth: np.ndarray, k: int, **params):
+    """Return (recall@k, mean latency in ms) for single-query searches."""
+    hits = 0
+    start = time.perf_counter()
+    for i, query in enumerate(queries):
+        _, ids = store.index.search(query[None, :], k, params=store._search_params(**params))
+        hits += len(np.intersect1d(ids[0], truth[i]))
+    latency_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    return hits / truth.size, latency_ms
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--index-dir", help="Directory with a flat faiss.index")
+    parser.add_argument("--synthetic", type=int, default=50_000, help="Synthetic vectors")
+    parser.add_argument("--dim", type=int, default=384, help="Synthetic vector dimension")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=10)
+    parser.add_argument("--metric", choices=["l2", "cosine"], default="l2")
+    parser.add_argument("--refine-k-factor", type=int, default=4, help="RAG_REFINE_K_FACTOR")
+    args = parser.parse_args()
+
+    vectors = load_vectors(args)
+    rng = np.random.default_rng(1)
+    picks = rng.choice(len(vectors), size=args.queries, replace=False)
+    queries = vectors[picks] + rng.normal(scale=0.05, size=(args.queries, vectors.shape[1]))
+    queries = queries.astype("float32")
+    if args.metric == "cosine":
+        faiss.normalize_L2(vectors)
+        faiss.normalize_L2(queries)
+    ids = np.arange(len(vectors), dtype="int64")
+
+    print(
+        f"{len(vectors)} vectors, dim {vectors.shape[1]}, {args.queries} queries, "
+        f"k={args.k}, {args.metric}"
+    )
+    print(
+        f"{'index':<12} {'param':<14} {'recall@k':>9} {'ms/query':>9} {'size MB':>8} "
+        f"{'codes MB':>9} {'build s':>8}"
+    )
+
+    ef_sweep = [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)]
+    truth = None
+    for kind, storage, sweep in (
+        ("flat", "fp32", [{}]),
+        ("flat", "fp16", [{}]),
+        ("flat", "sq8", [{}]),
+        ("flat", "pq", [{}]),
+        ("hnsw", "fp32", ef_sweep),
+        ("hnsw", "sq8", ef_sweep),
+        ("hnsw", "pq", ef_sweep),
+        ("ivf_pq", "fp32", [{"nprobe": n} for n in (1, 4, 16, 64)]),
+    ):
+        store = VectorStore(
+            Settings(
+                RAG_VECTOR_INDEX=kind,
+                RAG_VECTOR_STORAGE=storage,
+                RAG_VECTOR_METRIC=args.metric,
+                RAG_REFINE_K_FACTOR=args.refine_k_factor,
+            )
+        )
+        start = time.perf_counter()
+        store.index = store.create_index(vectors)
+        store.index.add_with_ids(vectors, ids)
+        build_s = time.perf_counter() - start
+        size_mb = faiss.serialize_index(store.index).nbytes / 1e6
+        base, _ = store._inner_index()
+        codes_mb = faiss.serialize_index(base).nbytes / 1e6
+
+        if truth is None:
+            _, truth = store.index.search(queries, args.k)
+
+        for params in sweep:
+            recall, latency = evaluate(
+                store, queries, truth, args.k, nprobe=params.get("nprobe"),
+                ef_search=params.get("ef_search"),
+            )
+            label = ",".join(f"{key}={value}" for key, value in params.items()) or "-"
+            name = kind if storage == "fp32" else f"{kind}/{storage}"
+            print(
+                f"{name:<12} {label:<14} {recall:>9.3f} {latency:>9.3f} "
+                f"{size_mb:>8.1f} {codes_mb:>9.1f} {build_s:>8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+"""Retrieval throughput (queries/sec) by batch size.
+
+Builds a hybrid index over a synthetic code corpus, then times
+``HybridRetriever.retrieve_many`` for increasing batch sizes. Batch size 1
+is the per-request ``/query`` path. Query and result caches are disabled so
+every query is embedded and searched.
+
+Usage:
+    python benchmarks/batch_query.py --chunks 50000
+    python benchmarks/batch_query.py --hashing-encoder   # no model download
+    python benchmarks/batch_query.py --shards 4 --index hnsw   # parallel shard fan-out
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import Settings  # noqa: E402
+from rag_server.search.retriever import HybridRetriever  # noqa: E402
+
+# Size of the identifier-like vocabulary (Zipfian word frequencies)
+VOCABULARY_SIZE = 20_000
+
+
+class HashingEncoder:
+    """Bag-of-words random projection, a model-free stand-in for benchmarking."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+        self.word_vectors: Dict[str, np.ndarray] = {}
+
+    def _word(self, word: str) -> np.ndarray:
+        vector = self.word_vectors.get(word)
+        if vector is None:
+            rng = np.random.default_rng(zlib.crc32(word.encode()))
+            vector = self.word_vectors[word] = rng.standard_normal(self.dim, dtype="float32")
+        return vector
+
+    def encode(self, texts, **kwargs):
+        vectors = np.zeros((len(texts), self.dim), dtype="float32")
+        for row, text in enumerate(texts):
+            for word in text.split():
+                vectors[row] += self._word(word)
+        return vectors
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chunks", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=512)
+    parser.add_argument("--batch-sizes", default="1,8,32,128,512")
+    parser.add_argument("--shards", type=int, default=1, help="RAG_INDEX_SHARDS")
+    parser.add_argument("--index", default="flat", help="RAG_VECTOR_INDEX")
+    parser.add_argument("--hashing-encoder", action="store_true", help="Skip the real model")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    weights = 1.0 / np.arange(1, VOCABULARY_SIZE + 1)
+    cumulative = np.cumsum(weights / weights.sum())
+
+    def sentences(count: int, length: int) -> List[str]:
+        words = np.searchsorted(cumulative, rng.random((count, length)))
+        return [" ".join(f"name{w}" for w in row) for row in words]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        settings = Settings(
+            RAG_DATA_DIR=Path(tmp),
+            RAG_INDEX_DIR=Path(tmp),
+            RAG_QUERY_CACHE_SIZE=0,
+            RAG_RESULT_CACHE_SIZE=0,
+            RAG_INDEX_SHARDS=args.shards,
+            RAG_VECTOR_INDEX=args.index,
+        )
+        retriever = HybridRetriever(settings)
+        if args.hashing_encoder:
+            retriever.vector_store.model = HashingEncoder()
+
+        chunks = [
+            {
+                "content": f"def f{i}():  # {text}",
+                "start_line": 1,
+                "end_line": 1,
+                "metadata": {"path": f"pkg/module{i}.py", "language": "python", "sha256": ""},
+            }
+            for i, text in enumerate(sentences(args.chunks, 40))
+        ]
+        start = time.perf_counter()
+        retriever.build_indices(chunks)
+        print(
+            f"indexed {args.chunks} chunks in {args.shards} shard(s) "
+            f"in {time.perf_counter() - start:.1f}s"
+        )
+
+        queries = sentences(args.queries, 6)
+        retriever.retrieve_many(queries[:8])  # warm up
+        print(f"{'batch':>6} {'queries/s':>10} {'ms/query':>9}")
+        for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+            start = time.perf_counter()
+            for offset in range(0, len(queries), batch_size):
+                retriever.retrieve_many(queries[offset : offset + batch_size])
+            elapsed = time.perf_counter() - start
+            print(
+                f"{batch_size:>6} {len(queries) / elapsed:>10.1f} "
+                f"{elapsed * 1000 / len(queries):>9.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Load test of query embedding micro-batching: throughput vs latency.
+
+Concurrent clients embed distinct queries through ``VectorStore.encode_query``
+(query cache disabled), once per ``RAG_EMBED_BATCH_WINDOW_MS`` setting. A
+window of 0 is the unbatched baseline where every request runs its own
+``encode`` call.
+
+Usage:
+    python benchmarks/embed_batching.py --clients 16
+    python benchmarks/embed_batching.py --synthetic-model   # no model download
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import Settings  # noqa: E402
+from rag_server.search.encode_batcher import EncodeBatcher  # noqa: E402
+from rag_server.search.vector_store import VectorStore  # noqa: E402
+
+
+class SyntheticEncoder:
+    """Transformer-shaped matmul stack (tokens x hidden) as a model stand-in."""
+
+    def __init__(self, dim: int = 384, layers: int = 6, tokens: int = 32):
+        rng = np.random.default_rng(0)
+        self.tokens = tokens
+        self.weights = [
+            (
+                rng.standard_normal((dim, 4 * dim), dtype="float32") / dim,
+                rng.standard_normal((4 * dim, dim), dtype="float32") / dim,
+            )
+            for _ in range(layers)
+        ]
+
+    def encode(self, texts, **kwargs):
+        hidden = np.ones((len(texts) * self.tokens, self.weights[0][0].shape[0]), "float32")
+        for up, down in self.weights:
+            hidden = hidden + np.maximum(hidden @ up, 0) @ down
+        return hidden.reshape(len(texts), self.tokens, -1).mean(axis=1)
+
+
+def run(store: VectorStore, clients: int, duration: float) -> List[float]:
+    """Run closed-loop clients for ``duration`` seconds; return latencies."""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + duration
+
+    def client(number: int) -> None:
+        i = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            store.encode_query(f"client {number} query {i}")
+            with lock:
+                latencies.append(time.perf_counter() - start)
+            i += 1
+
+    threads = [threading.Thread(target=client, args=(n,)) for n in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="Seconds per setting")
+    parser.add_argument("--windows", default="0,2,5", help="RAG_EMBED_BATCH_WINDOW_MS values")
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--synthetic-model", action="store_true", help="Skip the real model")
+    args = parser.parse_args()
+
+    model = SyntheticEncoder() if args.synthetic_model else None
+    print(f"{args.clients} concurrent clients, {args.duration:.0f}s per setting")
+    print(f"{'window ms':>9} {'req/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'mean batch':>10}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for window in (float(w) for w in args.windows.split(",")):
+            settings = Settings(
+                RAG_INDEX_DIR=Path(tmp),
+                RAG_QUERY_CACHE_SIZE=0,
+                RAG_EMBED_BATCH_WINDOW_MS=window,
+                RAG_EMBED_MAX_BATCH=args.max_batch,
+            )
+            batcher = EncodeBatcher(settings)
+            store = VectorStore(settings, encode_batcher=batcher)
+            store.model = model
+            store.encode_query("warm up")
+            model = store.model
+
+            latencies = np.array(run(store, args.clients, args.duration)) * 1000
+            mean_batch = batcher.stats()["mean_batch"] if window else 1.0
+            print(
+                f"{window:>9.1f} {len(latencies) / args.duration:>8.1f} "
+                f"{np.percentile(latencies, 50):>7.2f} {np.percentile(latencies, 99):>7.2f} "
+                f"{mean_batch:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
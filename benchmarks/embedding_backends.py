@@ -0,0 +1,97 @@
+"""Embedding backend comparison: parity, indexing throughput, query latency.
+
+Loads the embedding model once per RAG_EMBEDDING_BACKEND and reports, for
+each: cosine similarity to the PyTorch embeddings of the same texts,
+chunks/sec when encoding chunks in batches (the index build path) and
+single-query latency (the ``/query`` path). ONNX exports are written to
+``--data-dir/models`` on first use and reused afterwards.
+
+Usage:
+    python benchmarks/embedding_backends.py --root ./src
+    python benchmarks/embedding_backends.py --backends torch,onnx_int8 --chunks 2000
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import Settings  # noqa: E402
+from rag_server.search.embedding_backends import (  # noqa: E402
+    embedding_parity,
+    load_embedding_model,
+)
+
+
+def sample_texts(root: Path, count: int, size: int) -> List[str]:
+    """Cut source files under ``root`` into chunk-sized texts."""
+    texts: List[str] = []
+    for path in sorted(root.rglob("*.py")):
+        content = path.read_text(errors="ignore")
+        texts.extend(content[i : i + size] for i in range(0, len(content), size))
+        if len(texts) >= count:
+            break
+    if not texts:
+        sys.exit(f"no .py files under {root}")
+    return (texts * (count // len(texts) + 1))[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--backends", default="torch,onnx,onnx_int8")
+    parser.add_argument("--root", default=os.path.join(os.path.dirname(__file__), "..", "src"))
+    parser.add_argument("--data-dir", default="./data", help="Where ONNX exports are kept")
+    parser.add_argument("--chunks", type=int, default=1000)
+    parser.add_argument("--chunk-size", type=int, default=800, help="Characters per chunk")
+    parser.add_argument("--queries", type=int, default=100)
+    args = parser.parse_args()
+
+    chunks = sample_texts(Path(args.root), args.chunks, args.chunk_size)
+    queries = [text.split("\n", 1)[0][:80] or "query" for text in chunks[: args.queries]]
+    reference = None
+
+    print(f"{len(chunks)} chunks of {args.chunk_size} chars, {len(queries)} single queries")
+    print(
+        f"{'backend':<12} {'min cos':>8} {'mean cos':>9} {'chunks/s':>9} "
+        f"{'query p50 ms':>13} {'query p95 ms':>13}"
+    )
+    for backend in args.backends.split(","):
+        settings = Settings(RAG_DATA_DIR=Path(args.data_dir), RAG_EMBEDDING_BACKEND=backend)
+        try:
+            model = load_embedding_model(settings)
+        except ImportError as e:
+            print(f"{backend:<12} skipped: {e}")
+            continue
+        if reference is None:
+            reference = model if backend == "torch" else load_embedding_model(
+                Settings(RAG_DATA_DIR=Path(args.data_dir), RAG_EMBEDDING_BACKEND="torch")
+            )
+        parity = embedding_parity(reference, model, chunks[:200])
+
+        model.encode(chunks[:32], batch_size=32)  # warm up
+        start = time.perf_counter()
+        model.encode(chunks, batch_size=32, convert_to_numpy=True)
+        chunks_per_s = len(chunks) / (time.perf_counter() - start)
+
+        latencies = []
+        for query in queries:
+            start = time.perf_counter()
+            model.encode([query], convert_to_numpy=True)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+        print(
+            f"{backend:<12} {parity['min_cosine']:>8.4f} {parity['mean_cosine']:>9.4f} "
+            f"{chunks_per_s:>9.1f} {np.percentile(latencies, 50):>13.2f} "
+            f"{np.percentile(latencies, 95):>13.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
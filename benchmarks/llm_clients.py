@@ -0,0 +1,171 @@
+"""LLM client benchmark: per-request clients vs the shared, pooled client.
+
+Runs a local mock of the OpenAI chat completions API (answering after
+``--latency-ms``) and sends ``--requests`` generations, ``--concurrency`` at
+a time, two ways:
+
+* ``per-request``: a new ``ChatOpenAI`` per call, invoked synchronously on a
+  thread pool (how ``/answer`` used to call OpenAI)
+* ``pooled``: one app-lifetime ``OpenAIClient`` awaiting ``ainvoke`` over a
+  keep-alive connection pool, at most ``RAG_OPENAI_CONCURRENCY`` in flight
+
+and reports throughput, latency percentiles and TCP connections opened.
+
+Usage:
+    python benchmarks/llm_clients.py --requests 500 --concurrency 32
+    python benchmarks/llm_clients.py --latency-ms 200 --pool 8
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Awaitable, Callable, List
+
+import numpy as np
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import Settings  # noqa: E402
+from rag_server.llm.openai_client import OpenAIClient  # noqa: E402
+
+PROMPT = "Explain how the retriever fuses vector and keyword results."
+
+
+class CompletionHandler(BaseHTTPRequestHandler):
+    """Answers every chat completion with a fixed message after a delay."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        time.sleep(self.server.latency_s)  # type: ignore[attr-defined]
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-bench",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "Reciprocal rank fusion."},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 12, "completion_tokens": 4, "total_tokens": 16},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args: object) -> None:
+        pass
+
+
+class MockServer(ThreadingHTTPServer):
+    """Mock OpenAI server counting the TCP connections it accepts."""
+
+    daemon_threads = True
+    request_queue_size = 1024
+
+    def __init__(self, latency_s: float):
+        super().__init__(("127.0.0.1", 0), CompletionHandler)
+        self.latency_s = latency_s
+        self.connections = 0
+
+    def process_request(self, request: object, client_address: object) -> None:
+        self.connections += 1
+        super().process_request(request, client_address)  # type: ignore[arg-type]
+
+
+async def run(call: Callable[[], Awaitable[str]], requests: int, concurrency: int) -> List[float]:
+    """Send ``requests`` calls, ``concurrency`` at a time; return latencies in ms."""
+    latencies: List[float] = []
+    pending = iter(range(requests))
+
+    async def worker() -> None:
+        for _ in pending:
+            start = time.perf_counter()
+            await call()
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+def report(name: str, latencies: List[float], seconds: float, connections: int) -> None:
+    print(
+        f"{name:<12} {len(latencies) / seconds:>8.1f} {np.percentile(latencies, 50):>8.1f} "
+        f"{np.percentile(latencies, 99):>8.1f} {connections:>12}"
+    )
+
+
+async def main_async(args: argparse.Namespace) -> None:
+    from langchain_core.messages import HumanMessage
+    from langchain_openai import ChatOpenAI
+
+    server = MockServer(args.latency_ms / 1000)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings = Settings(
+        RAG_LLM_PROVIDER="openai",
+        OPENAI_API_KEY="sk-bench",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        RAG_OPENAI_CONCURRENCY=args.pool,
+    )
+
+    print(
+        f"{args.requests} requests, {args.concurrency} concurrent, "
+        f"{args.latency_ms:.0f} ms server latency, pool of {args.pool}"
+    )
+    print(f"{'client':<12} {'req/s':>8} {'p50 ms':>8} {'p99 ms':>8} {'connections':>12}")
+
+    def per_request_call() -> str:
+        client = ChatOpenAI(
+            model=settings.LLM_MODEL,
+            api_key=settings.OPENAI_API_KEY,
+            base_url=settings.OPENAI_BASE_URL,
+            temperature=0.1,
+        )
+        return str(client.invoke([HumanMessage(content=PROMPT)]).content)
+
+    loop = asyncio.get_running_loop()
+    server.connections = 0
+    start = time.perf_counter()
+    latencies = await run(
+        lambda: loop.run_in_executor(None, per_request_call), args.requests, args.concurrency
+    )
+    report("per-request", latencies, time.perf_counter() - start, server.connections)
+
+    pooled = OpenAIClient(settings)
+    pooled.initialize()
+    server.connections = 0
+    start = time.perf_counter()
+    latencies = await run(lambda: pooled.generate(PROMPT), args.requests, args.concurrency)
+    report("pooled", latencies, time.perf_counter() - start, server.connections)
+    await pooled.aclose()
+
+    server.shutdown()
+    server.server_close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent callers")
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="Mock server latency")
+    parser.add_argument("--pool", type=int, default=16, help="RAG_OPENAI_CONCURRENCY")
+    args = parser.parse_args()
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Cold-start report: import time, app creation and warmup.
+
+Each measurement runs in a fresh interpreter, as after a container start:
+importing ``rag_server.server`` and calling ``create_app`` (what must happen
+before ``/health/live`` answers), then ``IndexGenerations.warm_up`` (index
+load, embedding model load and first encode; what ``/health/ready`` waits
+for). Also lists the packages slowest to import, from ``python -X importtime``.
+
+Usage:
+    python benchmarks/startup.py --runs 5
+    python benchmarks/startup.py --index-dir ./data/index --no-warmup
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src")
+
+# Timed in the child interpreter; prints one JSON line
+PROBE = """
+import json, time
+start = time.perf_counter()
+import rag_server.server
+imported = time.perf_counter()
+rag_server.server.create_app()
+created = time.perf_counter()
+result = {"import_s": imported - start, "create_app_s": created - imported}
+if WARMUP:
+    from rag_server.core.config import get_settings
+    from rag_server.search.generations import IndexGenerations
+    generations = IndexGenerations(get_settings())
+    generations.warm_up()
+    result["warmup_s"] = time.perf_counter() - created
+    result["warmup"] = generations.warmup["status"]
+print(json.dumps(result))
+"""
+
+
+def probe(warmup: bool, env: Dict[str, str]) -> Dict[str, float]:
+    """Run one cold start in a subprocess and return its timings."""
+    output = subprocess.run(
+        [sys.executable, "-c", PROBE.replace("WARMUP", str(warmup))],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env: Dict[str, str], count: int) -> List[Tuple[float, str]]:
+    """Return (cumulative ms, package) for the packages slowest to import.
+
+    A package's time is that of its modules imported from other packages,
+    including whatever they import in turn.
+    """
+    stderr = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import rag_server.server"],
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stderr
+    totals: Dict[str, float] = {}
+    # Lines are in post-order; reversed, every module follows its importer
+    importers: List[str] = []
+    for line in reversed(stderr.splitlines()):
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \| ( *)(\S+)", line)
+        if not match:
+            continue
+        depth = len(match.group(2)) // 2
+        package = match.group(3).split(".")[0]
+        del importers[depth:]
+        if not importers or importers[-1] != package:
+            totals[package] = totals.get(package, 0.0) + int(match.group(1)) / 1000
+        importers.append(package)
+    totals.pop("rag_server", None)
+    return sorted(((ms, name) for name, ms in totals.items()), reverse=True)[:count]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--index-dir", help="RAG_INDEX_DIR to warm up (default: settings)")
+    parser.add_argument("--no-warmup", action="store_true", help="Skip the model and index load")
+    parser.add_argument("--top", type=int, default=10, help="Slowest packages to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=SRC, LOG_LEVEL="WARNING")
+    if args.index_dir:
+        env["RAG_INDEX_DIR"] = args.index_dir
+
+    runs = [probe(not args.no_warmup, env) for _ in range(args.runs)]
+    print(f"cold starts: {args.runs} (median seconds)")
+    for key in ("import_s", "create_app_s", "warmup_s"):
+        if key in runs[0]:
+            print(f"  {key:<14} {statistics.median(run[key] for run in runs):>7.3f}")
+    if "warmup" in runs[0]:
+        print(f"  warmup status  {runs[-1]['warmup']}")
+
+    print("slowest imported packages of rag_server.server (cumulative ms):")
+    for ms, name in slowest_imports(env, args.top):
+        print(f"  {name:<24} {ms:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Tokenizer throughput and vocabulary size over a source tree.
+
+Compares the code-aware tokenizer used by the keyword index with plain
+whitespace splitting (the previous behaviour).
+
+Usage:
+    python benchmarks/tokenizer_throughput.py /path/to/code
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+# Add src to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from rag_server.core.config import get_settings  # noqa: E402
+from rag_server.ingest.readers import FileReader  # noqa: E402
+from rag_server.search.tokenizer import CodeTokenizer  # noqa: E402
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("root", type=Path)
+    parser.add_argument("--stopwords", action="store_true")
+    args = parser.parse_args()
+
+    reader = FileReader(get_settings())
+    texts = [reader.read_file(path)[0] for path in reader.discover_files(args.root.resolve())]
+    megabytes = sum(len(text) for text in texts) / 1e6
+    print(f"{len(texts)} files, {megabytes:.1f} MB")
+    print(f"{'tokenizer':<12} {'tokens':>10} {'tokens/s':>12} {'MB/s':>8} {'vocab':>9} {'max len':>8}")
+
+    tokenizers = {
+        "whitespace": lambda text: text.lower().split(),
+        "code": CodeTokenizer(stopwords=args.stopwords).tokenize,
+    }
+    for name, tokenize in tokenizers.items():
+        vocab = set()
+        tokens = 0
+        start = time.perf_counter()
+        for text in texts:
+            terms = tokenize(text)
+            tokens += len(terms)
+            vocab.update(terms)
+        elapsed = time.perf_counter() - start
+        longest = max((len(term) for term in vocab), default=0)
+        print(
+            f"{name:<12} {tokens:>10} {tokens / elapsed:>12,.0f} {megabytes / elapsed:>8.1f} "
+            f"{len(vocab):>9} {longest:>8}"
+        )
+
+
+if __name__ == "__main__":
+    main()
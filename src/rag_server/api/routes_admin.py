@@ -1,10 +1,12 @@
-"""Admin API routes (health, config)."""
+"""Admin API routes (health, config, cache stats)."""
 
 from typing import Any, Dict
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Response
 
+from rag_server.api.routes_index import get_generations
 from rag_server.core.config import Settings, get_settings
-from rag_server.core.schemas import HealthResponse
+from rag_server.core.schemas import HealthResponse, ReadinessResponse
+from rag_server.search.generations import IndexGenerations
 
 router = APIRouter()
 
@@ -15,7 +17,55 @@ async def health_check() -> HealthResponse:
     return HealthResponse(status="ok", version="0.1.0")
 
 
+@router.get("/health/live", response_model=HealthResponse)
+async def liveness_check() -> HealthResponse:
+    """Liveness check: the process is serving requests (possibly still warming up)."""
+    return HealthResponse(status="ok", version="0.1.0")
+
+
+@router.get(
+    "/health/ready",
+    response_model=ReadinessResponse,
+    responses={503: {"model": ReadinessResponse, "description": "Warming up or failed"}},
+)
+async def readiness_check(
+    response: Response,
+    settings: Settings = Depends(get_settings),
+    generations: IndexGenerations = Depends(get_generations),
+) -> ReadinessResponse:
+    """Readiness check: the index and embedding model are loaded.
+
+    Without ``RAG_WARMUP`` they load on the first query, so the server
+    reports ready straight away.
+    """
+    warmup = generations.warmup
+    status = warmup["status"] if settings.RAG_WARMUP else "ready"
+    if status != "ready":
+        response.status_code = 503
+    return ReadinessResponse(
+        status=status,
+        generation=generations.current(),
+        warmup_s=warmup["seconds"],
+        error=warmup["error"],
+    )
+
+
 @router.get("/config")
 async def get_config(settings: Settings = Depends(get_settings)) -> Dict[str, Any]:
     """Get current configuration (with secrets redacted)."""
     return settings.model_dump_safe()
+
+
+@router.get("/cache/stats")
+async def get_cache_stats(
+    generations: IndexGenerations = Depends(get_generations),
+) -> Dict[str, Any]:
+    """Get cache sizes and hit/miss counters."""
+    stats = {
+        "query_embeddings": generations.query_cache.stats(),
+        "retrieval_results": generations.result_cache.stats(),
+        "answers": generations.answer_cache.stats(),
+    }
+    if generations.reranker is not None:
+        stats["rerank_scores"] = generations.reranker.stats()
+    return stats
@@ -1,73 +1,145 @@
 """Index management API routes."""
 
+import asyncio
 import json
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Any, Dict, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import JSONResponse
 
 from rag_server.core.config import Settings, get_settings
 from rag_server.core.logging import get_logger
-from rag_server.core.schemas import IndexBuildRequest, IndexBuildResponse, IndexStatsResponse
-from rag_server.ingest.pipeline import IngestionPipeline
+from rag_server.core.schemas import (
+    IndexBuildRequest,
+    IndexBuildResponse,
+    IndexJobResponse,
+    IndexStatsResponse,
+)
+from rag_server.ingest.indexer import NothingIndexedError, run_indexing
+from rag_server.ingest.jobs import IndexJobManager
+from rag_server.search.generations import GenerationConflictError, IndexGenerations
 from rag_server.search.retriever import HybridRetriever
 
+if TYPE_CHECKING:
+    from rag_server.ingest.watcher import IndexWatcher
+
 logger = get_logger(__name__)
 router = APIRouter()
 
-# Global retriever instance
-_retriever: Optional[HybridRetriever] = None
+# Global index generations and index job manager instances
+_generations: Optional[IndexGenerations] = None
+_jobs: Optional[IndexJobManager] = None
+
+
+def get_generations(settings: Settings = Depends(get_settings)) -> IndexGenerations:
+    """Get or create the global index generations instance."""
+    global _generations
+    if _generations is None:
+        _generations = IndexGenerations(settings)
+    return _generations
+
+
+def get_retriever(
+    generations: IndexGenerations = Depends(get_generations),
+) -> HybridRetriever:
+    """Get the retriever snapshot of the published index generation.
+
+    A request keeps the snapshot it started with, even if a build publishes
+    a new generation meanwhile.
+    """
+    return generations.snapshot()
 
 
-def get_retriever(settings: Settings = Depends(get_settings)) -> HybridRetriever:
-    """Get or create the global retriever instance."""
-    global _retriever
-    if _retriever is None:
-        _retriever = HybridRetriever(settings)
-        _retriever.load()  # Try to load existing index
-    return _retriever
+def get_job_manager() -> IndexJobManager:
+    """Get or create the global index job manager."""
+    global _jobs
+    if _jobs is None:
+        _jobs = IndexJobManager()
+    return _jobs
 
 
-@router.post("/build", response_model=IndexBuildResponse)
+@router.post(
+    "/build",
+    response_model=IndexBuildResponse,
+    responses={202: {"model": IndexJobResponse, "description": "Build queued (wait=false)"}},
+)
 async def build_index(
     request: IndexBuildRequest,
     settings: Settings = Depends(get_settings),
-    retriever: HybridRetriever = Depends(get_retriever),
-) -> IndexBuildResponse:
-    """Build or rebuild the search index."""
+    generations: IndexGenerations = Depends(get_generations),
+    jobs: IndexJobManager = Depends(get_job_manager),
+) -> Any:
+    """Build or rebuild the search index.
+
+    The build runs as a background job, so other requests keep being served
+    meanwhile. With ``wait=false`` the queued job is returned immediately
+    (poll ``/index/jobs/{id}``); otherwise the response is sent when it ends.
+    """
+    return await _run_build_job(request, settings, generations, jobs, "build")
+
+
+@router.post(
+    "/incremental",
+    response_model=IndexBuildResponse,
+    responses={202: {"model": IndexJobResponse, "description": "Update queued (wait=false)"}},
+)
+async def incremental_index(
+    request: IndexBuildRequest,
+    settings: Settings = Depends(get_settings),
+    generations: IndexGenerations = Depends(get_generations),
+    jobs: IndexJobManager = Depends(get_job_manager),
+) -> Any:
+    """Incrementally update the index (only changed files)."""
+    request.clean = False
+    return await _run_build_job(request, settings, generations, jobs, "incremental")
+
+
+async def _run_build_job(
+    request: IndexBuildRequest,
+    settings: Settings,
+    generations: IndexGenerations,
+    jobs: IndexJobManager,
+    kind: str,
+) -> Any:
+    """Queue an index job for a build request and optionally await it."""
     try:
         logger.info("index_build_requested", root=request.root, clean=request.clean)
 
-        # Run ingestion pipeline
-        pipeline = IngestionPipeline(settings)
         root_path = Path(request.root).resolve()
 
         if not root_path.exists():
             raise HTTPException(status_code=400, detail=f"Root path does not exist: {request.root}")
 
-        chunks, stats = pipeline.ingest(
-            root=root_path,
-            patterns=request.patterns,
-            exclude=request.exclude,
-            clean=request.clean,
+        job = jobs.submit(
+            kind,
+            lambda: run_indexing(
+                settings,
+                generations,
+                root_path,
+                clean=request.clean,
+                patterns=request.patterns,
+                exclude=request.exclude,
+                workers=request.workers,
+            ),
+            params=request.model_dump(exclude={"wait"}),
         )
+        if not request.wait:
+            return JSONResponse(status_code=202, content=job.to_dict())
 
-        if not chunks:
-            raise HTTPException(status_code=400, detail="No files were indexed")
-
-        # Build indices
-        retriever.build_indices(chunks)
-        retriever.save()
-
-        # Save stats
-        stats_file = settings.RAG_INDEX_DIR / "stats.json"
-        stats_file.write_text(json.dumps(stats, indent=2))
+        try:
+            stats = await asyncio.wrap_future(job.future)
+        except NothingIndexedError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        except GenerationConflictError as e:
+            raise HTTPException(status_code=409, detail=str(e))
 
         return IndexBuildResponse(
             ok=True,
             files_indexed=stats["files_indexed"],
             chunks=stats["chunks"],
             duration_s=stats["duration_s"],
+            job_id=job.id,
         )
 
     except HTTPException:
@@ -77,22 +149,32 @@ async def build_index(
         raise HTTPException(status_code=500, detail=f"Index build failed: {str(e)}")
 
 
-@router.post("/incremental", response_model=IndexBuildResponse)
-async def incremental_index(
-    request: IndexBuildRequest,
-    settings: Settings = Depends(get_settings),
-    retriever: HybridRetriever = Depends(get_retriever),
-) -> IndexBuildResponse:
-    """Incrementally update the index (only changed files)."""
-    # For MVP, this is the same as build but with clean=False
-    request.clean = False
-    return await build_index(request, settings, retriever)
+@router.get("/jobs/{job_id}", response_model=IndexJobResponse)
+async def get_index_job(
+    job_id: str, jobs: IndexJobManager = Depends(get_job_manager)
+) -> IndexJobResponse:
+    """Get the status of an index job."""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return IndexJobResponse(**job.to_dict())
+
+
+@router.get("/watcher")
+async def get_watcher_stats(request: Request) -> Dict[str, Any]:
+    """Get live reindexing queue depth and lag."""
+    watcher: Optional["IndexWatcher"] = request.app.state.watcher
+    if watcher is None:
+        raise HTTPException(status_code=404, detail="Watcher is not enabled (set RAG_WATCH_ROOT)")
+    return watcher.stats()
 
 
 @router.get("/stats", response_model=IndexStatsResponse)
-async def get_index_stats(settings: Settings = Depends(get_settings)) -> IndexStatsResponse:
+async def get_index_stats(
+    generations: IndexGenerations = Depends(get_generations),
+) -> IndexStatsResponse:
     """Get index statistics."""
-    stats_file = settings.RAG_INDEX_DIR / "stats.json"
+    stats_file = generations.current_dir() / "stats.json"
 
     if not stats_file.exists():
         raise HTTPException(status_code=404, detail="No index found")
@@ -1,39 +1,148 @@
 """Query and answer API routes."""
 
+import asyncio
+import json
 import re
-from typing import List
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple, Union
 
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 
-from rag_server.api.routes_index import get_retriever
+from rag_server.api.routes_index import get_generations, get_retriever
 from rag_server.core.config import Settings, get_settings
 from rag_server.core.logging import get_logger
 from rag_server.core.schemas import (
     AnswerRequest,
     AnswerResponse,
+    BatchQueryRequest,
+    BatchQueryResponse,
     Citation,
+    Match,
     QueryRequest,
     QueryResponse,
 )
+from rag_server.llm.errors import LLMGenerationError
 from rag_server.llm.ollama_client import OllamaClient
 from rag_server.llm.openai_client import OpenAIClient
 from rag_server.llm.prompt_templates import build_grounding_prompt
+from rag_server.search.generations import IndexGenerations
+from rag_server.search.reranker import Reranker
 from rag_server.search.retriever import HybridRetriever
 
 logger = get_logger(__name__)
 router = APIRouter()
 
+RETRIEVAL_ONLY_ANSWER = (
+    "Retrieval-only mode (no LLM provider configured). See matches for context."
+)
+
+# Global pool running retrievals off the event loop
+_query_executor: Optional[ThreadPoolExecutor] = None
+
+# Global LLM client, shared by all requests for its connection pool and limits
+_llm_client: Optional[Union[OpenAIClient, OllamaClient]] = None
+
+
+def get_query_executor(settings: Settings = Depends(get_settings)) -> ThreadPoolExecutor:
+    """Get or create the bounded retrieval thread pool."""
+    global _query_executor
+    if _query_executor is None:
+        _query_executor = ThreadPoolExecutor(
+            max_workers=settings.RAG_QUERY_CONCURRENCY, thread_name_prefix="query"
+        )
+    return _query_executor
+
+
+def get_llm_client(
+    settings: Settings = Depends(get_settings),
+) -> Optional[Union[OpenAIClient, OllamaClient]]:
+    """Get or create the client for the configured LLM provider.
+
+    Returns:
+        The app-lifetime client, or None in retrieval-only mode
+    """
+    global _llm_client
+    if _llm_client is None:
+        if settings.RAG_LLM_PROVIDER == "openai":
+            _llm_client = OpenAIClient(settings)
+        elif settings.RAG_LLM_PROVIDER == "ollama":
+            _llm_client = OllamaClient(settings)
+    return _llm_client
+
+
+async def close_llm_client() -> None:
+    """Close the LLM client's connections (on shutdown)."""
+    global _llm_client
+    if _llm_client is not None:
+        await _llm_client.aclose()
+        _llm_client = None
+
+
+async def _retrieve(
+    retriever: HybridRetriever, executor: ThreadPoolExecutor, request: QueryRequest
+) -> List[Match]:
+    """Run a retrieval on the query pool.
+
+    Encoding and index search are CPU-bound and would otherwise block the
+    event loop; at most ``RAG_QUERY_CONCURRENCY`` run at once and further
+    requests queue for a thread. Query encodes of concurrent retrievals are
+    micro-batched (see ``EncodeBatcher``).
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        executor,
+        partial(
+            retriever.retrieve,
+            request.q,
+            request.top_k,
+            nprobe=request.nprobe,
+            ef_search=request.ef_search,
+        ),
+    )
+
+
+def _retrieve_and_rerank(
+    retriever: HybridRetriever, reranker: Optional[Reranker], request: QueryRequest
+) -> Tuple[List[Match], Optional[Dict[str, Any]]]:
+    """Retrieve answer context, reranking a wider candidate pool if enabled."""
+    top_k = request.top_k if reranker is None else max(request.top_k, reranker.candidates)
+    matches = retriever.retrieve(
+        request.q, top_k, nprobe=request.nprobe, ef_search=request.ef_search
+    )
+    if reranker is None or not matches:
+        return matches, None
+    return reranker.rerank(request.q, matches, request.top_k)
+
+
+async def _retrieve_context(
+    retriever: HybridRetriever,
+    reranker: Optional[Reranker],
+    executor: ThreadPoolExecutor,
+    request: QueryRequest,
+) -> Tuple[List[Match], Optional[Dict[str, Any]]]:
+    """Run an answer's retrieval (and reranking) on the query pool.
+
+    Returns:
+        ``(matches, rerank_stats)``; stats are None without reranking
+    """
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, partial(_retrieve_and_rerank, retriever, reranker, request)
+    )
+
 
 @router.post("/query", response_model=QueryResponse)
 async def query(
     request: QueryRequest,
     retriever: HybridRetriever = Depends(get_retriever),
+    executor: ThreadPoolExecutor = Depends(get_query_executor),
 ) -> QueryResponse:
     """Search for relevant code/docs."""
     try:
         logger.info("query_received", query=request.q, top_k=request.top_k)
 
-        matches = retriever.retrieve(request.q, request.top_k)
+        matches = await _retrieve(retriever, executor, request)
 
         return QueryResponse(matches=matches)
 
@@ -42,56 +151,200 @@ async def query(
         raise HTTPException(status_code=500, detail=f"Query failed: {str(e)}")
 
 
+@router.post("/query/batch", response_model=BatchQueryResponse)
+async def query_batch(
+    request: BatchQueryRequest,
+    retriever: HybridRetriever = Depends(get_retriever),
+    executor: ThreadPoolExecutor = Depends(get_query_executor),
+) -> BatchQueryResponse:
+    """Search for several queries with one embedding batch and index pass."""
+    try:
+        logger.info("query_batch_received", queries=len(request.queries), top_k=request.top_k)
+
+        results = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(
+                retriever.retrieve_many,
+                request.queries,
+                request.top_k,
+                nprobe=request.nprobe,
+                ef_search=request.ef_search,
+            ),
+        )
+
+        return BatchQueryResponse(results=[QueryResponse(matches=m) for m in results])
+
+    except Exception as e:
+        logger.error("query_batch_error", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Batch query failed: {str(e)}")
+
+
 @router.post("/answer", response_model=AnswerResponse)
 async def answer(
     request: AnswerRequest,
     settings: Settings = Depends(get_settings),
     retriever: HybridRetriever = Depends(get_retriever),
+    executor: ThreadPoolExecutor = Depends(get_query_executor),
+    client: Optional[Union[OpenAIClient, OllamaClient]] = Depends(get_llm_client),
+    generations: IndexGenerations = Depends(get_generations),
 ) -> AnswerResponse:
-    """Generate an answer using LLM with retrieved context."""
+    """Generate an answer using LLM with retrieved context.
+
+    With ``RAG_RERANK``, a wider candidate pool is retrieved and reranked
+    by a cross-encoder (see ``Reranker``). A question similar enough to an
+    earlier one that retrieved the same context is answered from the
+    semantic answer cache (see ``AnswerCache``). A failed LLM call is
+    answered with 502 and not cached.
+    """
     try:
         logger.info("answer_requested", query=request.q, provider=settings.RAG_LLM_PROVIDER)
 
         # Retrieve context
-        matches = retriever.retrieve(request.q, request.top_k)
+        matches, rerank_stats = await _retrieve_context(
+            retriever, generations.reranker, executor, request
+        )
 
         if not matches:
             raise HTTPException(status_code=404, detail="No relevant context found")
 
         # If no LLM provider, return retrieval-only response
-        if settings.RAG_LLM_PROVIDER == "none":
-            final_answer = (
-                "Retrieval-only mode (no LLM provider configured). See matches for context."
-            )
+        if client is None:
+            final_answer = RETRIEVAL_ONLY_ANSWER
             citations = [
                 Citation(path=m.path, start_line=m.start_line, end_line=m.end_line) for m in matches
             ]
             return AnswerResponse(final=final_answer, citations=citations, matches=matches)
 
-        # Build prompt
-        prompt = build_grounding_prompt(request.q, matches)
+        # Reuse the answer to a paraphrase of an earlier question (the query
+        # embedding is in the query cache since retrieval computed it)
+        answer_cache = generations.answer_cache
+        embedding = None
+        if answer_cache.maxsize:
+            embedding = await asyncio.get_running_loop().run_in_executor(
+                executor, retriever.vector_store.encode_query, request.q
+            )
+            cached = answer_cache.get(embedding, request.max_tokens, matches)
+            if cached is not None:
+                logger.info("answer_cache_hit", query=request.q)
+                return cached
+
+        # Build prompt (tokenizing the context; the tokenizer loads on first use)
+        prompt, context_stats = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(build_grounding_prompt, request.q, matches, settings, request.max_tokens),
+        )
+        logger.info("answer_context_packed", **context_stats)
 
         # Generate answer
-        final_answer = ""
-        if settings.RAG_LLM_PROVIDER == "openai":
-            client = OpenAIClient(settings)
-            final_answer = client.generate(prompt, request.max_tokens)
-        elif settings.RAG_LLM_PROVIDER == "ollama":
-            client = OllamaClient(settings)
-            final_answer = await client.generate(prompt, request.max_tokens)
+        final_answer = await client.generate(prompt, request.max_tokens)
 
         # Extract citations from answer or use all matches
         citations = _extract_citations(final_answer, matches)
 
-        return AnswerResponse(final=final_answer, citations=citations, matches=matches)
+        response = AnswerResponse(
+            final=final_answer,
+            citations=citations,
+            matches=matches,
+            metadata={"context": context_stats, "rerank": rerank_stats},
+        )
+        if embedding is not None:
+            answer_cache.put(embedding, request.max_tokens, response)
+        return response
 
     except HTTPException:
         raise
+    except LLMGenerationError as e:
+        raise HTTPException(status_code=502, detail=f"Answer generation failed: {str(e)}")
     except Exception as e:
         logger.error("answer_error", error=str(e))
         raise HTTPException(status_code=500, detail=f"Answer generation failed: {str(e)}")
 
 
+def _sse(event: str, data: Any) -> str:
+    """Format one Server-Sent Event with a JSON payload."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post("/answer/stream")
+async def answer_stream(
+    request: AnswerRequest,
+    settings: Settings = Depends(get_settings),
+    retriever: HybridRetriever = Depends(get_retriever),
+    executor: ThreadPoolExecutor = Depends(get_query_executor),
+    client: Optional[Union[OpenAIClient, OllamaClient]] = Depends(get_llm_client),
+    generations: IndexGenerations = Depends(get_generations),
+) -> StreamingResponse:
+    """Generate an answer, streamed as Server-Sent Events while the LLM writes it.
+
+    Events, in order: ``matches`` (the retrieved context), one ``token`` per
+    generated text fragment, ``citations``, and ``done`` with timings in
+    milliseconds since the request arrived (``first_token_ms`` is what the
+    user waits before text appears), the prompt ``context`` token counts
+    and the ``rerank`` stats. A provider failure mid-answer ends the
+    stream with an ``error`` event instead of ``citations``.
+    """
+    start = time.perf_counter()
+    logger.info("answer_stream_requested", query=request.q)
+
+    try:
+        matches, rerank_stats = await _retrieve_context(
+            retriever, generations.reranker, executor, request
+        )
+    except Exception as e:
+        logger.error("answer_stream_error", error=str(e))
+        raise HTTPException(status_code=500, detail=f"Answer generation failed: {str(e)}")
+    if not matches:
+        raise HTTPException(status_code=404, detail="No relevant context found")
+    retrieval_ms = (time.perf_counter() - start) * 1000
+
+    prompt, context_stats = "", None
+    if client is not None:
+        prompt, context_stats = await asyncio.get_running_loop().run_in_executor(
+            executor,
+            partial(build_grounding_prompt, request.q, matches, settings, request.max_tokens),
+        )
+
+    async def events() -> AsyncIterator[str]:
+        yield _sse("matches", [match.model_dump() for match in matches])
+        timings = {"retrieval_ms": round(retrieval_ms, 1), "first_token_ms": None}
+
+        async def retrieval_only() -> AsyncIterator[str]:
+            yield RETRIEVAL_ONLY_ANSWER
+
+        fragments: List[str] = []
+        stream = (
+            client.astream(prompt, request.max_tokens)
+            if client is not None
+            else retrieval_only()
+        )
+        try:
+            async for fragment in stream:
+                if timings["first_token_ms"] is None:
+                    timings["first_token_ms"] = round((time.perf_counter() - start) * 1000, 1)
+                fragments.append(fragment)
+                yield _sse("token", {"text": fragment})
+        except Exception as e:
+            logger.error("answer_stream_error", error=str(e))
+            yield _sse("error", {"detail": f"Answer generation failed: {str(e)}"})
+            return
+
+        citations = _extract_citations("".join(fragments), matches)
+        yield _sse("citations", [citation.model_dump() for citation in citations])
+        timings["total_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        logger.info("answer_stream_complete", fragments=len(fragments), **timings)
+        yield _sse("done", {**timings, "context": context_stats, "rerank": rerank_stats})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={
+            "Cache-Control": "no-cache",
+            "X-Accel-Buffering": "no",  # keep reverse proxies from buffering the stream
+            "Server-Timing": f"retrieval;dur={retrieval_ms:.1f}",
+        },
+    )
+
+
 def _extract_citations(answer: str, matches: list) -> List[Citation]:
     """Extract citations from the answer text.
 
@@ -32,11 +32,98 @@ class Settings(BaseSettings):
 
     # Embedding configuration
     RAG_EMBEDDING_MODEL: str = Field(default="sentence-transformers/all-MiniLM-L6-v2")
+    RAG_EMBEDDING_BACKEND: Literal["torch", "onnx", "onnx_int8"] = Field(default="torch")
+    RAG_ONNX_QUANTIZATION: Literal["auto", "arm64", "avx2", "avx512", "avx512_vnni"] = Field(
+        default="auto", description="int8 kernel target for onnx_int8 (auto = detect CPU)"
+    )
     RAG_VECTOR_STORE: Literal["faiss", "chroma"] = Field(default="faiss")
     RAG_TOP_K: int = Field(default=8, ge=1, le=100)
     RAG_CHUNK_SIZE: int = Field(default=800, ge=100, le=5000)
     RAG_CHUNK_OVERLAP: int = Field(default=120, ge=0, le=500)
 
+    # Chunk embeddings reused across builds, keyed by text hash
+    RAG_EMBEDDING_CACHE: bool = Field(default=True)
+    RAG_EMBEDDING_CACHE_DIR: Optional[Path] = Field(
+        default=None, description="Default: <RAG_DATA_DIR>/embedding_cache"
+    )
+
+    # Ingestion pipeline
+    RAG_INGEST_WORKERS: int = Field(default=0, ge=0, description="0 = min(32, cpus + 4)")
+    RAG_INGEST_EXECUTOR: Literal["thread", "process"] = Field(default="thread")
+    RAG_INGEST_BATCH_CHUNKS: int = Field(default=256, ge=1)
+
+    # Query serving: retrievals run on a pool of this many threads
+    RAG_QUERY_CONCURRENCY: int = Field(default=16, ge=1, le=256)
+    # Load the index and embedding model in the background at startup
+    # (otherwise on the first query); /health/ready reports when done
+    RAG_WARMUP: bool = Field(default=True)
+
+    # Micro-batching of concurrent query embeddings (window 0 disables)
+    RAG_EMBED_BATCH_WINDOW_MS: float = Field(default=3.0, ge=0, le=100)
+    RAG_EMBED_MAX_BATCH: int = Field(default=32, ge=1, le=1024)
+
+    # Query embedding cache (LRU; size 0 disables, TTL 0 never expires)
+    RAG_QUERY_CACHE_SIZE: int = Field(default=10_000, ge=0)
+    RAG_QUERY_CACHE_TTL_S: float = Field(default=86_400.0, ge=0)
+    RAG_QUERY_CACHE_DIR: Optional[Path] = Field(default=None, description="Spill evictions here")
+
+    # Retrieval result cache (LRU per index generation; size 0 disables)
+    RAG_RESULT_CACHE_SIZE: int = Field(default=2048, ge=0)
+    RAG_RESULT_CACHE_MAX_MB: float = Field(default=64.0, gt=0)
+
+    # Cross-encoder reranking of /answer context: the top RAG_RERANK_CANDIDATES
+    # fused matches are rescored, falling back to RRF order past the budget
+    RAG_RERANK: bool = Field(default=False)
+    RAG_RERANK_MODEL: str = Field(default="cross-encoder/ms-marco-MiniLM-L-6-v2")
+    RAG_RERANK_CANDIDATES: int = Field(default=50, ge=1, le=200)
+    RAG_RERANK_BUDGET_MS: float = Field(default=250.0, gt=0)
+    RAG_RERANK_BATCH_SIZE: int = Field(default=16, ge=1, le=256)
+    RAG_RERANK_CACHE_SIZE: int = Field(default=20_000, ge=0, description="0 = off")
+
+    # Semantic answer cache: /answer reuses the answer to an earlier question
+    # this similar (cosine of query embeddings) with the same retrieved chunks
+    RAG_ANSWER_CACHE_SIZE: int = Field(default=1024, ge=0, description="0 = off")
+    RAG_ANSWER_CACHE_MIN_SIMILARITY: float = Field(default=0.95, gt=0.0, le=1.0)
+
+    # Filesystem watcher (live reindexing of RAG_WATCH_ROOT; disabled when unset)
+    RAG_WATCH_ROOT: Optional[Path] = Field(default=None)
+    RAG_WATCH_BACKEND: Literal["auto", "inotify", "polling"] = Field(default="auto")
+    RAG_WATCH_DEBOUNCE_MS: int = Field(default=500, ge=0)
+    RAG_WATCH_MAX_DELAY_S: float = Field(default=5.0, gt=0)
+    RAG_WATCH_POLL_INTERVAL_S: float = Field(default=2.0, gt=0)
+
+    # Index generations kept on disk (current one included)
+    RAG_INDEX_KEEP_GENERATIONS: int = Field(default=2, ge=1)
+
+    # Vector index type and ANN parameters
+    RAG_VECTOR_INDEX: Literal["flat", "hnsw", "ivf_pq"] = Field(default="flat")
+    RAG_HNSW_M: int = Field(default=32, ge=4, le=128)
+    RAG_HNSW_EF_CONSTRUCTION: int = Field(default=80, ge=8, le=1024)
+    RAG_HNSW_EF_SEARCH: int = Field(default=64, ge=1, le=4096)
+    RAG_IVF_NLIST: int = Field(default=0, ge=0, description="0 = 4*sqrt(vectors)")
+    RAG_IVF_NPROBE: int = Field(default=16, ge=1)
+    RAG_PQ_M: int = Field(default=16, ge=1, description="PQ sub-quantizers (divides dim)")
+    RAG_PQ_NBITS: int = Field(default=8, ge=4, le=12)
+    # Vector codes: fp32 (exact), fp16, sq8 (int8 scalar) or pq; compressed ones
+    # re-score a shortlist of RAG_REFINE_K_FACTOR * top_k exactly
+    RAG_VECTOR_STORAGE: Literal["fp32", "fp16", "sq8", "pq"] = Field(default="fp32")
+    RAG_REFINE_K_FACTOR: int = Field(default=4, ge=1, le=64)
+    RAG_INDEX_TRAIN_SAMPLE: int = Field(default=100_000, ge=1000)
+    # Split the index into shards (by file path or top-level directory), searched
+    # and built in parallel; changing either setting makes the next build clean
+    RAG_INDEX_SHARDS: int = Field(default=1, ge=1, le=256)
+    RAG_SHARD_BY: Literal["path", "repository"] = Field(default="path")
+    # l2 distance, or cosine similarity (unit-length embeddings, inner-product
+    # indices); a cosine index drops vector hits below RAG_MIN_VECTOR_SCORE
+    RAG_VECTOR_METRIC: Literal["l2", "cosine"] = Field(default="l2")
+    RAG_MIN_VECTOR_SCORE: Optional[float] = Field(
+        default=None, ge=-1.0, le=1.0, description="Unset = keep all"
+    )
+
+    # Keyword (BM25) index
+    RAG_BM25_STOPWORDS: bool = Field(default=False)
+    RAG_BM25_MAX_VOCAB: int = Field(default=0, ge=0, description="0 = unlimited")
+
     # API Security
     RAG_API_KEY: str = Field(default="dev-secret")
 
@@ -45,6 +132,16 @@ class Settings(BaseSettings):
     OPENAI_API_KEY: str = Field(default="")
     OLLAMA_ENDPOINT: str = Field(default="http://localhost:11434")
     LLM_MODEL: str = Field(default="gpt-4o-mini")
+    OPENAI_BASE_URL: str = Field(default="", description="Empty = api.openai.com")
+    # Calls in flight per provider (further ones wait) and per-call timeouts
+    RAG_OPENAI_CONCURRENCY: int = Field(default=16, ge=1, le=512)
+    RAG_OPENAI_TIMEOUT_S: float = Field(default=60.0, gt=0)
+    RAG_OLLAMA_CONCURRENCY: int = Field(default=2, ge=1, le=64)
+    RAG_OLLAMA_TIMEOUT_S: float = Field(default=120.0, gt=0)
+    # Prompt context: retrieved code packed into at most this many tokens, and
+    # the model's context window (prompt + answer), which may lower the budget
+    RAG_CONTEXT_TOKEN_BUDGET: int = Field(default=3000, ge=100)
+    RAG_LLM_CONTEXT_WINDOW: int = Field(default=128_000, ge=1024)
 
     # Logging
     LOG_LEVEL: str = Field(default="INFO")
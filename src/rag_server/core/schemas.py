@@ -1,6 +1,6 @@
 """Pydantic schemas for API requests and responses."""
 
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Literal, Optional
 
 from pydantic import BaseModel, Field
 
@@ -29,6 +29,27 @@ class QueryRequest(BaseModel):
 
     q: str = Field(description="Natural language query")
     top_k: int = Field(default=8, ge=1, le=50, description="Number of results to return")
+    nprobe: Optional[int] = Field(
+        default=None, ge=1, le=65536, description="IVF lists to probe (ivf_pq index only)"
+    )
+    ef_search: Optional[int] = Field(
+        default=None, ge=1, le=4096, description="HNSW search breadth (hnsw index only)"
+    )
+
+
+class BatchQueryRequest(BaseModel):
+    """Request to search for several queries at once."""
+
+    queries: List[str] = Field(
+        min_length=1, max_length=256, description="Natural language queries"
+    )
+    top_k: int = Field(default=8, ge=1, le=50, description="Number of results per query")
+    nprobe: Optional[int] = Field(
+        default=None, ge=1, le=65536, description="IVF lists to probe (ivf_pq index only)"
+    )
+    ef_search: Optional[int] = Field(
+        default=None, ge=1, le=4096, description="HNSW search breadth (hnsw index only)"
+    )
 
 
 class AnswerRequest(QueryRequest):
@@ -43,12 +64,21 @@ class QueryResponse(BaseModel):
     matches: List[Match] = Field(description="Ranked search results")
 
 
+class BatchQueryResponse(BaseModel):
+    """Response with search matches for each query of a batch."""
+
+    results: List[QueryResponse] = Field(description="One result per query, in request order")
+
+
 class AnswerResponse(BaseModel):
     """Response with generated answer and citations."""
 
     final: str = Field(description="Generated answer")
     citations: List[Citation] = Field(description="Source citations")
     matches: List[Match] = Field(description="Retrieved context matches")
+    metadata: Dict[str, Any] = Field(
+        default_factory=dict, description="Generation details (e.g. prompt context tokens)"
+    )
 
 
 class IndexBuildRequest(BaseModel):
@@ -60,6 +90,13 @@ class IndexBuildRequest(BaseModel):
         default_factory=lambda: ["**/*"], description="Glob patterns to include"
     )
     exclude: List[str] = Field(default_factory=lambda: [], description="Glob patterns to exclude")
+    workers: Optional[int] = Field(
+        default=None, ge=1, le=256, description="Ingestion workers (default: RAG_INGEST_WORKERS)"
+    )
+    wait: bool = Field(
+        default=True,
+        description="Wait for the build to finish; if false, return the queued job immediately",
+    )
 
 
 class IndexBuildResponse(BaseModel):
@@ -69,6 +106,21 @@ class IndexBuildResponse(BaseModel):
     files_indexed: int = Field(description="Number of files indexed")
     chunks: int = Field(description="Number of chunks created")
     duration_s: float = Field(description="Duration in seconds")
+    job_id: Optional[str] = Field(default=None, description="ID of the index job")
+
+
+class IndexJobResponse(BaseModel):
+    """Status of a background index job."""
+
+    id: str = Field(description="Job ID")
+    kind: str = Field(description="What triggered the job (build, incremental, watch)")
+    status: Literal["queued", "running", "succeeded", "failed"] = Field(description="Job state")
+    params: Dict[str, Any] = Field(default_factory=dict, description="Request parameters")
+    created_at: str = Field(description="Queue time (ISO format)")
+    started_at: Optional[str] = Field(default=None, description="Start time (ISO format)")
+    finished_at: Optional[str] = Field(default=None, description="End time (ISO format)")
+    result: Optional[Dict[str, Any]] = Field(default=None, description="Ingestion stats")
+    error: Optional[str] = Field(default=None, description="Failure reason")
 
 
 class IndexStatsResponse(BaseModel):
@@ -84,3 +136,12 @@ class HealthResponse(BaseModel):
 
     status: str = Field(default="ok")
     version: str = Field(default="0.1.0")
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response."""
+
+    status: str = Field(description="Warmup status: pending, warming, ready, failed")
+    generation: Optional[str] = Field(default=None, description="Published index generation")
+    warmup_s: Optional[float] = Field(default=None, description="Warmup duration in seconds")
+    error: Optional[str] = Field(default=None, description="Warmup failure reason")
@@ -0,0 +1,127 @@
+"""Change detection for incremental indexing."""
+
+import json
+import os
+from typing import Any, Dict, Optional
+
+import xxhash
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Content hash used to confirm whether a file whose stat changed really changed
+HASH_ALGORITHM = "xxh3_128"
+
+# Files modified this close to the previous scan may have changed again within
+# the filesystem's timestamp granularity, so their stat is not trusted
+RACY_WINDOW_NS = 2_000_000_000
+
+FileState = Dict[str, Any]
+
+
+def content_hash(data: bytes) -> str:
+    """Hash file contents for change detection.
+
+    Args:
+        data: Raw file bytes
+
+    Returns:
+        Hex digest
+    """
+    return xxhash.xxh3_128_hexdigest(data)
+
+
+def stat_state(stat: os.stat_result) -> FileState:
+    """Extract the stat fields that identify a file version.
+
+    Args:
+        stat: Result of ``os.stat``
+
+    Returns:
+        Dict with ``mtime_ns``, ``size`` and ``inode``
+    """
+    return {"mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "inode": stat.st_ino}
+
+
+class ChangeDetector:
+    """Tracks per-file state in ``file_hashes.json`` between indexing runs.
+
+    A file is unchanged if its ``(mtime_ns, size, inode)`` matches the stored
+    stat, so a no-op run does one ``stat`` per file and reads nothing. Only
+    files whose stat differs are read, and only those whose content hash
+    differs are re-chunked (``touch``, branch switches and restores keep
+    their chunks).
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the detector.
+
+        Args:
+            settings: Application settings
+        """
+        self.state_file = settings.RAG_INDEX_DIR / "file_hashes.json"
+        self.files: Dict[str, FileState] = {}
+        self.scanned_at_ns = 0
+
+    def load(self) -> None:
+        """Load the state recorded by the previous run.
+
+        Entries written before stats were recorded (``{path: sha256}``) are
+        kept as ``{"sha256": ...}``; they are read and compared once, then
+        upgraded.
+        """
+        self.files = {}
+        self.scanned_at_ns = 0
+        if not self.state_file.exists():
+            return
+
+        try:
+            state = json.loads(self.state_file.read_text())
+        except Exception as e:
+            logger.warning("hash_load_error", error=str(e))
+            return
+
+        if "files" in state and state.get("hash") == HASH_ALGORITHM:
+            self.files = state["files"]
+            self.scanned_at_ns = state.get("scanned_at_ns", 0)
+        else:
+            self.files = {
+                path: {"sha256": value} for path, value in state.items() if isinstance(value, str)
+            }
+        logger.info("loaded_hashes", count=len(self.files))
+
+    def unchanged(self, path: str, current: FileState) -> Optional[FileState]:
+        """Check a file against its stored stat without reading it.
+
+        Args:
+            path: File path relative to the root
+            current: Current stat fields (see ``stat_state``)
+
+        Returns:
+            The stored state if the file is unchanged, else None
+        """
+        stored = self.files.get(path)
+        if stored is None or "hash" not in stored:
+            return None
+        if any(stored.get(key) != current[key] for key in ("mtime_ns", "size", "inode")):
+            return None
+        if stored["mtime_ns"] + RACY_WINDOW_NS >= self.scanned_at_ns:
+            return None
+        return stored
+
+    def save(self, files: Dict[str, FileState], scanned_at_ns: int) -> None:
+        """Record the state of this run.
+
+        Args:
+            files: State of every indexed file
+            scanned_at_ns: Wall-clock time the run started discovering files
+        """
+        state = {"hash": HASH_ALGORITHM, "scanned_at_ns": scanned_at_ns, "files": files}
+        try:
+            tmp_path = self.state_file.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(state))
+            os.replace(tmp_path, self.state_file)
+        except Exception as e:
+            logger.warning("hash_save_error", error=str(e))
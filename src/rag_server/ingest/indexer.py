@@ -0,0 +1,100 @@
+"""Index builds: ingestion streamed into a new index generation."""
+
+import json
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.ingest.pipeline import IngestionPipeline
+from rag_server.search.generations import IndexGenerations
+
+logger = get_logger(__name__)
+
+
+class NothingIndexedError(ValueError):
+    """Raised when a clean build finds no indexable files."""
+
+
+def run_indexing(
+    settings: Settings,
+    generations: IndexGenerations,
+    root: Path,
+    clean: bool = False,
+    patterns: Optional[List[str]] = None,
+    exclude: Optional[List[str]] = None,
+    workers: Optional[int] = None,
+    paths: Optional[Iterable[Path]] = None,
+) -> Dict[str, Any]:
+    """Ingest a tree (or some paths of it) into a new index generation.
+
+    The build writes a new generation (see ``IndexGenerations``) and
+    publishes it when done, so queries keep using the previous snapshot
+    until the new one is complete. Without an existing index the build is
+    always clean; a run that finds nothing to update publishes nothing.
+
+    Args:
+        settings: Application settings
+        generations: Index generations to build on and publish to
+        root: Root directory to index
+        clean: Rebuild from scratch instead of applying changes
+        patterns: Glob patterns to include
+        exclude: Glob patterns to exclude
+        workers: Ingestion worker pool size
+        paths: Only re-check these files or directories (incremental only)
+
+    Returns:
+        Ingestion stats for this run
+
+    Raises:
+        NothingIndexedError: If a clean build indexed no files
+    """
+    clean = clean or generations.snapshot().is_empty()
+    if clean:
+        paths = None
+
+    writer = generations.begin(clean)
+    try:
+        # Embed and index chunks batch by batch while later files are still
+        # being read; an incremental batch replaces the chunks of its files
+        def index_batch(chunks: List[Dict[str, Any]], batch_paths: List[str]) -> None:
+            writer.update_indices(chunks, [] if clean else batch_paths)
+
+        # File states live in the generation, next to the index they describe
+        _, stats = IngestionPipeline(writer.settings).ingest(
+            root=root,
+            patterns=patterns,
+            exclude=exclude,
+            clean=clean,
+            on_batch=index_batch,
+            workers=workers,
+            paths=paths,
+        )
+        changed_paths = stats.pop("changed_paths")
+        deleted_paths = stats.pop("deleted_paths")
+
+        if not clean and deleted_paths:
+            writer.update_indices([], deleted_paths)
+        writer.flush()
+
+        if clean and writer.is_empty():
+            raise NothingIndexedError("No files were indexed")
+        modified = clean or bool(changed_paths or deleted_paths)
+        if not modified and not stats["stages"]["files_processed"]:
+            generations.abort(writer)
+            return stats
+        if modified:
+            writer.save()
+
+        # Save stats (totals for the whole index, not just this run)
+        stats_file = writer.settings.RAG_INDEX_DIR / "stats.json"
+        tmp_path = stats_file.with_suffix(".tmp")
+        tmp_path.write_text(json.dumps({**stats, **writer.index_stats()}, indent=2))
+        os.replace(tmp_path, stats_file)
+    except BaseException:
+        generations.abort(writer)
+        raise
+
+    generations.publish(writer)
+    return stats
@@ -0,0 +1,127 @@
+"""Background index build jobs."""
+
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from rag_server.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Finished jobs kept for status lookups
+MAX_FINISHED_JOBS = 100
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class IndexJob:
+    """State of one queued, running or finished index job."""
+
+    def __init__(self, kind: str, params: Dict[str, Any]):
+        """Initialize a queued job.
+
+        Args:
+            kind: What triggered the job (``build``, ``incremental``, ``watch``)
+            params: Request parameters, for display
+        """
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "queued"
+        self.created_at = _now()
+        self.started_at: Optional[str] = None
+        self.finished_at: Optional[str] = None
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.future: "Future[Dict[str, Any]]" = Future()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the job status.
+
+        Returns:
+            Job fields (without the future)
+        """
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "status": self.status,
+            "params": self.params,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class IndexJobManager:
+    """Runs index jobs one at a time on a background thread.
+
+    Builds, incremental updates and watcher batches all write the same
+    indices, so they are serialized rather than run concurrently; request
+    handlers only enqueue and (optionally) await them.
+    """
+
+    def __init__(self) -> None:
+        """Initialize the manager and its worker thread."""
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="index-job")
+        self.jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+
+    def submit(
+        self, kind: str, fn: Callable[[], Dict[str, Any]], params: Optional[Dict[str, Any]] = None
+    ) -> IndexJob:
+        """Queue a job.
+
+        Args:
+            kind: What triggered the job
+            fn: Runs the job and returns its stats
+            params: Request parameters, for display
+
+        Returns:
+            The queued job; ``job.future`` resolves to the stats
+        """
+        job = IndexJob(kind, params or {})
+        self.jobs[job.id] = job
+        self._prune()
+        self.executor.submit(self._run, job, fn)
+        logger.info("index_job_queued", job_id=job.id, kind=kind)
+        return job
+
+    def _run(self, job: IndexJob, fn: Callable[[], Dict[str, Any]]) -> None:
+        """Run a job on the worker thread and record its outcome."""
+        job.status = "running"
+        job.started_at = _now()
+        try:
+            job.result = fn()
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            job.finished_at = _now()
+            logger.error("index_job_failed", job_id=job.id, kind=job.kind, error=str(e))
+            job.future.set_exception(e)
+            return
+        job.status = "succeeded"
+        job.finished_at = _now()
+        logger.info("index_job_succeeded", job_id=job.id, kind=job.kind)
+        job.future.set_result(job.result)
+
+    def _prune(self) -> None:
+        """Forget the oldest finished jobs beyond ``MAX_FINISHED_JOBS``."""
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[: max(0, len(finished) - MAX_FINISHED_JOBS)]:
+            del self.jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        """Look up a job.
+
+        Args:
+            job_id: Job ID
+
+        Returns:
+            The job, or None if unknown or pruned
+        """
+        return self.jobs.get(job_id)
@@ -1,22 +1,162 @@
 """Ingestion pipeline orchestration."""
 
-import json
+import hashlib
+import os
 import time
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    Executor,
+    Future,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set, Tuple
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
+from rag_server.ingest.changes import ChangeDetector, FileState, content_hash, stat_state
 from rag_server.ingest.chunking import TextChunker
 from rag_server.ingest.parsers import FileParser
 from rag_server.ingest.readers import FileReader
 
 logger = get_logger(__name__)
 
+# Callback receiving a batch of chunks and the paths of the (whole) files they cover
+BatchHandler = Callable[[List[Dict[str, Any]], List[str]], None]
+
+# Files submitted to the worker pool ahead of the consumer, per worker
+IN_FLIGHT_PER_WORKER = 4
+
+
+class FileResult:
+    """Outcome of reading, hashing and chunking one file in a worker."""
+
+    def __init__(
+        self,
+        path: str,
+        state: Optional[FileState],
+        size: int,
+        chunks: Optional[List[Dict[str, Any]]],
+        seconds: float,
+    ):
+        """Initialize the result.
+
+        Args:
+            path: File path relative to the root
+            state: Stat and content hash to record (None if the file was
+                empty or unreadable)
+            size: Content length in bytes
+            chunks: Chunks of the file, or None if it is unchanged
+            seconds: Worker time spent on the file
+        """
+        self.path = path
+        self.state = state
+        self.size = size
+        self.chunks = chunks
+        self.seconds = seconds
+
+
+class FileProcessor:
+    """Reads, hashes, parses and chunks single files (runs inside workers)."""
+
+    def __init__(self, settings: Settings):
+        """Initialize the processor.
+
+        Args:
+            settings: Application settings
+        """
+        self.reader = FileReader(settings)
+        self.parser = FileParser()
+        self.chunker = TextChunker(settings)
+
+    def process(
+        self,
+        file_path: Path,
+        root: Path,
+        current: FileState,
+        stored: Optional[FileState],
+    ) -> FileResult:
+        """Process one file whose stat differs from the previous run.
+
+        The file is read once; it is only parsed and chunked if its content
+        hash differs from ``stored``.
+
+        Args:
+            file_path: Absolute file path
+            root: Root directory being indexed
+            current: Stat fields taken before reading (see ``stat_state``)
+            stored: State from the previous run, or None to always chunk
+
+        Returns:
+            File result (``chunks`` is None for unchanged files)
+        """
+        start = time.perf_counter()
+        relative_path = str(file_path.relative_to(root))
+
+        data = self.reader.read_bytes(file_path)
+        if not data:
+            return FileResult(relative_path, None, 0, None, time.perf_counter() - start)
+
+        state = dict(current, hash=content_hash(data))
+        content = data.decode("utf-8", errors="ignore")
+
+        if stored is not None and stored.get("hash") == state["hash"]:
+            return FileResult(relative_path, state, len(data), None, time.perf_counter() - start)
+
+        # Entries from before stat tracking only carry the SHA-256 of the text
+        sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if stored is not None and stored.get("sha256") == sha256:
+            return FileResult(relative_path, state, len(data), None, time.perf_counter() - start)
+
+        # Parse and chunk file
+        parsed_content = self.parser.parse(file_path, content)
+        language = self.parser.get_language(file_path)
+        chunks = [
+            {
+                "content": chunk.content,
+                "start_line": chunk.start_line,
+                "end_line": chunk.end_line,
+                "metadata": {
+                    "path": relative_path,
+                    "language": language,
+                    "sha256": sha256,
+                },
+            }
+            for chunk in self.chunker.chunk(parsed_content, relative_path, language)
+        ]
+        return FileResult(relative_path, state, len(data), chunks, time.perf_counter() - start)
+
+
+# Per-process processor used by ProcessPoolExecutor workers
+_worker_processor: Optional[FileProcessor] = None
+
+
+def _init_worker(settings: Settings) -> None:
+    """Create the processor of a worker process."""
+    global _worker_processor
+    _worker_processor = FileProcessor(settings)
+
+
+def _process_in_worker(
+    file_path: Path, root: Path, current: FileState, stored: Optional[FileState]
+) -> FileResult:
+    """Process a file with the worker process's processor."""
+    assert _worker_processor is not None
+    return _worker_processor.process(file_path, root, current, stored)
+
 
 class IngestionPipeline:
-    """Orchestrates the ingestion pipeline."""
+    """Orchestrates the ingestion pipeline.
+
+    Stages: file discovery and stat comparison (caller thread) ->
+    read/hash/parse/chunk of files whose stat changed (worker pool) ->
+    batching -> ``on_batch`` consumer (typically embedding and indexing).
+    At most ``workers * 4`` files are in flight, so a slow consumer
+    throttles discovery instead of letting chunks pile up in memory.
+    """
 
     def __init__(self, settings: Settings):
         """Initialize the pipeline.
@@ -26,8 +166,16 @@ class IngestionPipeline:
         """
         self.settings = settings
         self.reader = FileReader(settings)
-        self.parser = FileParser()
-        self.chunker = TextChunker(settings)
+        self.processor = FileProcessor(settings)
+        self.changes = ChangeDetector(settings)
+
+    def _create_executor(self, workers: int) -> Executor:
+        """Create the worker pool for the read/hash/chunk stage."""
+        if self.settings.RAG_INGEST_EXECUTOR == "process":
+            return ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(self.settings,)
+            )
+        return ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
 
     def ingest(
         self,
@@ -35,6 +183,9 @@ class IngestionPipeline:
         patterns: Optional[List[str]] = None,
         exclude: Optional[List[str]] = None,
         clean: bool = False,
+        on_batch: Optional[BatchHandler] = None,
+        workers: Optional[int] = None,
+        paths: Optional[Iterable[Path]] = None,
     ) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
         """Run the ingestion pipeline.
 
@@ -43,87 +194,178 @@ class IngestionPipeline:
             patterns: Glob patterns to include
             exclude: Glob patterns to exclude
             clean: Whether to clean existing index
+            on_batch: Consumer for chunk batches; when given, chunks are streamed
+                to it in batches of whole files and not returned
+            workers: Worker pool size (default: RAG_INGEST_WORKERS)
+            paths: Only check these files or directories (e.g. from a file
+                watcher) instead of discovering the whole tree; previously
+                indexed files below them that no longer exist are deleted
 
         Returns:
-            Tuple of (chunks_with_metadata, stats)
+            Tuple of (chunks_with_metadata, stats). ``stats`` also lists the
+            ``changed_paths`` that were re-chunked, the ``deleted_paths`` that
+            were previously indexed but are no longer present, and per-stage
+            throughput counters under ``stages``.
         """
         start_time = time.time()
-        logger.info("starting_ingestion", root=str(root), clean=clean)
-
-        # Load existing hashes for incremental indexing
-        hashes_file = self.settings.RAG_INDEX_DIR / "file_hashes.json"
-        file_hashes: Dict[str, str] = {}
-        if not clean and hashes_file.exists():
-            try:
-                file_hashes = json.loads(hashes_file.read_text())
-                logger.info("loaded_hashes", count=len(file_hashes))
-            except Exception as e:
-                logger.warning("hash_load_error", error=str(e))
+        scanned_at_ns = time.time_ns()
+        workers = workers or self.settings.RAG_INGEST_WORKERS or min(32, (os.cpu_count() or 1) + 4)
+        logger.info("starting_ingestion", root=str(root), clean=clean, workers=workers)
+
+        # Load file states from the previous run for incremental indexing
+        self.changes.load()
+        previous = {} if clean else self.changes.files
+
+        new_states: Dict[str, FileState] = {}
+        if paths is None:
+            files = self.reader.discover_files(root, patterns, exclude)
+        else:
+            paths = list(paths)
+            files = self.reader.filter_files(root, paths)
+            # Files outside the given paths keep their state
+            touched = {str(path.relative_to(root)) for path in paths}
+            if "." not in touched:
+                prefixes = tuple(path + os.sep for path in touched)
+                new_states = {
+                    path: state
+                    for path, state in previous.items()
+                    if path not in touched and not path.startswith(prefixes)
+                }
 
         all_chunks: List[Dict[str, Any]] = []
-        files_indexed = 0
-        new_hashes: Dict[str, str] = {}
-
-        # Discover and process files
-        for file_path in self.reader.discover_files(root, patterns, exclude):
-            try:
-                # Read file
-                content, sha256 = self.reader.read_file(file_path)
-                if not content:
+        batch: List[Dict[str, Any]] = []
+        batch_paths: List[str] = []
+        changed_paths: List[str] = []
+        counters = {
+            "discovered": 0,
+            "unchanged": 0,
+            "processed": 0,
+            "bytes": 0,
+            "worker_s": 0.0,
+            "chunks": 0,
+            "batches": 0,
+            "consumer_s": 0.0,
+        }
+
+        def flush_batch() -> None:
+            if not batch:
+                return
+            consumer_start = time.perf_counter()
+            if on_batch is not None:
+                on_batch(list(batch), list(batch_paths))
+            else:
+                all_chunks.extend(batch)
+            counters["consumer_s"] += time.perf_counter() - consumer_start
+            counters["batches"] += 1
+            batch.clear()
+            batch_paths.clear()
+
+        def collect(
+            done: Set["Future[FileResult]"], pending: Dict["Future[FileResult]", Path]
+        ) -> None:
+            for future in done:
+                file_path = pending.pop(future)
+                try:
+                    result = future.result()
+                except Exception as e:
+                    logger.error("file_processing_error", path=str(file_path), error=str(e))
+                    continue
+
+                counters["processed"] += 1
+                counters["bytes"] += result.size
+                counters["worker_s"] += result.seconds
+                if result.state is None:
+                    continue
+
+                new_states[result.path] = result.state
+                if result.chunks is None:
+                    logger.debug("skipping_unchanged", path=result.path)
                     continue
 
-                relative_path = str(file_path.relative_to(root))
+                changed_paths.append(result.path)
+                counters["chunks"] += len(result.chunks)
+                batch.extend(result.chunks)
+                batch_paths.append(result.path)
+                logger.debug("indexed_file", path=result.path, chunks=len(result.chunks))
+                if len(batch) >= self.settings.RAG_INGEST_BATCH_CHUNKS:
+                    flush_batch()
+
+        # Discover files and keep a bounded number of them in flight
+        max_in_flight = workers * IN_FLIGHT_PER_WORKER
+        in_flight: Dict["Future[FileResult]", Path] = {}
+        root_prefix = len(str(root / "x")) - 1  # discovered paths are joined onto root
+        with self._create_executor(workers) as executor:
+            process = (
+                _process_in_worker
+                if isinstance(executor, ProcessPoolExecutor)
+                else self.processor.process
+            )
+            for file_path in files:
+                counters["discovered"] += 1
+                relative_path = str(file_path)[root_prefix:]
+                try:
+                    current = stat_state(file_path.stat())
+                except OSError as e:
+                    logger.warning("file_stat_error", path=str(file_path), error=str(e))
+                    continue
 
-                # Check if reindexing needed
-                if not clean and not self.reader.should_reindex(
-                    file_path, file_hashes.get(relative_path)
-                ):
-                    logger.debug("skipping_unchanged", path=relative_path)
-                    new_hashes[relative_path] = file_hashes[relative_path]
+                # Unchanged stat: keep the stored state without reading the file
+                stored = previous.get(relative_path)
+                if stored is not None and self.changes.unchanged(relative_path, current):
+                    new_states[relative_path] = stored
+                    counters["unchanged"] += 1
                     continue
 
-                # Parse file
-                parsed_content = self.parser.parse(file_path, content)
-                language = self.parser.get_language(file_path)
-
-                # Chunk content
-                chunks = self.chunker.chunk(parsed_content, relative_path, language)
-
-                # Convert to dicts for storage
-                for chunk in chunks:
-                    all_chunks.append(
-                        {
-                            "content": chunk.content,
-                            "start_line": chunk.start_line,
-                            "end_line": chunk.end_line,
-                            "metadata": {
-                                "path": relative_path,
-                                "language": language,
-                                "sha256": sha256,
-                            },
-                        }
-                    )
-
-                new_hashes[relative_path] = sha256
-                files_indexed += 1
-                logger.debug("indexed_file", path=relative_path, chunks=len(chunks))
-
-            except Exception as e:
-                logger.error("file_processing_error", path=str(file_path), error=str(e))
-
-        # Save new hashes
-        try:
-            hashes_file.write_text(json.dumps(new_hashes, indent=2))
-        except Exception as e:
-            logger.warning("hash_save_error", error=str(e))
+                if len(in_flight) >= max_in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    collect(done, in_flight)
+                future = executor.submit(process, file_path, root, current, stored)
+                in_flight[future] = file_path
+
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                collect(done, in_flight)
+        flush_batch()
+
+        self.changes.save(new_states, scanned_at_ns)
+        deleted_paths = [path for path in previous if path not in new_states]
 
         duration = time.time() - start_time
         stats = {
-            "files_indexed": files_indexed,
-            "chunks": len(all_chunks),
+            "files_indexed": len(changed_paths),
+            "chunks": counters["chunks"],
             "duration_s": duration,
             "updated_at": datetime.now(timezone.utc).isoformat(),
         }
+        stages = self._stage_stats(counters, duration, workers)
 
-        logger.info("ingestion_complete", **stats)
+        logger.info("ingestion_complete", deleted_files=len(deleted_paths), **stats, **stages)
+        stats["stages"] = stages
+        stats["changed_paths"] = changed_paths
+        stats["deleted_paths"] = deleted_paths
         return all_chunks, stats
+
+    @staticmethod
+    def _stage_stats(counters: Dict[str, Any], duration: float, workers: int) -> Dict[str, Any]:
+        """Summarize per-stage throughput counters.
+
+        Args:
+            counters: Raw counters collected during ingestion
+            duration: Wall-clock duration of the run
+            workers: Worker pool size
+
+        Returns:
+            Flat dict of counters and rates
+        """
+        wall = max(duration, 1e-9)
+        return {
+            "files_discovered": counters["discovered"],
+            "files_unchanged": counters["unchanged"],
+            "files_processed": counters["processed"],
+            "files_per_s": round(counters["processed"] / wall, 1),
+            "read_mb_per_s": round(counters["bytes"] / 1e6 / wall, 2),
+            "worker_busy": round(counters["worker_s"] / (wall * workers), 3),
+            "chunk_batches": counters["batches"],
+            "chunks_per_s": round(counters["chunks"] / wall, 1),
+            "consumer_s": round(counters["consumer_s"], 3),
+        }
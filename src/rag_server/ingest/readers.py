@@ -1,8 +1,10 @@
 """File discovery and reading utilities."""
 
+import fnmatch
 import hashlib
-from pathlib import Path
-from typing import Iterator, List, Optional, Tuple
+import re
+from pathlib import Path, PurePath
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
@@ -10,6 +12,39 @@ from rag_server.core.logging import get_logger
 logger = get_logger(__name__)
 
 
+class _GlobMatcher:
+    """Precompiled equivalent of ``any(path.match(p) for p in patterns)``.
+
+    ``PurePath.match`` re-parses the path and pattern on every call, which
+    dominates discovery time once unchanged files are skipped by stat.
+    Single-component patterns (the common case) are folded into one regex
+    tested against the file name.
+    """
+
+    def __init__(self, patterns: Sequence[str]):
+        names: List[str] = []
+        self.multipart: List[List[Callable[[str], Optional["re.Match[str]"]]]] = []
+        for pattern in patterns:
+            pure = PurePath(pattern)
+            if not pattern or pure.is_absolute():
+                continue  # never matches a relative path
+            parts = [fnmatch.translate(part) for part in reversed(pure.parts)]
+            if len(parts) == 1:
+                names.extend(parts)
+            else:
+                self.multipart.append([re.compile(part).match for part in parts])
+        self.name = re.compile("|".join(names)).match if names else None
+
+    def match(self, parts: Sequence[str]) -> bool:
+        if self.name is not None and self.name(parts[-1]):
+            return True
+        return any(
+            len(parts) >= len(matchers)
+            and all(match(part) for match, part in zip(matchers, reversed(parts)))
+            for matchers in self.multipart
+        )
+
+
 class FileReader:
     """Handles file discovery and reading."""
 
@@ -20,6 +55,49 @@ class FileReader:
             settings: Application settings
         """
         self.settings = settings
+        self._default_excluded = _GlobMatcher(settings.exclude_globs)
+
+    def is_excluded(self, root: Path, path: Path) -> bool:
+        """Check a file or directory against the default exclusions.
+
+        Args:
+            root: Root directory being indexed
+            path: Path under ``root``
+
+        Returns:
+            True if the path matches an exclude glob
+        """
+        parts = path.relative_to(root).parts
+        return bool(parts) and self._default_excluded.match(parts)
+
+    def filter_files(self, root: Path, paths: Iterable[Path]) -> Iterator[Path]:
+        """Select the indexable files among specific paths.
+
+        Directories are expanded to the files below them; missing paths are
+        skipped (their deletion is handled by the caller).
+
+        Args:
+            root: Root directory being indexed
+            paths: Changed files or directories under ``root``
+
+        Yields:
+            Paths to indexable files
+        """
+        allowed_extensions = set(self.settings.allowed_filetypes)
+        seen: Set[Path] = set()
+        for path in paths:
+            if path.is_dir():
+                relative = path.relative_to(root)
+                patterns = [str(relative / "**" / "*")] if relative.parts else None
+                files: Iterable[Path] = self.discover_files(root, patterns)
+            elif path.suffix in allowed_extensions and path.is_file():
+                files = [] if self.is_excluded(root, path) else [path]
+            else:
+                continue
+            for file_path in files:
+                if file_path not in seen:
+                    seen.add(file_path)
+                    yield file_path
 
     def discover_files(
         self,
@@ -39,11 +117,9 @@ class FileReader:
         """
         if patterns is None:
             patterns = ["**/*"]
-        if exclude is None:
-            exclude = []
-
         # Add default exclusions from settings
-        exclude.extend(self.settings.exclude_globs)
+        exclude = list(exclude or []) + self.settings.exclude_globs
+        excluded = _GlobMatcher(exclude)
         allowed_extensions = set(self.settings.allowed_filetypes)
 
         logger.info(
@@ -56,16 +132,12 @@ class FileReader:
         discovered = 0
         for pattern in patterns:
             for path in root.glob(pattern):
-                if not path.is_file():
+                # Check file extension
+                if path.suffix not in allowed_extensions or not path.is_file():
                     continue
 
                 # Check exclusions
-                relative = path.relative_to(root)
-                if any(relative.match(ex) for ex in exclude):
-                    continue
-
-                # Check file extension
-                if path.suffix not in allowed_extensions:
+                if excluded.match(path.relative_to(root).parts):
                     continue
 
                 discovered += 1
@@ -73,35 +145,34 @@ class FileReader:
 
         logger.info("discovery_complete", files_found=discovered)
 
-    def read_file(self, path: Path) -> Tuple[str, str]:
-        """Read file content and compute hash.
+    def read_bytes(self, path: Path) -> Optional[bytes]:
+        """Read raw file content.
 
         Args:
             path: Path to file
 
         Returns:
-            Tuple of (content, sha256_hash)
+            File bytes, or None if the file could not be read
         """
         try:
-            content = path.read_text(encoding="utf-8", errors="ignore")
-            sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
-            return content, sha256
+            return path.read_bytes()
         except Exception as e:
             logger.warning("file_read_error", path=str(path), error=str(e))
-            return "", ""
+            return None
 
-    def should_reindex(self, path: Path, stored_hash: Optional[str]) -> bool:
-        """Check if file should be reindexed based on content hash.
+    def read_file(self, path: Path) -> Tuple[str, str]:
+        """Read file content and compute hash.
 
         Args:
             path: Path to file
-            stored_hash: Previously stored hash
 
         Returns:
-            True if file should be reindexed
+            Tuple of (content, sha256_hash)
         """
-        if stored_hash is None:
-            return True
-
-        _, current_hash = self.read_file(path)
-        return current_hash != stored_hash
+        try:
+            content = path.read_text(encoding="utf-8", errors="ignore")
+            sha256 = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            return content, sha256
+        except Exception as e:
+            logger.warning("file_read_error", path=str(path), error=str(e))
+            return "", ""
@@ -0,0 +1,367 @@
+"""Filesystem watcher that keeps the index up to date."""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.ingest.readers import FileReader
+
+logger = get_logger(__name__)
+
+# Receives a batch of changed files or directories (absolute paths)
+ChangeHandler = Callable[[List[Path]], None]
+
+# inotify(7) constants
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF
+EVENT_HEADER = struct.Struct("iIII")
+
+
+class InotifyBackend:
+    """Linux inotify watches on every (non-excluded) directory of the tree."""
+
+    name = "inotify"
+
+    def __init__(self, root: Path, reader: FileReader):
+        """Create the inotify instance and watch the tree.
+
+        Args:
+            root: Directory to watch
+            reader: Reader providing the exclusion rules
+
+        Raises:
+            OSError: If inotify is unavailable or the watch limit is reached
+        """
+        self.root = root
+        self.reader = reader
+        libc_name = ctypes.util.find_library("c")
+        if libc_name is None:
+            raise OSError("libc not found")
+        self.libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self.libc, "inotify_init1"):
+            raise OSError("inotify is not supported on this platform")
+
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches: Dict[int, Path] = {}
+        try:
+            self._watch_tree(root)
+        except OSError:
+            os.close(self.fd)
+            raise
+
+    def _watch_tree(self, top: Path) -> None:
+        """Add watches for a directory and its non-excluded subdirectories."""
+        for directory, subdirs, _ in os.walk(top):
+            path = Path(directory)
+            if path != self.root and self.reader.is_excluded(self.root, path):
+                subdirs[:] = []
+                continue
+            wd = self.libc.inotify_add_watch(
+                self.fd, os.fsencode(directory), WATCH_MASK | IN_ONLYDIR
+            )
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {directory}")
+            self.watches[wd] = path
+
+    def poll(self, timeout: float) -> List[Path]:
+        """Wait for events and return the paths they concern.
+
+        Args:
+            timeout: Seconds to wait for the first event
+
+        Returns:
+            Changed paths (a directory stands for everything below it)
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+
+        changed: List[Path] = []
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                raw_name = data[offset + EVENT_HEADER.size : offset + EVENT_HEADER.size + length]
+                offset += EVENT_HEADER.size + length
+                name = os.fsdecode(raw_name.rstrip(b"\0"))
+
+                if mask & IN_Q_OVERFLOW:
+                    # Events were dropped: re-check the whole tree
+                    logger.warning("watcher_queue_overflow")
+                    changed.append(self.root)
+                    continue
+                if mask & IN_IGNORED:
+                    self.watches.pop(wd, None)
+                    continue
+
+                directory = self.watches.get(wd)
+                if directory is None:
+                    continue
+                path = directory / name if name else directory
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # New subtree: watch it, then re-check files created before the watch
+                    try:
+                        self._watch_tree(path)
+                    except OSError as e:
+                        logger.warning("watcher_add_failed", path=str(path), error=str(e))
+                changed.append(path)
+        return changed
+
+    def close(self) -> None:
+        """Release the inotify instance."""
+        os.close(self.fd)
+
+
+class PollingBackend:
+    """Periodic stat scan of the tree, for platforms without inotify."""
+
+    name = "polling"
+
+    def __init__(self, root: Path, reader: FileReader, interval: float):
+        """Take the initial snapshot.
+
+        Args:
+            root: Directory to watch
+            reader: Reader providing the exclusion rules
+            interval: Seconds between scans
+        """
+        self.root = root
+        self.reader = reader
+        self.interval = interval
+        self.snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int, int]]:
+        """Stat every file of the tree."""
+        snapshot: Dict[Path, Tuple[int, int, int]] = {}
+        for directory, subdirs, files in os.walk(self.root):
+            path = Path(directory)
+            if path != self.root and self.reader.is_excluded(self.root, path):
+                subdirs[:] = []
+                continue
+            for name in files:
+                try:
+                    stat = os.stat(os.path.join(directory, name))
+                except OSError:
+                    continue
+                snapshot[path / name] = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+        return snapshot
+
+    def poll(self, timeout: float) -> List[Path]:
+        """Sleep for the scan interval, then diff against the last scan.
+
+        Args:
+            timeout: Upper bound on the time to wait
+
+        Returns:
+            Added, modified and deleted files
+        """
+        time.sleep(min(timeout, self.interval))
+        snapshot = self._scan()
+        changed = [path for path, stat in snapshot.items() if self.snapshot.get(path) != stat]
+        changed.extend(path for path in self.snapshot if path not in snapshot)
+        self.snapshot = snapshot
+        return changed
+
+    def close(self) -> None:
+        """Nothing to release."""
+
+
+class IndexWatcher:
+    """Watches a tree and feeds debounced batches of changed paths to a handler.
+
+    A backend thread collects change events into a pending set. A dispatch
+    thread hands the pending paths to ``handler`` once no event arrived for
+    ``RAG_WATCH_DEBOUNCE_MS``, or once the oldest pending event is
+    ``RAG_WATCH_MAX_DELAY_S`` old under a steady stream of changes. Events
+    that arrive while a batch is being indexed form the next batch.
+    """
+
+    def __init__(self, settings: Settings, root: Path, handler: ChangeHandler):
+        """Initialize the watcher (call ``start`` to begin watching).
+
+        Args:
+            settings: Application settings
+            root: Directory to watch
+            handler: Called from the dispatch thread with each batch
+        """
+        self.settings = settings
+        self.root = root.resolve()
+        self.handler = handler
+        self.reader = FileReader(settings)
+        self.debounce = settings.RAG_WATCH_DEBOUNCE_MS / 1000
+        self.max_delay = settings.RAG_WATCH_MAX_DELAY_S
+
+        self.backend: Optional[Any] = None
+        self._pending: Dict[Path, float] = {}
+        self._last_event = 0.0
+        self._dispatched_since: Optional[float] = None
+        self._cond = threading.Condition()
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._metrics: Dict[str, Any] = {
+            "batches": 0,
+            "paths_dispatched": 0,
+            "errors": 0,
+            "in_progress": 0,
+            "last_batch_s": 0.0,
+            "last_lag_s": 0.0,
+        }
+
+    def _create_backend(self) -> Any:
+        """Create the configured backend, falling back to polling."""
+        backend = self.settings.RAG_WATCH_BACKEND
+        if backend in ("auto", "inotify"):
+            try:
+                return InotifyBackend(self.root, self.reader)
+            except (OSError, AttributeError) as e:
+                if backend == "inotify":
+                    raise
+                logger.warning("inotify_unavailable", error=str(e))
+        return PollingBackend(self.root, self.reader, self.settings.RAG_WATCH_POLL_INTERVAL_S)
+
+    def start(self, initial_scan: bool = True) -> None:
+        """Start the backend and dispatch threads.
+
+        Args:
+            initial_scan: Queue the whole root first, so changes made while the
+                server was down are picked up (unchanged files only cost a stat)
+        """
+        self.backend = self._create_backend()
+        if initial_scan:
+            self.record([self.root])
+        for target, name in ((self._watch_loop, "watcher"), (self._dispatch_loop, "watcher-dispatch")):
+            thread = threading.Thread(target=target, name=name, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logger.info("watcher_started", root=str(self.root), backend=self.backend.name)
+
+    def stop(self) -> None:
+        """Stop watching; a batch being indexed is allowed to finish."""
+        self._stop.set()
+        with self._cond:
+            self._cond.notify_all()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+        if self.backend is not None:
+            self.backend.close()
+        logger.info("watcher_stopped")
+
+    def record(self, paths: Iterable[Path]) -> None:
+        """Queue changed paths for the next batch.
+
+        Args:
+            paths: Changed files or directories
+        """
+        now = time.monotonic()
+        with self._cond:
+            for path in paths:
+                self._pending.setdefault(path, now)
+                self._last_event = now
+            self._cond.notify_all()
+
+    def _watch_loop(self) -> None:
+        """Collect backend events until stopped."""
+        assert self.backend is not None
+        while not self._stop.is_set():
+            try:
+                changed = self.backend.poll(timeout=0.5)
+            except Exception as e:
+                logger.error("watcher_backend_error", error=str(e))
+                self._stop.wait(1.0)
+                continue
+            if changed:
+                self.record(changed)
+
+    def _next_batch(self) -> Optional[Dict[Path, float]]:
+        """Wait until the pending set is due, then take it (None when stopped)."""
+        with self._cond:
+            while not self._stop.is_set():
+                if self._pending:
+                    now = time.monotonic()
+                    quiet_until = self._last_event + self.debounce
+                    deadline = min(self._pending.values()) + self.max_delay
+                    due = min(quiet_until, deadline)
+                    if now >= due:
+                        batch, self._pending = self._pending, {}
+                        self._metrics["in_progress"] = len(batch)
+                        self._dispatched_since = min(batch.values())
+                        return batch
+                    self._cond.wait(due - now)
+                else:
+                    self._cond.wait()
+            return None
+
+    def _dispatch_loop(self) -> None:
+        """Hand due batches to the handler until stopped."""
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+            start = time.monotonic()
+            try:
+                self.handler(sorted(batch))
+            except Exception as e:
+                self._metrics["errors"] += 1
+                logger.error("watcher_batch_error", paths=len(batch), error=str(e))
+            end = time.monotonic()
+            with self._cond:
+                self._dispatched_since = None
+            self._metrics.update(
+                batches=self._metrics["batches"] + 1,
+                paths_dispatched=self._metrics["paths_dispatched"] + len(batch),
+                in_progress=0,
+                last_batch_s=round(end - start, 3),
+                last_lag_s=round(end - min(batch.values()), 3),
+            )
+            logger.info(
+                "watcher_batch_indexed",
+                paths=len(batch),
+                batch_s=self._metrics["last_batch_s"],
+                lag_s=self._metrics["last_lag_s"],
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        """Report queue depth and indexing lag.
+
+        Returns:
+            ``queue_depth`` (paths waiting, including the batch being indexed),
+            ``lag_s`` (age of the oldest unindexed change), and counters of
+            the batches dispatched so far
+        """
+        now = time.monotonic()
+        with self._cond:
+            queued = list(self._pending.values())
+            if self._dispatched_since is not None:
+                queued.append(self._dispatched_since)
+            depth = len(self._pending) + self._metrics["in_progress"]
+        return {
+            "backend": self.backend.name if self.backend is not None else None,
+            "root": str(self.root),
+            "queue_depth": depth,
+            "lag_s": round(now - min(queued), 3) if queued else 0.0,
+            **self._metrics,
+        }
@@ -0,0 +1,177 @@
+"""Token-budgeted packing of retrieved matches into prompt context."""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple
+
+from rag_server.core.logging import get_logger
+from rag_server.core.schemas import Match
+
+if TYPE_CHECKING:
+    import tiktoken
+
+logger = get_logger(__name__)
+
+# Tokenizer for models tiktoken does not know (e.g. Ollama ones): an estimate
+FALLBACK_ENCODING = "cl100k_base"
+
+# Characters per token assumed when no tokenizer can be loaded
+CHARS_PER_TOKEN = 4
+
+# A block is cut to fit the remaining budget only if this many tokens remain
+MIN_PARTIAL_TOKENS = 48
+
+
+@lru_cache(maxsize=8)
+def _encoding(model: str) -> Optional["tiktoken.Encoding"]:
+    """Load the tokenizer of a model, once per process."""
+    import tiktoken
+
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding(FALLBACK_ENCODING)
+    except Exception as e:
+        # tiktoken downloads its vocabularies on first use; offline, estimate
+        logger.warning("tokenizer_unavailable", model=model, error=str(e))
+        return None
+
+
+def tokenizer_name(model: str) -> str:
+    """Name the tokenizer ``count_tokens`` uses for a model."""
+    encoding = _encoding(model)
+    return encoding.name if encoding is not None else f"chars/{CHARS_PER_TOKEN}"
+
+
+def count_tokens(text: str, model: str) -> int:
+    """Count the tokens of a text for a model.
+
+    Args:
+        text: Text to count
+        model: LLM model name (selects the tiktoken encoding)
+
+    Returns:
+        Token count (estimated from length if no tokenizer is available)
+    """
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def format_block(number: int, path: str, start_line: int, end_line: int, text: str) -> str:
+    """Format one context block of the grounding prompt."""
+    return f"[{number}] File: {path} (lines {start_line}-{end_line})\n{text}\n"
+
+
+def _merge_segments(matches: List[Match]) -> List[Tuple[str, int, List[str]]]:
+    """Merge overlapping and adjacent snippets of the same file.
+
+    Snippets may be truncated, so each covers only the lines it holds; a
+    gap between the lines held splits a file into separate segments.
+
+    Returns:
+        ``(path, start_line, lines)`` per segment, ordered by the rank of
+        the best match it contains
+    """
+    file_lines: Dict[str, Dict[int, str]] = {}
+    best_rank: Dict[Tuple[str, int], int] = {}
+    for match in matches:
+        lines = file_lines.setdefault(match.path, {})
+        for offset, text in enumerate(match.snippet.split("\n")):
+            line = match.start_line + offset
+            if line > match.end_line:
+                break
+            # A truncated snippet may end mid-line; keep the longest copy
+            if line not in lines or len(text) > len(lines[line]):
+                lines[line] = text
+
+    segments: List[Tuple[str, int, List[str]]] = []
+    for path, lines in file_lines.items():
+        start = previous = -1
+        for line in sorted(lines):
+            if line != previous + 1:
+                start = line
+                segments.append((path, start, []))
+            segments[-1][2].append(lines[line])
+            previous = line
+
+    for rank, match in enumerate(matches):
+        for path, start, segment_lines in segments:
+            if path == match.path and start <= match.start_line < start + len(segment_lines):
+                best_rank.setdefault((path, start), rank)
+    return sorted(segments, key=lambda s: best_rank.get((s[0], s[1]), len(matches)))
+
+
+def pack_context(matches: List[Match], budget: int, model: str) -> Tuple[str, Dict[str, Any]]:
+    """Pack matches into at most ``budget`` tokens of prompt context.
+
+    Overlapping or adjacent line ranges of a file become one block, so
+    lines shared by overlapping chunks are sent once. Blocks are added in
+    order of their best match's rank until the budget is spent; the block
+    that no longer fits is cut at a line boundary if enough budget is left,
+    and smaller lower-ranked blocks still fill what remains.
+
+    Args:
+        matches: Retrieved matches, best first
+        budget: Maximum context tokens
+        model: LLM model name (selects the tokenizer)
+
+    Returns:
+        ``(context, stats)``; stats hold the context ``tokens``, the
+        ``unpacked_tokens`` of one block per match, the block counts and
+        the ``tokenizer`` used
+    """
+    unpacked = "\n".join(
+        format_block(i, m.path, m.start_line, m.end_line, m.snippet)
+        for i, m in enumerate(matches, start=1)
+    )
+
+    blocks: List[str] = []
+    used = truncated = dropped = 0
+    segments = _merge_segments(matches)
+    for path, start, lines in segments:
+        end = start + len(lines) - 1
+        block = format_block(len(blocks) + 1, path, start, end, "\n".join(lines))
+        # Blocks are joined with a blank line, which costs about a token
+        tokens = count_tokens(block, model) + 1
+        remaining = budget - used
+        if tokens > remaining:
+            if remaining < MIN_PARTIAL_TOKENS:
+                dropped += 1
+                continue
+            # Keep the longest prefix of lines that fits
+            low, high = 0, len(lines) - 1
+            while low < high:
+                middle = (low + high + 1) // 2
+                candidate = format_block(
+                    len(blocks) + 1, path, start, start + middle - 1, "\n".join(lines[:middle])
+                )
+                if count_tokens(candidate, model) + 1 <= remaining:
+                    low = middle
+                else:
+                    high = middle - 1
+            if low == 0:
+                dropped += 1
+                continue
+            block = format_block(
+                len(blocks) + 1, path, start, start + low - 1, "\n".join(lines[:low])
+            )
+            tokens = count_tokens(block, model) + 1
+            truncated += 1
+        blocks.append(block)
+        used += tokens
+
+    context = "\n".join(blocks)
+    stats = {
+        "tokens": count_tokens(context, model),
+        "unpacked_tokens": count_tokens(unpacked, model),
+        "budget": budget,
+        "matches": len(matches),
+        "blocks": len(blocks),
+        "merged": len(matches) - len(segments),
+        "truncated": truncated,
+        "dropped": dropped,
+        "tokenizer": tokenizer_name(model),
+    }
+    return context, stats
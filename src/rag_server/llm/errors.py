@@ -0,0 +1,5 @@
+"""Errors raised by the LLM clients."""
+
+
+class LLMGenerationError(RuntimeError):
+    """Raised when the LLM provider fails to generate an answer."""
@@ -1,15 +1,23 @@
 """Ollama client for local LLM inference."""
 
-from langchain_community.llms import Ollama
+import asyncio
+import math
+from typing import AsyncIterator
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
+from rag_server.llm.errors import LLMGenerationError
 
 logger = get_logger(__name__)
 
 
 class OllamaClient:
-    """Client for Ollama local LLM using LangChain (with LangSmith tracing)."""
+    """Client for Ollama local LLM using LangChain (with LangSmith tracing).
+
+    Meant to live as long as the app. A local Ollama serves few generations
+    at once, so at most ``RAG_OLLAMA_CONCURRENCY`` calls are sent; further
+    ones wait for a slot instead of piling up in Ollama's queue.
+    """
 
     def __init__(self, settings: Settings):
         """Initialize the Ollama client.
@@ -17,12 +25,17 @@ class OllamaClient:
         Args:
             settings: Application settings
         """
+        # Deferred: langchain_community is slow to import
+        from langchain_community.llms import Ollama
+
         self.settings = settings
         self.client = Ollama(
             base_url=settings.OLLAMA_ENDPOINT,
             model=settings.LLM_MODEL,
             temperature=0.1,
+            timeout=math.ceil(settings.RAG_OLLAMA_TIMEOUT_S),
         )
+        self._slots = asyncio.Semaphore(settings.RAG_OLLAMA_CONCURRENCY)
         logger.info(
             "ollama_client_initialized", endpoint=settings.OLLAMA_ENDPOINT, model=settings.LLM_MODEL
         )
@@ -36,13 +49,42 @@ class OllamaClient:
 
         Returns:
             Generated text
+
+        Raises:
+            LLMGenerationError: If the provider call fails
         """
         try:
-            # LangChain automatically traces this to LangSmith
-            response = await self.client.ainvoke(prompt, config={"max_tokens": max_tokens})
+            async with self._slots:
+                # LangChain automatically traces this to LangSmith
+                response = await self.client.ainvoke(prompt, config={"max_tokens": max_tokens})
 
             return response if isinstance(response, str) else str(response)
 
         except Exception as e:
             logger.error("ollama_generation_error", error=str(e))
-            return "Error generating response"
+            raise LLMGenerationError(str(e)) from e
+
+    async def astream(self, prompt: str, max_tokens: int = 512) -> AsyncIterator[str]:
+        """Stream a response from Ollama via LangChain as it is generated.
+
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+
+        Yields:
+            Text fragments, in order
+
+        Raises:
+            LLMGenerationError: If the provider call fails
+        """
+        try:
+            async with self._slots:
+                async for chunk in self.client.astream(prompt, config={"max_tokens": max_tokens}):
+                    if chunk:
+                        yield chunk
+        except Exception as e:
+            logger.error("ollama_stream_error", error=str(e))
+            raise LLMGenerationError(str(e)) from e
+
+    async def aclose(self) -> None:
+        """Release held resources (LangChain's Ollama opens a session per call)."""
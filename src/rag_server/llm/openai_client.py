@@ -1,18 +1,28 @@
 """OpenAI client for LLM-based answering."""
 
-from typing import Optional
-
-from langchain_openai import ChatOpenAI
-from langchain_core.messages import HumanMessage
+import asyncio
+from typing import TYPE_CHECKING, AsyncIterator, Optional
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
+from rag_server.llm.errors import LLMGenerationError
+
+if TYPE_CHECKING:
+    import httpx
+    from langchain_openai import ChatOpenAI
 
 logger = get_logger(__name__)
 
 
 class OpenAIClient:
-    """Client for OpenAI API using LangChain (with LangSmith tracing)."""
+    """Client for OpenAI API using LangChain (with LangSmith tracing).
+
+    Meant to live as long as the app: the LangChain client and its
+    keep-alive HTTP connection pool are created once, by the first request
+    (concurrent first requests wait for it), and shared by all requests. At
+    most ``RAG_OPENAI_CONCURRENCY`` calls run at once;
+    further ones wait for a slot.
+    """
 
     def __init__(self, settings: Settings):
         """Initialize the OpenAI client.
@@ -21,21 +31,49 @@ class OpenAIClient:
             settings: Application settings
         """
         self.settings = settings
-        self.client: Optional[ChatOpenAI] = None
+        self.client: Optional["ChatOpenAI"] = None
+        self._http_client: Optional["httpx.AsyncClient"] = None
+        self._slots = asyncio.Semaphore(settings.RAG_OPENAI_CONCURRENCY)
+        self._init_lock = asyncio.Lock()
 
     def initialize(self) -> None:
         """Initialize the LangChain OpenAI client."""
         if not self.settings.OPENAI_API_KEY:
             raise ValueError("OPENAI_API_KEY not configured")
 
+        # Deferred: langchain_openai takes over a second to import
+        import httpx
+        from langchain_openai import ChatOpenAI
+
+        # One pool, sized to the concurrency limit, so connections are reused
+        concurrency = self.settings.RAG_OPENAI_CONCURRENCY
+        self._http_client = httpx.AsyncClient(
+            limits=httpx.Limits(
+                max_connections=concurrency, max_keepalive_connections=concurrency
+            ),
+            timeout=self.settings.RAG_OPENAI_TIMEOUT_S,
+        )
         self.client = ChatOpenAI(
             model=self.settings.LLM_MODEL,
             api_key=self.settings.OPENAI_API_KEY,
+            base_url=self.settings.OPENAI_BASE_URL or None,
+            timeout=self.settings.RAG_OPENAI_TIMEOUT_S,
+            http_async_client=self._http_client,
             temperature=0.1,
         )
-        logger.info("openai_client_initialized", model=self.settings.LLM_MODEL)
+        logger.info(
+            "openai_client_initialized", model=self.settings.LLM_MODEL, concurrency=concurrency
+        )
 
-    def generate(self, prompt: str, max_tokens: int = 512) -> str:
+    async def _ensure_client(self) -> "ChatOpenAI":
+        """Initialize the client on first use, once even if called concurrently."""
+        async with self._init_lock:
+            if self.client is None:
+                self.initialize()
+        assert self.client is not None
+        return self.client
+
+    async def generate(self, prompt: str, max_tokens: int = 512) -> str:
         """Generate a response using OpenAI via LangChain.
 
         Args:
@@ -44,20 +82,56 @@ class OpenAIClient:
 
         Returns:
             Generated text
-        """
-        if self.client is None:
-            self.initialize()
 
-        assert self.client is not None
+        Raises:
+            LLMGenerationError: If the client cannot be created or the provider call fails
+        """
+        from langchain_core.messages import HumanMessage
 
         try:
-            # LangChain automatically traces this to LangSmith
-            response = self.client.invoke(
-                [HumanMessage(content=prompt)], config={"max_tokens": max_tokens}
-            )
+            client = await self._ensure_client()
+            async with self._slots:
+                # LangChain automatically traces this to LangSmith
+                response = await client.ainvoke(
+                    [HumanMessage(content=prompt)], max_tokens=max_tokens
+                )
 
-            return response.content if response.content else ""
+            return str(response.content) if response.content else ""
 
         except Exception as e:
             logger.error("openai_generation_error", error=str(e))
-            return "Error generating response"
+            raise LLMGenerationError(str(e)) from e
+
+    async def astream(self, prompt: str, max_tokens: int = 512) -> AsyncIterator[str]:
+        """Stream a response from OpenAI via LangChain as it is generated.
+
+        Args:
+            prompt: Input prompt
+            max_tokens: Maximum tokens to generate
+
+        Yields:
+            Text fragments, in order
+
+        Raises:
+            LLMGenerationError: If the client cannot be created or the provider call fails
+        """
+        from langchain_core.messages import HumanMessage
+
+        try:
+            client = await self._ensure_client()
+            async with self._slots:
+                async for chunk in client.astream(
+                    [HumanMessage(content=prompt)], max_tokens=max_tokens
+                ):
+                    if chunk.content:
+                        yield str(chunk.content)
+        except Exception as e:
+            logger.error("openai_stream_error", error=str(e))
+            raise LLMGenerationError(str(e)) from e
+
+    async def aclose(self) -> None:
+        """Close the pooled HTTP connections."""
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+            self.client = None
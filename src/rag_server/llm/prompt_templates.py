@@ -1,31 +1,12 @@
 """Prompt templates for LLM-based answering."""
 
-from typing import List
+from typing import Any, Dict, List, Tuple
 
+from rag_server.core.config import Settings
 from rag_server.core.schemas import Match
+from rag_server.llm.context_packer import count_tokens, pack_context
 
-
-def build_grounding_prompt(question: str, matches: List[Match]) -> str:
-    """Build a grounded QA prompt from matches.
-
-    Args:
-        question: User question
-        matches: Retrieved context matches
-
-    Returns:
-        Formatted prompt
-    """
-    # Build context from matches
-    context_parts: List[str] = []
-    for i, match in enumerate(matches, start=1):
-        context_parts.append(
-            f"[{i}] File: {match.path} (lines {match.start_line}-{match.end_line})\n"
-            f"{match.snippet}\n"
-        )
-
-    context = "\n".join(context_parts)
-
-    prompt = f"""You are a precise code assistant. Use ONLY the provided context to answer the question.
+GROUNDING_TEMPLATE = """You are a precise code assistant. Use ONLY the provided context to answer the question.
 If you cannot answer based on the context, say "I don't have enough information to answer that."
 Always include file:line citations in your answer.
 
@@ -38,4 +19,36 @@ Context (ranked snippets with file and line numbers):
 Answer with a concise explanation. End with "Sources:" and list each citation as "- path:start_line-end_line".
 """
 
-    return prompt
+
+def build_grounding_prompt(
+    question: str, matches: List[Match], settings: Settings, max_tokens: int = 512
+) -> Tuple[str, Dict[str, Any]]:
+    """Build a grounded QA prompt from matches.
+
+    The context is packed into ``RAG_CONTEXT_TOKEN_BUDGET`` tokens, or less
+    if the prompt and ``max_tokens`` of answer would otherwise overflow
+    ``RAG_LLM_CONTEXT_WINDOW`` (see ``pack_context``).
+
+    Args:
+        question: User question
+        matches: Retrieved context matches
+        settings: Application settings
+        max_tokens: Tokens reserved for the answer
+
+    Returns:
+        ``(prompt, stats)``; stats are those of ``pack_context`` plus
+        ``prompt_tokens`` and the ``saved_tokens`` compared to one
+        untruncated block per match
+    """
+    model = settings.LLM_MODEL
+    template_tokens = count_tokens(GROUNDING_TEMPLATE.format(question=question, context=""), model)
+    budget = min(
+        settings.RAG_CONTEXT_TOKEN_BUDGET,
+        settings.RAG_LLM_CONTEXT_WINDOW - max_tokens - template_tokens,
+    )
+    context, stats = pack_context(matches, max(budget, 0), model)
+
+    prompt = GROUNDING_TEMPLATE.format(question=question, context=context)
+    stats["prompt_tokens"] = template_tokens + stats["tokens"]
+    stats["saved_tokens"] = stats["unpacked_tokens"] - stats["tokens"]
+    return prompt, stats
@@ -0,0 +1,183 @@
+"""Semantic cache of generated answers."""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Hashable, List, Mapping, Optional, Tuple
+
+import numpy as np
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.core.schemas import AnswerResponse, Match
+
+logger = get_logger(__name__)
+
+# Identity of a retrieved chunk: (path, start_line, end_line, file sha256)
+ChunkKey = Tuple[str, int, int, str]
+
+# (request params, context fingerprint, {path: sha256}, answer)
+Entry = Tuple[Hashable, FrozenSet[ChunkKey], Dict[str, str], AnswerResponse]
+
+
+def context_fingerprint(matches: List[Match]) -> FrozenSet[ChunkKey]:
+    """Identify the retrieved context an answer was generated from.
+
+    Args:
+        matches: Retrieved matches
+
+    Returns:
+        The set of chunks, each with the content hash of its file
+    """
+    return frozenset(
+        (m.path, m.start_line, m.end_line, str(m.metadata.get("sha256", ""))) for m in matches
+    )
+
+
+class AnswerCache:
+    """Bounded LRU cache of answers, looked up by query similarity.
+
+    A question is answered from the cache when an earlier one's embedding
+    is within ``RAG_ANSWER_CACHE_MIN_SIMILARITY`` (cosine) and retrieval
+    returned exactly the same chunks of the same file versions, so a
+    paraphrase is served the stored answer without calling the LLM.
+    Entries whose files were modified or deleted by an index build are
+    dropped when it is published. Holds at most ``RAG_ANSWER_CACHE_SIZE``
+    entries (0 disables); thread-safe.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the cache.
+
+        Args:
+            settings: Application settings
+        """
+        self.maxsize = settings.RAG_ANSWER_CACHE_SIZE
+        self.min_similarity = settings.RAG_ANSWER_CACHE_MIN_SIMILARITY
+        # Unit query embeddings, one row per slot, searched by one product
+        self._vectors: Optional[np.ndarray] = None
+        self._occupied = np.zeros(self.maxsize, dtype=bool)
+        # Entries by slot, least recently used first
+        self._entries: "OrderedDict[int, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    @staticmethod
+    def _unit(embedding: np.ndarray) -> np.ndarray:
+        vector = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = float(np.linalg.norm(vector))
+        return vector / norm if norm else vector
+
+    def get(
+        self, embedding: np.ndarray, params: Hashable, matches: List[Match]
+    ) -> Optional[AnswerResponse]:
+        """Look up the answer to a question like this one.
+
+        Args:
+            embedding: Query embedding, shape ``(1, dim)``
+            params: Request parameters that change the answer (e.g. max_tokens)
+            matches: Matches retrieved for this question
+
+        Returns:
+            A copy of the cached answer with these matches, or None
+        """
+        if not self.maxsize:
+            return None
+        fingerprint = context_fingerprint(matches)
+        with self._lock:
+            if self._vectors is not None and self._entries:
+                similarities = self._vectors @ self._unit(embedding)
+                similarities[~self._occupied] = -np.inf
+                candidates = np.flatnonzero(similarities >= self.min_similarity)
+                for slot in candidates[np.argsort(-similarities[candidates])]:
+                    entry_params, entry_fingerprint, _, response = self._entries[int(slot)]
+                    if entry_params == params and entry_fingerprint == fingerprint:
+                        self._entries.move_to_end(int(slot))
+                        self._counters["hits"] += 1
+                        return response.model_copy(update={"matches": matches})
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, embedding: np.ndarray, params: Hashable, response: AnswerResponse) -> None:
+        """Store a generated answer.
+
+        Args:
+            embedding: Query embedding, shape ``(1, dim)``
+            params: Request parameters that change the answer
+            response: Answer, with the matches it was generated from
+        """
+        if not self.maxsize:
+            return
+        vector = self._unit(embedding)
+        files = {m.path: str(m.metadata.get("sha256", "")) for m in response.matches}
+        entry: Entry = (params, context_fingerprint(response.matches), files, response)
+        with self._lock:
+            if self._vectors is None or self._vectors.shape[1] != len(vector):
+                self._vectors = np.zeros((self.maxsize, len(vector)), dtype=np.float32)
+                self._occupied[:] = False
+                self._entries.clear()
+            if len(self._entries) >= self.maxsize:
+                self._release(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+            slot = int(np.flatnonzero(~self._occupied)[0])
+            self._vectors[slot] = vector
+            self._occupied[slot] = True
+            self._entries[slot] = entry
+
+    def _release(self, slot: int) -> None:
+        """Free a slot (caller holds the lock)."""
+        del self._entries[slot]
+        self._occupied[slot] = False
+
+    def invalidate(self, file_hashes: Mapping[str, Optional[str]], complete: bool = False) -> int:
+        """Drop the answers generated from files that changed.
+
+        Args:
+            file_hashes: New sha256 of each added or modified file, None for
+                deleted files
+            complete: ``file_hashes`` lists every indexed file (a clean
+                build), so files missing from it were deleted
+
+        Returns:
+            Number of entries dropped
+        """
+
+        def changed(path: str, sha256: str) -> bool:
+            if path in file_hashes:
+                return file_hashes[path] != sha256
+            return complete
+
+        with self._lock:
+            stale = [
+                slot
+                for slot, (_, _, files, _) in self._entries.items()
+                if any(changed(path, sha256) for path, sha256 in files.items())
+            ]
+            for slot in stale:
+                self._release(slot)
+            self._counters["invalidations"] += len(stale)
+        if stale:
+            logger.info("answer_cache_invalidated", entries=len(stale))
+        return len(stale)
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            self._entries.clear()
+            self._occupied[:] = False
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cache size and hit/miss counters.
+
+        Returns:
+            Counters plus ``size``, ``capacity`` and ``hit_rate``
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "capacity": self.maxsize,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,376 @@
+"""Columnar, memory-mapped chunk storage shared by the search indices."""
+
+import bisect
+import json
+import mmap
+import os
+import re
+from typing import Any, BinaryIO, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Rewrite the text blob once less than this fraction of it is still referenced
+BLOB_COMPACT_RATIO = 0.5
+# Segments after the first are merged into one when a save would exceed this
+BLOB_MAX_SEGMENTS = 8
+# Legacy single-file blob, read as the only segment
+LEGACY_BLOB = "text.bin"
+_SEGMENT_RE = re.compile(r"^text-(\d+)\.bin$")
+
+
+class ChunkStore:
+    """Chunk texts and metadata keyed by integer chunk ID.
+
+    On disk (``<index dir>/chunks``) chunks are stored column-wise:
+
+    - ``ids.npy``: chunk IDs, sorted ascending
+    - ``lines.npy``: ``(start_line, end_line)`` per chunk
+    - ``files.npy``: index into the file table per chunk
+    - ``spans.npy``: ``(start, end)`` byte offsets into the text blob
+    - ``text-NNNNNN.bin``: UTF-8 chunk contents; the blob is the
+      concatenation of these segments, and a segment is never modified
+      once written
+    - ``files.json``: file table (path, language, sha256), the blob's
+      segments in order and the next free ID
+
+    Loading memory-maps the arrays and the text blob, so startup does not
+    depend on corpus size and several workers share the same pages. Chunk
+    dicts are only built for the IDs that are looked up (search hits).
+    Chunks added or removed after loading are kept in memory until the next
+    ``save``.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize an empty chunk store.
+
+        Args:
+            settings: Application settings
+        """
+        self.settings = settings
+        self.store_dir = settings.RAG_INDEX_DIR / "chunks"
+        self.clear()
+
+    def clear(self) -> None:
+        """Drop all chunks."""
+        self._ids = np.zeros(0, dtype=np.int64)
+        self._lines = np.zeros((0, 2), dtype=np.int32)
+        self._files = np.zeros(0, dtype=np.int32)
+        self._spans = np.zeros((0, 2), dtype=np.int64)
+        # Blob segment file names, their mappings and their offsets in the blob
+        self._segments: List[str] = []
+        self._blobs: List[mmap.mmap] = []
+        self._blob_starts: List[int] = []
+        self._blob_size = 0
+        self._file_table: List[Dict[str, str]] = []
+        self._file_index: Dict[str, int] = {}
+        self._removed: Set[int] = set()
+        self._added: Dict[int, Dict[str, Any]] = {}
+        self._next_id = 0
+
+    def __len__(self) -> int:
+        return len(self._ids) - len(self._removed) + len(self._added)
+
+    def __contains__(self, chunk_id: object) -> bool:
+        return isinstance(chunk_id, (int, np.integer)) and self.get(int(chunk_id)) is not None
+
+    def __getitem__(self, chunk_id: int) -> Dict[str, Any]:
+        chunk = self.get(chunk_id)
+        if chunk is None:
+            raise KeyError(chunk_id)
+        return chunk
+
+    def get(self, chunk_id: int) -> Optional[Dict[str, Any]]:
+        """Look up a chunk by ID.
+
+        Args:
+            chunk_id: Chunk ID
+
+        Returns:
+            Chunk dict, or None if not stored
+        """
+        chunk = self._added.get(chunk_id)
+        if chunk is not None or chunk_id in self._removed:
+            return chunk
+
+        row = self._base_row(chunk_id)
+        return self._materialize(row) if row is not None else None
+
+    def _base_row(self, chunk_id: int) -> Optional[int]:
+        """Find the on-disk row of a chunk ID."""
+        row = int(np.searchsorted(self._ids, chunk_id))
+        if row == len(self._ids) or self._ids[row] != chunk_id:
+            return None
+        return row
+
+    def _text(self, start: int, end: int) -> bytes:
+        """Read a span of the text blob (spans never cross segments)."""
+        if end == start:
+            return b""
+        segment = bisect.bisect_right(self._blob_starts, start) - 1
+        offset = self._blob_starts[segment]
+        return self._blobs[segment][start - offset : end - offset]
+
+    def _materialize(self, row: int) -> Dict[str, Any]:
+        """Build the chunk dict for a row of the on-disk columns."""
+        start, end = self._spans[row]
+        file_entry = self._file_table[self._files[row]]
+        return {
+            "id": int(self._ids[row]),
+            "content": self._text(int(start), int(end)).decode("utf-8"),
+            "start_line": int(self._lines[row, 0]),
+            "end_line": int(self._lines[row, 1]),
+            "metadata": dict(file_entry),
+        }
+
+    def add(self, chunks: Iterable[Dict[str, Any]]) -> None:
+        """Add (or replace) chunks.
+
+        Only ``path``, ``language`` and ``sha256`` metadata are persisted.
+
+        Args:
+            chunks: Chunks with a unique integer ``id``
+        """
+        for chunk in chunks:
+            if self._base_row(chunk["id"]) is not None:
+                self._removed.add(chunk["id"])
+            self._added[chunk["id"]] = chunk
+            self._next_id = max(self._next_id, chunk["id"] + 1)
+
+    def remove(self, ids: Iterable[int]) -> None:
+        """Remove chunks by ID.
+
+        Args:
+            ids: Chunk IDs to remove
+        """
+        for chunk_id in ids:
+            self._added.pop(chunk_id, None)
+            if self._base_row(chunk_id) is not None:
+                self._removed.add(chunk_id)
+
+    def _base_live(self) -> np.ndarray:
+        """Mask of on-disk rows that have not been removed."""
+        if not self._removed:
+            return np.ones(len(self._ids), dtype=bool)
+        removed = np.fromiter(self._removed, dtype=np.int64, count=len(self._removed))
+        return ~np.isin(self._ids, removed)
+
+    def ids(self) -> np.ndarray:
+        """Return all stored chunk IDs, sorted ascending."""
+        added = np.fromiter(self._added, dtype=np.int64, count=len(self._added))
+        return np.union1d(self._ids[self._base_live()], added)
+
+    def pending(self) -> int:
+        """Return the number of chunks added since the last save or load."""
+        return len(self._added)
+
+    def next_id(self) -> int:
+        """Return an ID larger than any ever stored (IDs are never reused)."""
+        return self._next_id
+
+    def values(self) -> Iterator[Dict[str, Any]]:
+        """Iterate over all chunks in ID order."""
+        for chunk_id in self.ids():
+            yield self[int(chunk_id)]
+
+    def ids_for_paths(self, paths: Iterable[str]) -> List[int]:
+        """Return the IDs of all chunks belonging to the given files.
+
+        Args:
+            paths: File paths
+
+        Returns:
+            Matching chunk IDs
+        """
+        paths = set(paths)
+        file_rows = [self._file_index[p] for p in paths if p in self._file_index]
+        base = self._base_live() & np.isin(self._files, file_rows)
+        ids = [int(chunk_id) for chunk_id in self._ids[base]]
+        ids.extend(
+            chunk_id
+            for chunk_id, chunk in self._added.items()
+            if chunk["metadata"]["path"] in paths
+        )
+        return ids
+
+    def paths(self) -> Set[str]:
+        """Return the distinct file paths that have chunks."""
+        file_rows = np.unique(self._files[self._base_live()])
+        paths = {self._file_table[row]["path"] for row in file_rows}
+        paths.update(chunk["metadata"]["path"] for chunk in self._added.values())
+        return paths
+
+    def save(self) -> None:
+        """Write pending changes to disk.
+
+        New chunk texts go to a new blob segment; existing segments may be
+        hard-linked from other index generations and are never modified,
+        so an incremental save writes only the new texts. The blob is only
+        rewritten when most of it is no longer referenced. Files are
+        replaced atomically, so processes that mapped the previous version
+        keep valid mappings.
+        """
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        live = self._base_live()
+        spans = self._spans[live]
+        referenced = int((spans[:, 1] - spans[:, 0]).sum())
+        rewrite = not self._segments or referenced < BLOB_COMPACT_RATIO * self._blob_size
+
+        name = self._next_segment()
+        tmp_path = self.store_dir / f"{name}.tmp"
+        with open(tmp_path, "wb") as f:
+            if rewrite:
+                # Copy the referenced texts into a fresh blob
+                kept: List[str] = []
+                new_spans = np.zeros_like(spans)
+                offset = 0
+                for row, (start, end) in enumerate(spans):
+                    f.write(self._text(int(start), int(end)))
+                    new_spans[row] = (offset, offset + end - start)
+                    offset += end - start
+                spans = new_spans
+            else:
+                # Merging trailing segments in order keeps every offset valid
+                kept = self._segments
+                offset = self._blob_size
+                if len(kept) >= BLOB_MAX_SEGMENTS:
+                    for blob in self._blobs[1:]:
+                        f.write(blob)
+                    kept = kept[:1]
+            added_spans = self._append_texts(f, offset)
+            written = f.tell()
+            f.flush()
+            os.fsync(f.fileno())
+        if written:
+            os.replace(tmp_path, self.store_dir / name)
+            segments = kept + [name]
+        else:
+            tmp_path.unlink()
+            segments = kept
+
+        for chunk in self._added.values():
+            metadata = chunk["metadata"]
+            entry = {key: metadata.get(key, "") for key in ("path", "language", "sha256")}
+            file_row = self._file_index.get(entry["path"])
+            if file_row is None:
+                self._file_index[entry["path"]] = len(self._file_table)
+                self._file_table.append(entry)
+            else:
+                self._file_table[file_row] = entry
+
+        added = sorted(self._added.values(), key=lambda chunk: chunk["id"])
+        ids = np.concatenate(
+            [self._ids[live], np.array([c["id"] for c in added], dtype=np.int64)]
+        )
+        lines = np.concatenate(
+            [
+                self._lines[live],
+                np.array([[c["start_line"], c["end_line"]] for c in added], dtype=np.int32)
+                .reshape(-1, 2),
+            ]
+        )
+        files = np.concatenate(
+            [
+                self._files[live],
+                np.array([self._file_index[c["metadata"]["path"]] for c in added], dtype=np.int32),
+            ]
+        )
+        spans = np.concatenate(
+            [spans, np.array([added_spans[c["id"]] for c in added], dtype=np.int64).reshape(-1, 2)]
+        )
+
+        order = np.argsort(ids, kind="stable")
+        for name, array in (
+            ("ids", ids[order]),
+            ("lines", lines[order].astype(np.int32)),
+            ("files", files[order].astype(np.int32)),
+            ("spans", spans[order].astype(np.int64)),
+        ):
+            tmp_path = self.store_dir / f"{name}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, self.store_dir / f"{name}.npy")
+
+        tmp_path = self.store_dir / "files.json.tmp"
+        state = {"next_id": self._next_id, "files": self._file_table, "segments": segments}
+        tmp_path.write_text(json.dumps(state))
+        os.replace(tmp_path, self.store_dir / "files.json")
+        # Only this directory's links go; other generations keep theirs
+        for stale in set(self._segments) - set(segments):
+            (self.store_dir / stale).unlink(missing_ok=True)
+
+        logger.info(
+            "chunk_store_saved", chunks=len(ids), segments=len(segments), compacted=rewrite
+        )
+        self.load()
+
+    def _next_segment(self) -> str:
+        """Pick a blob segment file name above every segment in use."""
+        numbers = [-1]
+        for name in self._segments:
+            match = _SEGMENT_RE.match(name)
+            if match:
+                numbers.append(int(match.group(1)))
+        return f"text-{max(numbers) + 1:06d}.bin"
+
+    def _append_texts(self, f: BinaryIO, offset: int) -> Dict[int, Tuple[int, int]]:
+        """Append the texts of pending chunks to an open blob file.
+
+        Args:
+            f: Blob segment file opened for writing
+            offset: Blob offset the pending texts start at
+
+        Returns:
+            Mapping of chunk ID to its ``(start, end)`` byte span
+        """
+        spans: Dict[int, Tuple[int, int]] = {}
+        for chunk_id, chunk in self._added.items():
+            data = chunk["content"].encode("utf-8")
+            f.write(data)
+            spans[chunk_id] = (offset, offset + len(data))
+            offset += len(data)
+        return spans
+
+    def load(self) -> bool:
+        """Memory-map the chunk store from disk.
+
+        Returns:
+            True if loaded successfully
+        """
+        if not (self.store_dir / "files.json").exists():
+            logger.warning("chunk_store_not_found")
+            return False
+
+        try:
+            self.clear()
+            arrays = {
+                name: np.load(self.store_dir / f"{name}.npy", mmap_mode="r")
+                for name in ("ids", "lines", "files", "spans")
+            }
+            self._ids = arrays["ids"]
+            self._lines = arrays["lines"]
+            self._files = arrays["files"]
+            self._spans = arrays["spans"]
+            state = json.loads((self.store_dir / "files.json").read_text())
+            self._file_table = state["files"]
+            self._next_id = state["next_id"]
+            self._file_index = {entry["path"]: row for row, entry in enumerate(self._file_table)}
+            for name in state.get("segments", [LEGACY_BLOB]):
+                with open(self.store_dir / name, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if not size:
+                        continue
+                    self._blobs.append(mmap.mmap(f.fileno(), size, access=mmap.ACCESS_READ))
+                self._segments.append(name)
+                self._blob_starts.append(self._blob_size)
+                self._blob_size += size
+            logger.info("chunk_store_loaded", chunks=len(self._ids))
+            return True
+        except Exception as e:
+            logger.error("chunk_store_load_error", error=str(e))
+            self.clear()
+            return False
@@ -0,0 +1,178 @@
+"""Embedding model backends (PyTorch, ONNX Runtime, int8 ONNX Runtime)."""
+
+import platform
+import re
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, List
+
+import numpy as np
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
+
+logger = get_logger(__name__)
+
+# Probe texts for the parity check run after quantizing a model
+PARITY_TEXTS = [
+    "def load_config(path): return yaml.safe_load(open(path))",
+    "How does the ingestion pipeline chunk markdown files?",
+    "class UserRepository extends BaseRepository { findByEmail(email) {} }",
+    "Retry the request with exponential backoff when the server returns 503.",
+]
+
+# Int8 embeddings below this cosine similarity to PyTorch ones are reported
+PARITY_WARN_COSINE = 0.98
+
+# Models loaded by shared_embedding_model, by embedding_model_id
+_shared_models: Dict[str, Any] = {}
+_shared_models_lock = threading.Lock()
+
+
+def embedding_model_id(settings: Settings) -> str:
+    """Identify the embedding function, for caches keyed by model.
+
+    Backends other than PyTorch produce slightly different vectors (int8
+    ones noticeably so), so their embeddings are cached separately.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        Model name, suffixed with the backend unless it is ``torch``
+    """
+    backend = settings.RAG_EMBEDDING_BACKEND
+    if backend == "torch":
+        return settings.RAG_EMBEDDING_MODEL
+    suffix = f"{backend}-{quantization_target(settings)}" if backend == "onnx_int8" else backend
+    return f"{settings.RAG_EMBEDDING_MODEL}#{suffix}"
+
+
+def quantization_target(settings: Settings) -> str:
+    """Resolve ``RAG_ONNX_QUANTIZATION`` to an ONNX Runtime quantization preset.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        One of ``arm64``, ``avx2``, ``avx512``, ``avx512_vnni``
+    """
+    target = settings.RAG_ONNX_QUANTIZATION
+    return _detect_quantization_target() if target == "auto" else target
+
+
+@lru_cache(maxsize=1)
+def _detect_quantization_target() -> str:
+    """Pick the best int8 preset for this CPU."""
+    if platform.machine().lower() in ("arm64", "aarch64"):
+        return "arm64"
+    try:
+        flags = set(re.findall(r"\w+", Path("/proc/cpuinfo").read_text()))
+    except OSError:
+        return "avx2"
+    if "avx512_vnni" in flags:
+        return "avx512_vnni"
+    if "avx512f" in flags:
+        return "avx512"
+    return "avx2"
+
+
+def shared_embedding_model(settings: Settings) -> "SentenceTransformer":
+    """Load the configured embedding model once per process.
+
+    Every index generation's vector store shares the instance. Concurrent
+    first callers wait for one load instead of each loading a copy.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        The loaded model
+    """
+    model_id = embedding_model_id(settings)
+    with _shared_models_lock:
+        model = _shared_models.get(model_id)
+        if model is None:
+            logger.info(
+                "loading_embedding_model",
+                model=settings.RAG_EMBEDDING_MODEL,
+                backend=settings.RAG_EMBEDDING_BACKEND,
+            )
+            start = time.perf_counter()
+            model = _shared_models[model_id] = load_embedding_model(settings)
+            logger.info("model_loaded", seconds=round(time.perf_counter() - start, 2))
+    return model
+
+
+def load_embedding_model(settings: Settings) -> "SentenceTransformer":
+    """Load the embedding model with the configured backend.
+
+    ``onnx`` and ``onnx_int8`` export the model once to
+    ``<RAG_DATA_DIR>/models/<model>`` (``onnx/model.onnx``, and for int8 a
+    dynamically quantized ``onnx/model_qint8_<target>.onnx``) and load the
+    export afterwards. They need the ``onnx`` extra (Optimum and ONNX Runtime).
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        SentenceTransformer running on the chosen backend
+    """
+    # Imports torch and transformers: seconds, so only when a model is needed
+    from sentence_transformers import SentenceTransformer
+
+    name = settings.RAG_EMBEDDING_MODEL
+    backend = settings.RAG_EMBEDDING_BACKEND
+    if backend == "torch":
+        return SentenceTransformer(name)
+
+    export_dir = settings.RAG_DATA_DIR / "models" / re.sub(r"[^A-Za-z0-9_.-]+", "_", name)
+    if not (export_dir / "onnx" / "model.onnx").exists():
+        logger.info("exporting_onnx_model", model=name, path=str(export_dir))
+        SentenceTransformer(name, backend="onnx").save_pretrained(str(export_dir))
+    if backend == "onnx":
+        return SentenceTransformer(str(export_dir), backend="onnx")
+
+    from sentence_transformers.backend import export_dynamic_quantized_onnx_model
+
+    target = quantization_target(settings)
+    file_name = f"onnx/model_qint8_{target}.onnx"
+    quantized = (export_dir / file_name).exists()
+    if not quantized:
+        logger.info("quantizing_onnx_model", model=name, target=target)
+        export_dynamic_quantized_onnx_model(
+            SentenceTransformer(str(export_dir), backend="onnx"), target, str(export_dir)
+        )
+    model = SentenceTransformer(
+        str(export_dir), backend="onnx", model_kwargs={"file_name": file_name}
+    )
+    if not quantized:
+        # Quantization is lossy: report how far it moved the embeddings
+        parity = embedding_parity(SentenceTransformer(name), model, PARITY_TEXTS)
+        log = logger.warning if parity["min_cosine"] < PARITY_WARN_COSINE else logger.info
+        log("onnx_int8_parity", model=name, target=target, **parity)
+    return model
+
+
+def embedding_parity(reference: Any, candidate: Any, texts: List[str]) -> Dict[str, float]:
+    """Compare two encoders on the same texts.
+
+    Args:
+        reference: Encoder whose output is taken as correct (PyTorch)
+        candidate: Encoder to check (e.g. int8 ONNX)
+        texts: Sample texts
+
+    Returns:
+        Minimum and mean cosine similarity between matching embeddings
+    """
+    expected = reference.encode(texts, convert_to_numpy=True).astype("float32")
+    actual = candidate.encode(texts, convert_to_numpy=True).astype("float32")
+    cosine = (expected * actual).sum(axis=1) / (
+        np.linalg.norm(expected, axis=1) * np.linalg.norm(actual, axis=1)
+    )
+    return {"min_cosine": float(cosine.min()), "mean_cosine": float(cosine.mean())}
@@ -0,0 +1,197 @@
+"""Persistent, content-addressed cache of chunk embeddings."""
+
+import json
+import os
+import re
+import shutil
+from pathlib import Path
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+import xxhash
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.search.embedding_backends import embedding_model_id
+
+logger = get_logger(__name__)
+
+DIGEST_SIZE = 16
+
+# A clean build compacts the cache once it holds this many times the vectors it used
+COMPACT_RATIO = 2
+
+
+def text_digest(text: str) -> bytes:
+    """Hash chunk text for embedding lookups.
+
+    Args:
+        text: Chunk content
+
+    Returns:
+        16-byte xxh3_128 digest of the UTF-8 text
+    """
+    return xxhash.xxh3_128_digest(text.encode("utf-8", "surrogatepass"))
+
+
+class ChunkEmbeddingCache:
+    """Embeddings of previously encoded chunk texts, keyed by text hash.
+
+    Lives outside the index generations (``RAG_EMBEDDING_CACHE_DIR``, by
+    default ``<RAG_DATA_DIR>/embedding_cache``) so clean rebuilds reuse it,
+    with one directory per embedding model and backend::
+
+        meta.json    model name, dimension, hash function
+        keys.bin     16-byte text digests, one per row
+        vectors.f32  float32 rows, memory-mapped for lookups
+
+    Both files are append-only; after a crash, rows without both a key and a
+    complete vector are ignored. Only the index job thread writes.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the cache (files are opened on first use).
+
+        Args:
+            settings: Application settings
+        """
+        self.enabled = settings.RAG_EMBEDDING_CACHE
+        self.model_name = embedding_model_id(settings)
+        root = settings.RAG_EMBEDDING_CACHE_DIR or settings.RAG_DATA_DIR / "embedding_cache"
+        slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", self.model_name)[-64:]
+        model_hash = xxhash.xxh3_64_hexdigest(self.model_name.encode())[:8]
+        self.cache_dir = Path(root) / f"{slug}-{model_hash}"
+        self.dim: Optional[int] = None
+        self._rows: Optional[Dict[bytes, int]] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._used: Set[int] = set()
+
+    def _open(self, dim: Optional[int] = None) -> bool:
+        """Read the key table; create the files if ``dim`` is given.
+
+        Returns:
+            True if the cache is usable
+        """
+        if self._rows is not None:
+            return True
+        meta_path = self.cache_dir / "meta.json"
+        if meta_path.exists():
+            meta = json.loads(meta_path.read_text())
+            if dim is not None and meta["dim"] != dim:
+                logger.warning("embedding_cache_dimension_changed", old=meta["dim"], new=dim)
+                shutil.rmtree(self.cache_dir)
+            else:
+                self.dim = int(meta["dim"])
+        if self.dim is None:
+            if dim is None:
+                return False
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            for name in ("keys.bin", "vectors.f32"):
+                (self.cache_dir / name).touch()
+            meta_path.write_text(
+                json.dumps({"model": self.model_name, "dim": dim, "hash": "xxh3_128"})
+            )
+            self.dim = dim
+
+        keys = (self.cache_dir / "keys.bin").read_bytes()
+        row_bytes = 4 * self.dim
+        vector_bytes = (self.cache_dir / "vectors.f32").stat().st_size
+        count = min(len(keys) // DIGEST_SIZE, vector_bytes // row_bytes)
+        # Drop a partially written tail so the files line up again
+        for name, size in (("keys.bin", count * DIGEST_SIZE), ("vectors.f32", count * row_bytes)):
+            if (self.cache_dir / name).stat().st_size != size:
+                os.truncate(self.cache_dir / name, size)
+        self._rows = {keys[i * DIGEST_SIZE : (i + 1) * DIGEST_SIZE]: i for i in range(count)}
+        self._vectors = None
+        logger.info("embedding_cache_opened", path=str(self.cache_dir), vectors=count)
+        return True
+
+    def _map(self) -> np.ndarray:
+        """Memory-map the vector file, remapping after appends."""
+        assert self._rows is not None and self.dim is not None
+        if self._vectors is None or len(self._vectors) < len(self._rows):
+            self._vectors = (
+                np.memmap(self.cache_dir / "vectors.f32", dtype=np.float32, mode="r")
+                .reshape(-1, self.dim)
+                if self._rows
+                else np.zeros((0, self.dim), dtype=np.float32)
+            )
+        return self._vectors
+
+    def lookup(self, digests: List[bytes]) -> Tuple[Optional[np.ndarray], List[int]]:
+        """Find cached embeddings.
+
+        Args:
+            digests: Text digests from ``text_digest``
+
+        Returns:
+            ``(vectors, missing)``: a ``(len(digests), dim)`` array with the
+            cached rows filled in (None if the cache is empty or disabled),
+            and the positions that still need encoding
+        """
+        if not self.enabled or not self._open():
+            return None, list(range(len(digests)))
+        assert self._rows is not None and self.dim is not None
+        vectors = np.zeros((len(digests), self.dim), dtype=np.float32)
+        positions, rows, missing = [], [], []
+        for position, digest in enumerate(digests):
+            row = self._rows.get(digest)
+            if row is None:
+                missing.append(position)
+            else:
+                positions.append(position)
+                rows.append(row)
+        if rows:
+            vectors[positions] = self._map()[rows]
+            self._used.update(rows)
+        return vectors, missing
+
+    def add(self, digests: List[bytes], vectors: np.ndarray) -> None:
+        """Append newly encoded embeddings.
+
+        Args:
+            digests: Text digests, one per row (may repeat cached ones)
+            vectors: float32 embeddings
+        """
+        if not self.enabled or not digests:
+            return
+        self._open(vectors.shape[1])
+        assert self._rows is not None
+        new = [i for i, digest in enumerate(digests) if digest not in self._rows]
+        new = list({digests[i]: i for i in new}.values())  # first of duplicate texts
+        if not new:
+            return
+        with open(self.cache_dir / "vectors.f32", "ab") as f:
+            f.write(np.ascontiguousarray(vectors[new], dtype=np.float32).tobytes())
+        with open(self.cache_dir / "keys.bin", "ab") as f:
+            f.write(b"".join(digests[i] for i in new))
+        start = len(self._rows)
+        for offset, i in enumerate(new):
+            self._rows[digests[i]] = start + offset
+            self._used.add(start + offset)
+
+    def compact(self) -> None:
+        """Drop entries not used since opening, if they dominate the cache.
+
+        Called after a clean build, when the used entries are exactly the
+        chunks of the new index.
+        """
+        if self._rows is None or len(self._rows) <= COMPACT_RATIO * max(len(self._used), 1):
+            return
+        assert self.dim is not None
+        keep = sorted(self._used)
+        keys = [b""] * len(self._rows)
+        for digest, row in self._rows.items():
+            keys[row] = digest
+        (self.cache_dir / "vectors.f32.tmp").write_bytes(self._map()[keep].tobytes())
+        (self.cache_dir / "keys.bin.tmp").write_bytes(b"".join(keys[row] for row in keep))
+        # Empty the key file first: a crash midway leaves an empty cache, never
+        # keys pointing at the wrong rows
+        os.truncate(self.cache_dir / "keys.bin", 0)
+        os.replace(self.cache_dir / "vectors.f32.tmp", self.cache_dir / "vectors.f32")
+        os.replace(self.cache_dir / "keys.bin.tmp", self.cache_dir / "keys.bin")
+        dropped = len(self._rows) - len(keep)
+        logger.info("embedding_cache_compacted", kept=len(keep), dropped=dropped)
+        self._rows = {keys[row]: i for i, row in enumerate(keep)}
+        self._used = set(range(len(keep)))
+        self._vectors = None
@@ -0,0 +1,125 @@
+"""Micro-batching of concurrent query embeddings."""
+
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+class EncodeBatcher:
+    """Coalesces concurrent small ``encode`` calls into one model batch.
+
+    Query retrievals run on a thread pool, each embedding a single query,
+    which leaves most of the model's matrix throughput unused. Callers hand
+    their texts to ``encode`` and block; a collector thread waits up to
+    ``RAG_EMBED_BATCH_WINDOW_MS`` after the first pending text (or until
+    ``RAG_EMBED_MAX_BATCH`` are pending), encodes them together and hands
+    each caller its rows. A window of 0 disables batching.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the batcher (the collector thread starts on first use).
+
+        Args:
+            settings: Application settings
+        """
+        self.window = settings.RAG_EMBED_BATCH_WINDOW_MS / 1000
+        self.max_batch = settings.RAG_EMBED_MAX_BATCH
+        self._pending: List[Tuple[Any, List[str], "Future[np.ndarray]"]] = []
+        self._first_pending = 0.0
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._metrics: Dict[str, Any] = {"batches": 0, "texts": 0, "max_batch_seen": 0}
+
+    def encode(self, model: Any, texts: List[str]) -> np.ndarray:
+        """Embed texts, batched with those of concurrent callers.
+
+        Args:
+            model: SentenceTransformer-compatible encoder
+            texts: Texts to embed (already a full batch are encoded directly)
+
+        Returns:
+            float32 array of shape ``(len(texts), dim)``
+        """
+        if not self.window or len(texts) >= self.max_batch:
+            embeddings: np.ndarray = model.encode(texts, convert_to_numpy=True).astype("float32")
+            return embeddings
+
+        future: "Future[np.ndarray]" = Future()
+        with self._cond:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._collect_loop, name="encode-batcher", daemon=True
+                )
+                self._thread.start()
+            if not self._pending:
+                self._first_pending = time.monotonic()
+            self._pending.append((model, texts, future))
+            self._cond.notify_all()
+        return future.result()
+
+    def _next_batch(self) -> List[Tuple[Any, List[str], "Future[np.ndarray]"]]:
+        """Wait until the window closes or the batch is full, then take it."""
+        with self._cond:
+            while True:
+                if self._pending:
+                    queued = sum(len(texts) for _, texts, _ in self._pending)
+                    remaining = self._first_pending + self.window - time.monotonic()
+                    if queued >= self.max_batch or remaining <= 0:
+                        batch, self._pending = self._pending, []
+                        return batch
+                    self._cond.wait(remaining)
+                else:
+                    self._cond.wait()
+
+    def _collect_loop(self) -> None:
+        """Encode due batches, forever (daemon thread)."""
+        while True:
+            batch = self._next_batch()
+            # Snapshots share one model, but keep different models apart anyway
+            by_model: Dict[int, List[Tuple[Any, List[str], "Future[np.ndarray]"]]] = {}
+            for request in batch:
+                by_model.setdefault(id(request[0]), []).append(request)
+            for requests in by_model.values():
+                self._run(requests)
+
+    def _run(self, requests: List[Tuple[Any, List[str], "Future[np.ndarray]"]]) -> None:
+        """Encode one model's requests together and resolve their futures."""
+        model = requests[0][0]
+        texts = [text for _, request_texts, _ in requests for text in request_texts]
+        try:
+            embeddings = model.encode(
+                texts, batch_size=len(texts), convert_to_numpy=True
+            ).astype("float32")
+        except Exception as e:
+            logger.error("encode_batch_error", texts=len(texts), error=str(e))
+            for _, _, future in requests:
+                future.set_exception(e)
+            return
+
+        offset = 0
+        for _, request_texts, future in requests:
+            future.set_result(embeddings[offset : offset + len(request_texts)])
+            offset += len(request_texts)
+        self._metrics["batches"] += 1
+        self._metrics["texts"] += len(texts)
+        self._metrics["max_batch_seen"] = max(self._metrics["max_batch_seen"], len(texts))
+
+    def stats(self) -> Dict[str, Any]:
+        """Report how many batches were encoded and their sizes.
+
+        Returns:
+            ``batches``, ``texts``, ``max_batch_seen`` and ``mean_batch``
+        """
+        metrics = dict(self._metrics)
+        metrics["mean_batch"] = (
+            round(metrics["texts"] / metrics["batches"], 2) if metrics["batches"] else 0.0
+        )
+        return {"window_ms": self.window * 1000, "max_batch": self.max_batch, **metrics}
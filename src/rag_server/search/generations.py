@@ -0,0 +1,418 @@
+"""Versioned index generations with atomic hot-swap."""
+
+import fcntl
+import json
+import os
+import re
+import shutil
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.search.answer_cache import AnswerCache
+from rag_server.search.encode_batcher import EncodeBatcher
+from rag_server.search.query_cache import QueryEmbeddingCache
+from rag_server.search.reranker import Reranker
+from rag_server.search.result_cache import RetrievalCache
+from rag_server.search.retriever import HybridRetriever
+
+logger = get_logger(__name__)
+
+GENERATIONS_DIR = "generations"
+POINTER_FILE = "current"
+# Held while the pointer is swapped or generations are collected
+PUBLISH_LOCK_FILE = "publish.lock"
+# Present in a generation while a build (in any process) is writing it
+BUILDING_MARKER = ".building"
+# A marker from another host untouched this long is left over from a crashed build
+BUILDING_MARKER_MAX_AGE_S = 24 * 3600
+_GENERATION_RE = re.compile(r"^gen-(\d+)$")
+
+# Index files written directly into RAG_INDEX_DIR before generations existed
+LEGACY_ENTRIES = ("faiss.index", "bm25", "chunks", "file_hashes.json", "stats.json")
+
+
+class GenerationConflictError(RuntimeError):
+    """Another build published a generation after this one started."""
+
+
+def _fsync_path(path: Path) -> None:
+    """Flush a file or directory to stable storage."""
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class IndexGenerations:
+    """Index directories that are written once and published atomically.
+
+    Layout under ``RAG_INDEX_DIR``::
+
+        current                 name of the published generation
+        publish.lock            serializes pointer swaps and collection
+        generations/gen-000007  complete index (faiss.index, bm25/, chunks/,
+                                file_hashes.json, stats.json; with
+                                RAG_INDEX_SHARDS, shards/NN/ hold the
+                                per-shard faiss.index, bm25/ and chunks/)
+        generations/gen-000008  a build in progress: .building names the
+                                host and process writing it
+
+    Every index job writes a new generation: an incremental one starts from
+    hard links to the current generation's files (every file that changes is
+    replaced, never rewritten in place; new chunk texts go to a new blob
+    segment), a clean one starts empty. Once saved and fsynced, the
+    ``current`` pointer is replaced atomically and the loaded retriever
+    snapshot reference is swapped; a build is discarded instead if another
+    one was published after it began. Snapshots are never modified, so
+    queries read them without locks and in-flight queries finish on the
+    generation they started on. Older generations beyond
+    ``RAG_INDEX_KEEP_GENERATIONS`` are deleted; their memory-mapped files
+    stay valid for processes still using them.
+    """
+
+    def __init__(self, settings: Settings, model: Optional[Any] = None):
+        """Initialize the generation manager.
+
+        Args:
+            settings: Application settings
+            model: Embedding model shared by all snapshots (loaded lazily if None)
+        """
+        self.settings = settings
+        self.root = settings.RAG_INDEX_DIR
+        self.generations_dir = self.root / GENERATIONS_DIR
+        self.model = model
+        self.query_cache = QueryEmbeddingCache(settings)
+        self.result_cache = RetrievalCache(settings)
+        self.answer_cache = AnswerCache(settings)
+        self.reranker = Reranker(settings) if settings.RAG_RERANK else None
+        self.encode_batcher = EncodeBatcher(settings)
+        # Per-shard searches and updates of every snapshot and writer
+        self.shard_executor = (
+            ThreadPoolExecutor(
+                max_workers=max(settings.RAG_INDEX_SHARDS, os.cpu_count() or 1),
+                thread_name_prefix="shard",
+            )
+            if settings.RAG_INDEX_SHARDS > 1
+            else None
+        )
+        self._snapshot: Optional[HybridRetriever] = None
+        self._reload_lock = threading.Lock()
+        self.warmup: Dict[str, Any] = {"status": "pending", "seconds": None, "error": None}
+
+    def warm_up(self) -> None:
+        """Load the published index and the models before the first query.
+
+        Run on a background thread at startup; ``warmup`` records the
+        progress for readiness checks. Encoding one query (and reranking
+        one pair) also pays for the models' first-inference setup.
+        """
+        self.warmup.update(status="warming")
+        start = time.perf_counter()
+        try:
+            store = self.snapshot().vector_store
+            store.load_model()
+            assert store.model is not None
+            self.model = store.model
+            store.model.encode(["warm up"], convert_to_numpy=True)
+            if self.reranker is not None:
+                self.reranker.warm_up()
+        except Exception as e:
+            logger.error("warmup_failed", error=str(e))
+            self.warmup.update(status="failed", error=str(e))
+            return
+        seconds = round(time.perf_counter() - start, 3)
+        self.warmup.update(status="ready", seconds=seconds)
+        logger.info("warmup_complete", generation=self.current(), seconds=seconds)
+
+    def current(self) -> Optional[str]:
+        """Return the name of the published generation, if any."""
+        try:
+            return (self.root / POINTER_FILE).read_text().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def current_dir(self) -> Path:
+        """Return the directory of the published index.
+
+        Falls back to ``RAG_INDEX_DIR`` itself for indices written before
+        generations were introduced.
+        """
+        name = self.current()
+        return self.generations_dir / name if name else self.root
+
+    def _settings_for(self, index_dir: Path) -> Settings:
+        """Settings whose ``RAG_INDEX_DIR`` points at one generation."""
+        return self.settings.model_copy(update={"RAG_INDEX_DIR": index_dir})
+
+    def _open(self, index_dir: Path, generation: Optional[str]) -> HybridRetriever:
+        """Create a retriever on a generation directory, sharing model, caches and pools."""
+        retriever = HybridRetriever(
+            self._settings_for(index_dir),
+            self.query_cache,
+            self.result_cache,
+            self.encode_batcher,
+            self.shard_executor,
+        )
+        retriever.generation = generation
+        for shard in retriever.shards:
+            shard.vector_store.model = self.model
+        return retriever
+
+    def snapshot(self) -> HybridRetriever:
+        """Return the retriever for the published generation.
+
+        Cheap enough to call per request: the pointer is re-read so that
+        generations published by other processes are picked up, and the
+        snapshot is only reloaded when it changed.
+
+        Returns:
+            Immutable retriever snapshot (empty if nothing is published)
+        """
+        snapshot = self._snapshot
+        name = self.current()
+        if snapshot is not None and snapshot.generation == name:
+            return snapshot
+
+        with self._reload_lock:
+            snapshot = self._snapshot
+            if snapshot is None or snapshot.generation != name:
+                snapshot = self._open(self.current_dir(), name)
+                snapshot.load()  # Try to load existing index
+                self.model = snapshot.vector_store.model or self.model
+                self._snapshot = snapshot
+                logger.info("index_snapshot_loaded", generation=name)
+        return snapshot
+
+    def _next_name(self) -> str:
+        """Pick a generation name above every existing one."""
+        numbers = [0]
+        if self.generations_dir.exists():
+            for entry in self.generations_dir.iterdir():
+                match = _GENERATION_RE.match(entry.name)
+                if match:
+                    numbers.append(int(match.group(1)))
+        return f"gen-{max(numbers) + 1:06d}"
+
+    def begin(self, clean: bool) -> HybridRetriever:
+        """Create a writable retriever in a new generation directory.
+
+        Args:
+            clean: Start empty instead of from the published generation
+
+        Returns:
+            Retriever to update and pass to ``publish`` or ``abort``
+        """
+        name = self._next_name()
+        target = self.generations_dir / name
+        target.mkdir(parents=True)
+        owner = {"host": socket.gethostname(), "pid": os.getpid()}
+        (target / BUILDING_MARKER).write_text(json.dumps(owner))
+
+        source = self.current_dir()
+        if not clean and source.exists():
+            self._link_tree(source, target)
+
+        writer = self._open(target, name)
+        writer.base_generation = self.current()
+        writer.rebuilt = clean
+        if not clean:
+            writer.load()
+        logger.info(
+            "index_generation_started",
+            generation=name,
+            base=writer.base_generation,
+            clean=clean,
+        )
+        return writer
+
+    def _link_tree(self, source: Path, target: Path) -> None:
+        """Populate a new generation with hard links to another one's files."""
+        for entry in source.iterdir():
+            if entry.name.endswith(".tmp"):
+                continue
+            # A pre-generations index shares RAG_INDEX_DIR with the generations
+            if source == self.root and entry.name not in LEGACY_ENTRIES:
+                continue
+            if entry.is_dir():
+                target_dir = target / entry.name
+                target_dir.mkdir()
+                self._link_tree(entry, target_dir)
+                continue
+            try:
+                os.link(entry, target / entry.name)
+            except OSError:
+                shutil.copy2(entry, target / entry.name)
+
+    @contextmanager
+    def _publish_lock(self) -> Iterator[None]:
+        """Hold the lock that serializes publishing and collection across processes."""
+        fd = os.open(self.root / PUBLISH_LOCK_FILE, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            yield
+        finally:
+            os.close(fd)
+
+    def publish(self, writer: HybridRetriever) -> HybridRetriever:
+        """Make a saved generation current and swap the snapshot to it.
+
+        A generation is only published on top of the one its build started
+        from. If another build published in the meantime, this one would
+        revert its changes (or move ``current`` back to an older number),
+        so it is discarded instead.
+
+        Args:
+            writer: Retriever returned by ``begin``, already saved
+
+        Returns:
+            The new snapshot
+
+        Raises:
+            GenerationConflictError: If another generation was published
+                since ``begin``
+        """
+        name = writer.generation
+        assert name is not None
+        target = self.generations_dir / name
+
+        # Everything must be durable before the pointer can reference it
+        for directory, _, files in os.walk(target):
+            for file_name in files:
+                _fsync_path(Path(directory) / file_name)
+            _fsync_path(Path(directory))
+        _fsync_path(self.generations_dir)
+
+        with self._publish_lock():
+            current = self.current()
+            if current != writer.base_generation:
+                self.abort(writer)
+                raise GenerationConflictError(
+                    f"{current} was published while {name} was being built "
+                    f"from {writer.base_generation or 'scratch'}"
+                )
+
+            pointer = self.root / POINTER_FILE
+            tmp_path = pointer.with_suffix(".tmp")
+            with open(tmp_path, "w") as f:
+                f.write(name)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, pointer)
+            _fsync_path(self.root)
+            # Only now: without the marker, a generation newer than the
+            # pointer counts as an abandoned build
+            (target / BUILDING_MARKER).unlink()
+
+        self.model = writer.vector_store.model or self.model
+        snapshot = self._open(target, name)
+        snapshot.load()
+        self._snapshot = snapshot
+        # Results are keyed by generation; drop the ones nothing can hit anymore
+        self.result_cache.clear()
+        # Answers are checked against the retrieved chunks' file hashes on
+        # lookup; drop those citing changed files now to free their slots
+        self.answer_cache.invalidate(writer.changed_files, complete=writer.rebuilt)
+        logger.info("index_generation_published", generation=name)
+
+        self.collect_garbage()
+        return snapshot
+
+    def abort(self, writer: HybridRetriever) -> None:
+        """Discard an unpublished generation.
+
+        Args:
+            writer: Retriever returned by ``begin``
+        """
+        name = writer.generation
+        assert name is not None
+        shutil.rmtree(self.generations_dir / name, ignore_errors=True)
+        logger.info("index_generation_discarded", generation=name)
+
+    @staticmethod
+    def _build_in_progress(generation_dir: Path) -> bool:
+        """Check whether a live build is writing a generation.
+
+        ``begin`` leaves a marker naming the building host and process.
+        A local builder is alive if its process is; one on another host
+        (sharing the index volume) is trusted until its marker is
+        ``BUILDING_MARKER_MAX_AGE_S`` old.
+        """
+        marker = generation_dir / BUILDING_MARKER
+        try:
+            owner = json.loads(marker.read_text())
+            age = time.time() - marker.stat().st_mtime
+        except (OSError, ValueError):
+            return False
+        if owner.get("host") != socket.gethostname():
+            return age < BUILDING_MARKER_MAX_AGE_S
+        try:
+            os.kill(int(owner["pid"]), 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass  # alive, owned by another user
+        return True
+
+    def collect_garbage(self) -> List[str]:
+        """Delete old and abandoned generations.
+
+        Keeps the current generation and the ``RAG_INDEX_KEEP_GENERATIONS - 1``
+        published before it; generations newer than the current one that no
+        build is writing are leftovers of failed builds. Generations a build
+        is writing, in this or another process, are never deleted (see
+        ``_build_in_progress``), and ``publish`` holds the same lock, so the
+        pointer cannot move past a generation while it is being judged.
+
+        Returns:
+            Names of the deleted generations
+        """
+        if not self.generations_dir.exists():
+            return []
+        with self._publish_lock():
+            return self._collect_garbage()
+
+    def _collect_garbage(self) -> List[str]:
+        """Delete old and abandoned generations; the publish lock must be held."""
+        current = self.current()
+        if current is None:
+            return []
+
+        current_number = int(current.split("-")[1])
+        older = []
+        deleted = []
+        for entry in self.generations_dir.iterdir():
+            match = _GENERATION_RE.match(entry.name)
+            if not match or self._build_in_progress(entry):
+                continue
+            number = int(match.group(1))
+            if number < current_number:
+                older.append((number, entry))
+            elif number > current_number:
+                shutil.rmtree(entry, ignore_errors=True)
+                deleted.append(entry.name)
+
+        older.sort()
+        keep = self.settings.RAG_INDEX_KEEP_GENERATIONS - 1
+        for _, entry in older[: max(0, len(older) - keep)]:
+            shutil.rmtree(entry, ignore_errors=True)
+            deleted.append(entry.name)
+
+        # Files from before generations are superseded by the first publish
+        for legacy in LEGACY_ENTRIES:
+            path = self.root / legacy
+            if path.is_dir():
+                shutil.rmtree(path, ignore_errors=True)
+            elif path.exists():
+                path.unlink()
+
+        if deleted:
+            logger.info("index_generations_collected", deleted=deleted)
+        return deleted
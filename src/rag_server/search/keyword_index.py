@@ -1,80 +1,333 @@
 """Keyword-based search using BM25."""
 
-import pickle
-from pathlib import Path
+import json
+import os
 from typing import Any, Dict, List, Optional, Tuple
 
-from rank_bm25 import BM25Okapi
+import numpy as np
+from scipy import sparse
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
+from rag_server.search.chunk_store import ChunkStore
+from rag_server.search.tokenizer import CodeTokenizer
 
 logger = get_logger(__name__)
 
+# Okapi BM25 parameters (same defaults as rank_bm25.BM25Okapi)
+BM25_K1 = 1.5
+BM25_B = 0.75
+BM25_EPSILON = 0.25
+
+# Fraction of removed documents tolerated before their postings are dropped
+DEAD_COMPACT_RATIO = 0.2
+
 
 class KeywordIndex:
-    """BM25-based keyword search index."""
+    """BM25-based keyword search index.
+
+    Postings live in a term-major CSR matrix (one row per term, one column per
+    document slot) holding term frequencies, alongside precomputed BM25 term
+    weights. A query only reads the rows of its own terms. Removed documents
+    are masked out and their columns dropped once they pile up, so chunks can
+    be added and removed by ID without re-tokenizing the rest of the corpus.
+    Chunk IDs must be added in ascending order. Scores match
+    ``rank_bm25.BM25Okapi`` for the same corpus.
+    """
+
+    # Arrays persisted as .npy files under <index dir>/bm25
+    ARRAYS = ("indptr", "indices", "tf", "weights", "idf", "doc_ids", "doc_len", "live", "df")
 
-    def __init__(self, settings: Settings):
+    def __init__(self, settings: Settings, documents: Optional[ChunkStore] = None):
         """Initialize the keyword index.
 
         Args:
             settings: Application settings
+            documents: Chunk store shared with other indices (a private one if omitted)
         """
         self.settings = settings
-        self.index_dir = settings.RAG_INDEX_DIR
-        self.bm25: Optional[BM25Okapi] = None
-        self.documents: List[Dict[str, Any]] = []
+        self.index_dir = settings.RAG_INDEX_DIR / "bm25"
+        self.tokenizer = CodeTokenizer(stopwords=settings.RAG_BM25_STOPWORDS)
+        self.max_vocab = settings.RAG_BM25_MAX_VOCAB
+        self.documents = documents if documents is not None else ChunkStore(settings)
+        self._reset()
+
+    def _reset(self) -> None:
+        """Clear all postings and corpus statistics."""
+        self.vocab: Dict[str, int] = {}
+        self.tf = sparse.csr_matrix((0, 0), dtype=np.float32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.doc_ids = np.zeros(0, dtype=np.int64)
+        self.doc_len = np.zeros(0, dtype=np.float32)
+        self.live = np.zeros(0, dtype=bool)
+        self.df = np.zeros(0, dtype=np.int64)
+        self.idf = np.zeros(0, dtype=np.float64)
+        # Added postings blocks (tf, ids, lengths) not yet merged into the CSR
+        self._pending: List[Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]] = []
+        # Built from empty: every term is indexed until ``flush`` prunes the
+        # vocabulary to the RAG_BM25_MAX_VOCAB most frequent ones
+        self._uncapped = True
+
+    def clear(self) -> None:
+        """Drop all postings and chunks."""
+        self._reset()
+        self.documents.clear()
 
     def build_index(self, chunks: List[Dict[str, Any]]) -> None:
         """Build BM25 index from chunks.
 
         Args:
-            chunks: List of chunks with content and metadata
+            chunks: List of chunks with content, metadata and a unique integer ``id``
         """
         logger.info("building_keyword_index", chunks=len(chunks))
 
-        self.documents = chunks
-        tokenized_corpus = [chunk["content"].lower().split() for chunk in chunks]
-        self.bm25 = BM25Okapi(tokenized_corpus)
+        self.clear()
+        self.add_chunks(sorted(chunks, key=lambda chunk: chunk["id"]))
+        self.flush()
+
+        logger.info("keyword_index_built", terms=len(self.vocab), postings=self.tf.nnz)
+
+    def add_chunks(
+        self, chunks: List[Dict[str, Any]], tokenized: Optional[List[List[str]]] = None
+    ) -> None:
+        """Add chunks to the index.
+
+        Postings are buffered per call and merged into the CSR matrix (with
+        corpus statistics updated) on ``flush``, which searches, removals and
+        saves trigger, so streaming many small batches stays linear. A build
+        from an empty index indexes every term and ``flush`` then keeps the
+        ``RAG_BM25_MAX_VOCAB`` terms that occur in the most chunks; later
+        additions do not index terms outside the vocabulary once it is full.
+
+        Args:
+            chunks: List of chunks with content, metadata and a unique integer ``id``
+            tokenized: Pre-tokenized chunk contents, if already available
+        """
+        if not chunks:
+            return
+        if tokenized is None:
+            tokenized = [self.tokenizer.tokenize(chunk["content"]) for chunk in chunks]
+
+        new_ids = np.array([chunk["id"] for chunk in chunks], dtype=np.int64)
+        last_id = self._pending[-1][1][-1] if self._pending else self.doc_ids[-1:]
+        if np.any(np.diff(new_ids) <= 0) or (np.size(last_id) and new_ids[0] <= last_id):
+            raise ValueError("Chunk IDs must be added in ascending order")
+
+        vocab = self.vocab
+        max_vocab = self.max_vocab if self.max_vocab and not self._uncapped else float("inf")
+        rows: List[int] = []
+        cols: List[int] = []
+        lengths = np.zeros(len(chunks), dtype=np.float32)
+        for offset, tokens in enumerate(tokenized):
+            term_ids = []
+            for token in tokens:
+                term_id = vocab.get(token)
+                if term_id is None:
+                    if len(vocab) >= max_vocab:
+                        continue
+                    term_id = vocab[token] = len(vocab)
+                term_ids.append(term_id)
+            lengths[offset] = len(term_ids)
+            rows.extend(term_ids)
+            cols.extend([offset] * len(term_ids))
+
+        # Duplicate (term, doc) pairs are summed into term frequencies
+        new_tf = sparse.coo_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(len(vocab), len(chunks)),
+        ).tocsr()
+        self._pending.append((new_tf, new_ids, lengths))
+        self.documents.add(chunks)
+
+    def flush(self) -> None:
+        """Merge buffered postings and finish a build from empty.
+
+        The first flush after ``clear`` (or on a new index) prunes the
+        vocabulary to ``RAG_BM25_MAX_VOCAB`` terms.
+        """
+        self._merge_pending()
+        if self._uncapped:
+            self._uncapped = False
+            self._prune_vocab()
+
+    def _merge_pending(self) -> None:
+        """Merge buffered postings into the CSR matrix and refresh BM25 weights."""
+        if not self._pending:
+            return
+
+        n_terms = len(self.vocab)
+        blocks = [self.tf]
+        for block, _, _ in self._pending:
+            block.resize((n_terms, block.shape[1]))
+            blocks.append(block)
+        self.tf.resize((n_terms, self.tf.shape[1]))
+        self.tf = sparse.hstack(blocks, format="csr", dtype=np.float32)
+
+        new_ids = np.concatenate([ids for _, ids, _ in self._pending])
+        self.doc_ids = np.concatenate([self.doc_ids, new_ids])
+        self.doc_len = np.concatenate([self.doc_len] + [lengths for _, _, lengths in self._pending])
+        self.live = np.concatenate([self.live, np.ones(len(new_ids), dtype=bool)])
+        self.df = np.concatenate([self.df, np.zeros(n_terms - len(self.df), dtype=np.int64)])
+        for block, _, _ in self._pending:
+            self.df += np.diff(block.indptr)
+        self._pending = []
+
+        self._update_weights()
+
+    def _prune_vocab(self) -> None:
+        """Keep only the ``RAG_BM25_MAX_VOCAB`` terms that occur in the most chunks."""
+        if not self.max_vocab or len(self.vocab) <= self.max_vocab:
+            return
+        # Stable: ties keep the term seen first, like Counter.most_common
+        keep = np.sort(np.argsort(-self.df, kind="stable")[: self.max_vocab])
+        terms = sorted(self.vocab, key=self.vocab.__getitem__)
+        self.vocab = {terms[term_id]: row for row, term_id in enumerate(keep)}
+        self.tf = self.tf[keep].tocsr()
+        self.df = self.df[keep]
+        # Document lengths count indexed terms only
+        self.doc_len = np.asarray(self.tf.sum(axis=0), dtype=np.float32).ravel()
+        self._update_weights()
+        logger.info("keyword_vocab_pruned", terms=len(self.vocab), dropped=len(terms) - len(keep))
 
-        logger.info("keyword_index_built")
+    def remove_ids(self, ids: List[int]) -> None:
+        """Remove chunks from the index by ID, updating corpus statistics.
+
+        Args:
+            ids: Chunk IDs to remove
+        """
+        self._merge_pending()
+        dead = self._positions(ids)
+        if not len(dead):
+            return
+
+        self.documents.remove(int(doc_id) for doc_id in self.doc_ids[dead])
+        self.live[dead] = False
+
+        # Decrement document frequencies of the terms the removed docs contained
+        entries = np.flatnonzero(np.isin(self.tf.indices, dead))
+        terms = np.searchsorted(self.tf.indptr, entries, side="right") - 1
+        self.df -= np.bincount(terms, minlength=len(self.df))
+
+        if (~self.live).sum() > DEAD_COMPACT_RATIO * len(self.live):
+            self._compact()
+        self._update_weights()
+        logger.info("keyword_docs_removed", removed=len(dead), docs=len(self.documents))
+
+    def _compact(self) -> None:
+        """Drop the columns of removed documents and renumber positions."""
+        keep = np.flatnonzero(self.live)
+        self.tf = self.tf[:, keep].tocsr()
+        self.doc_ids = self.doc_ids[keep]
+        self.doc_len = self.doc_len[keep]
+        self.live = np.ones(len(keep), dtype=bool)
+
+    def _positions(self, ids: List[int]) -> np.ndarray:
+        """Map chunk IDs to the positions of their live document columns."""
+        wanted = np.asarray(ids, dtype=np.int64)
+        positions = np.searchsorted(self.doc_ids, wanted)
+        found = positions < len(self.doc_ids)
+        positions = positions[found]
+        matched = (self.doc_ids[positions] == wanted[found]) & self.live[positions]
+        live: np.ndarray = positions[matched]
+        return live
+
+    def _update_weights(self) -> None:
+        """Recompute IDF values and the precomputed BM25 term weights.
+
+        Mirrors ``BM25Okapi``: negative IDFs are floored to
+        ``epsilon * average_idf``, and each posting stores
+        ``tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avgdl))``.
+        """
+        corpus_size = int(self.live.sum())
+        if not corpus_size:
+            self.idf = np.zeros(len(self.df))
+            self.weights = np.zeros(self.tf.nnz, dtype=np.float32)
+            return
+
+        present = self.df > 0
+        idf = np.log(corpus_size - self.df + 0.5) - np.log(self.df + 0.5)
+        eps = BM25_EPSILON * idf[present].mean()
+        self.idf = np.where(present & (idf < 0), eps, idf)
+
+        avgdl = self.doc_len[self.live].sum() / corpus_size
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * self.doc_len / avgdl)
+        tf = self.tf.data
+        self.weights = (tf * (BM25_K1 + 1) / (tf + norm[self.tf.indices])).astype(np.float32)
 
     def save(self) -> None:
-        """Save BM25 index to disk."""
-        if self.bm25 is None:
+        """Save BM25 index to disk (chunks are saved by their ChunkStore)."""
+        self.flush()
+        if not self.live.any():
             logger.warning("no_keyword_index_to_save")
             return
 
-        bm25_path = self.index_dir / "bm25.pkl"
-        docs_path = self.index_dir / "bm25_docs.pkl"
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        arrays = {
+            "indptr": self.tf.indptr,
+            "indices": self.tf.indices,
+            "tf": self.tf.data,
+            "weights": self.weights,
+            "idf": self.idf,
+            "doc_ids": self.doc_ids,
+            "doc_len": self.doc_len,
+            "live": self.live,
+            "df": self.df,
+        }
+        # Replace atomically so mapped readers keep the previous files
+        for name, array in arrays.items():
+            tmp_path = self.index_dir / f"{name}.tmp.npy"
+            np.save(tmp_path, array)
+            os.replace(tmp_path, self.index_dir / f"{name}.npy")
 
-        with open(bm25_path, "wb") as f:
-            pickle.dump(self.bm25, f)
-        with open(docs_path, "wb") as f:
-            pickle.dump(self.documents, f)
+        vocab = sorted(self.vocab, key=self.vocab.__getitem__)
+        tmp_path = self.index_dir / "vocab.json.tmp"
+        tmp_path.write_text(json.dumps({"tokenizer": self.tokenizer.signature, "terms": vocab}))
+        os.replace(tmp_path, self.index_dir / "vocab.json")
 
         logger.info("keyword_index_saved")
 
     def load(self) -> bool:
-        """Load BM25 index from disk.
+        """Memory-map the BM25 index from disk.
+
+        Arrays are mapped copy-on-write: pages are shared between processes
+        until an incremental update modifies them.
 
         Returns:
             True if loaded successfully
         """
-        bm25_path = self.index_dir / "bm25.pkl"
-        docs_path = self.index_dir / "bm25_docs.pkl"
+        vocab_path = self.index_dir / "vocab.json"
 
-        if not bm25_path.exists() or not docs_path.exists():
+        if not vocab_path.exists():
             logger.warning("keyword_index_not_found")
             return False
 
         try:
-            with open(bm25_path, "rb") as f:
-                self.bm25 = pickle.load(f)
-            with open(docs_path, "rb") as f:
-                self.documents = pickle.load(f)
-            logger.info("keyword_index_loaded")
+            vocab_state = json.loads(vocab_path.read_text())
+            if vocab_state.get("tokenizer") != self.tokenizer.signature:
+                # Query terms would not line up with the indexed terms
+                logger.warning("keyword_index_tokenizer_mismatch", path=str(self.index_dir))
+                return False
+            vocab = vocab_state["terms"]
+            arrays = {
+                name: np.load(self.index_dir / f"{name}.npy", mmap_mode="c")
+                for name in self.ARRAYS
+            }
+
+            self._reset()
+            self.vocab = {term: term_id for term_id, term in enumerate(vocab)}
+            self.doc_ids = arrays["doc_ids"]
+            self.tf = sparse.csr_matrix(
+                (arrays["tf"], arrays["indices"], arrays["indptr"]),
+                shape=(len(vocab), len(self.doc_ids)),
+                copy=False,
+            )
+            self.weights = arrays["weights"]
+            self.idf = arrays["idf"]
+            self.doc_len = arrays["doc_len"]
+            self.live = arrays["live"]
+            self.df = arrays["df"]
+            self._uncapped = False
+            logger.info("keyword_index_loaded", terms=len(vocab), postings=self.tf.nnz)
             return True
         except Exception as e:
             logger.error("keyword_index_load_error", error=str(e))
@@ -90,19 +343,62 @@ class KeywordIndex:
         Returns:
             List of (document, score) tuples
         """
-        if self.bm25 is None or not self.documents:
-            logger.warning("no_keyword_index_loaded")
-            return []
+        return self.search_many([query], top_k)[0]
+
+    def search_many(
+        self, queries: List[str], top_k: int = 8
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """Search using BM25 for several queries at once.
 
-        tokenized_query = query.lower().split()
-        scores = self.bm25.get_scores(tokenized_query)
+        All queries are scored by one sparse product of their term counts with
+        the postings, which only touches the rows of terms that occur in some
+        query.
+
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+
+        Returns:
+            One list of (document, score) tuples per query
+        """
+        self._merge_pending()
+        if not self.live.any():
+            logger.warning("no_keyword_index_loaded")
+            return [[] for _ in queries]
 
-        # Get top K indices
-        top_indices = scores.argsort()[-top_k:][::-1]
+        # Query-term counts (repeated terms count repeatedly, as in BM25Okapi)
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, query in enumerate(queries):
+            for term in self.tokenizer.tokenize(query):
+                term_id = self.vocab.get(term)
+                if term_id is not None:
+                    rows.append(row)
+                    cols.append(term_id)
+        if not cols:
+            return [[] for _ in queries]
+        counts = sparse.csr_matrix(
+            (np.ones(len(cols)), (rows, cols)), shape=(len(queries), self.tf.shape[0])
+        )
+        postings = sparse.csr_matrix(
+            (self.weights, self.tf.indices, self.tf.indptr), shape=self.tf.shape, copy=False
+        )
+        scores_matrix = (counts.multiply(self.idf[np.newaxis, :]).tocsr() @ postings).tocsr()
 
-        results: List[Tuple[Dict[str, Any], float]] = []
-        for idx in top_indices:
-            if scores[idx] > 0:
-                results.append((self.documents[int(idx)], float(scores[idx])))
+        results: List[List[Tuple[Dict[str, Any], float]]] = []
+        for row in range(len(queries)):
+            span = slice(scores_matrix.indptr[row], scores_matrix.indptr[row + 1])
+            positions = scores_matrix.indices[span]
+            scores = scores_matrix.data[span]
+            keep = self.live[positions] & (scores > 0)
+            positions, scores = positions[keep], scores[keep]
 
+            # Select the top K without sorting every candidate
+            if len(scores) > top_k:
+                top = np.argpartition(-scores, top_k - 1)[:top_k]
+                positions, scores = positions[top], scores[top]
+            order = np.lexsort((positions, -scores))  # ties in index order
+            results.append(
+                [(self.documents[int(self.doc_ids[positions[i]])], float(scores[i])) for i in order]
+            )
         return results
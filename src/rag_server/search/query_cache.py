@@ -0,0 +1,255 @@
+"""Cache of query embeddings."""
+
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+
+logger = get_logger(__name__)
+
+# Entries kept on disk, as a multiple of the in-memory capacity
+DISK_CAPACITY_FACTOR = 10
+
+# Evicted entries written to disk per transaction
+SPILL_BATCH_SIZE = 32
+
+# The spill table is trimmed back to capacity once this much over it
+DISK_TRIM_SLACK = 0.1
+
+Key = Tuple[str, str]
+Entry = Tuple[np.ndarray, float]
+# (model, query, vector bytes, created) row of the spill table
+SpillRow = Tuple[str, str, bytes, float]
+
+
+def normalize_query(query: str) -> str:
+    """Canonicalize a query so trivially different spellings share embeddings.
+
+    Unicode is NFC-normalized and whitespace runs collapse to one space. Case
+    is kept, since cased embedding models distinguish it.
+
+    Args:
+        query: Raw query text
+
+    Returns:
+        Normalized query (also what gets embedded)
+    """
+    return " ".join(unicodedata.normalize("NFC", query).split())
+
+
+class QueryEmbeddingCache:
+    """Bounded LRU cache of query embeddings keyed by (model, normalized query).
+
+    Entries older than ``RAG_QUERY_CACHE_TTL_S`` are treated as misses. With
+    ``RAG_QUERY_CACHE_DIR`` set, entries evicted from memory spill to an
+    SQLite file there (about ``DISK_CAPACITY_FACTOR`` times the memory
+    capacity) and survive restarts. Evictions are queued and written
+    ``SPILL_BATCH_SIZE`` at a time outside the cache lock, so lookups never
+    wait for SQLite writes; call ``flush`` to write the queue at shutdown.
+    Thread-safe: retrievals run on a pool.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the cache.
+
+        Args:
+            settings: Application settings
+        """
+        self.maxsize = settings.RAG_QUERY_CACHE_SIZE
+        self.ttl = settings.RAG_QUERY_CACHE_TTL_S
+        self.spill_dir = settings.RAG_QUERY_CACHE_DIR
+        self._entries: "OrderedDict[Key, Entry]" = OrderedDict()
+        # Evicted entries not written to disk yet (still served from here)
+        self._spill_queue: "OrderedDict[Key, Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        # Serializes use of the SQLite connection; never taken inside _lock
+        self._db_lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._disk_rows = 0
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        """Open the spill database on first use (caller holds the db lock)."""
+        if self.spill_dir is None:
+            return None
+        if self._db is None:
+            Path(self.spill_dir).mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(
+                str(Path(self.spill_dir) / "query_embeddings.sqlite"), check_same_thread=False
+            )
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings "
+                "(model TEXT, query TEXT, vector BLOB, created REAL, PRIMARY KEY (model, query))"
+            )
+            self._disk_rows = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        return self._db
+
+    def _fresh(self, created: float, now: float) -> bool:
+        return not self.ttl or now - created < self.ttl
+
+    def get(self, model: str, query: str) -> Optional[np.ndarray]:
+        """Look up an embedding.
+
+        Args:
+            model: Embedding model name
+            query: Normalized query
+
+        Returns:
+            Read-only float32 array of shape ``(1, dim)``, or None on a miss
+        """
+        if not self.maxsize:
+            return None
+        key = (model, query)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, created = entry
+                if self._fresh(created, now):
+                    self._entries.move_to_end(key)
+                    self._counters["hits"] += 1
+                    return vector
+                del self._entries[key]
+                self._counters["expired"] += 1
+
+            # Evicted but not yet written: as good as on disk
+            queued = self._spill_queue.pop(key, None)
+            spill = None
+            if queued is not None and self._fresh(queued[1], now):
+                spill = self._insert(key, *queued)
+                self._counters["disk_hits"] += 1
+            else:
+                queued = None
+        if queued is not None:
+            self._spill(spill)
+            return queued[0]
+
+        row = None
+        if self.spill_dir is not None:
+            with self._db_lock:
+                db = self._connect()
+                assert db is not None
+                row = db.execute(
+                    "SELECT vector, created FROM embeddings WHERE model = ? AND query = ?", key
+                ).fetchone()
+
+        spill = None
+        loaded: Optional[np.ndarray] = None
+        with self._lock:
+            if row is not None and self._fresh(row[1], now):
+                loaded = np.frombuffer(row[0], dtype=np.float32).reshape(1, -1)
+                spill = self._insert(key, loaded, row[1])
+                self._counters["disk_hits"] += 1
+            else:
+                self._counters["misses"] += 1
+        self._spill(spill)
+        return loaded
+
+    def put(self, model: str, query: str, vector: np.ndarray) -> None:
+        """Store an embedding.
+
+        Args:
+            model: Embedding model name
+            query: Normalized query
+            vector: float32 array of shape ``(1, dim)``; made read-only
+        """
+        if not self.maxsize:
+            return
+        vector.setflags(write=False)
+        with self._lock:
+            spill = self._insert((model, query), vector, time.time())
+        self._spill(spill)
+
+    def _insert(self, key: Key, vector: np.ndarray, created: float) -> Optional[List[SpillRow]]:
+        """Add an entry, evicting the least recently used (caller holds the lock).
+
+        Returns:
+            A full batch of evicted entries to pass to ``_spill`` once the
+            lock is released, or None
+        """
+        self._entries[key] = (vector, created)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+            if self.spill_dir is not None:
+                self._spill_queue[evicted_key] = evicted
+        if len(self._spill_queue) < SPILL_BATCH_SIZE:
+            return None
+        return self._take_spill_queue()
+
+    def _take_spill_queue(self) -> List[SpillRow]:
+        """Empty the spill queue into rows to write (caller holds the lock)."""
+        rows = [(m, q, vec.tobytes(), ts) for (m, q), (vec, ts) in self._spill_queue.items()]
+        self._spill_queue.clear()
+        return rows
+
+    def _spill(self, rows: Optional[List[SpillRow]]) -> None:
+        """Write evicted entries to disk in one transaction (without the cache lock).
+
+        The table is trimmed to the ``DISK_CAPACITY_FACTOR`` newest entries
+        only when it has grown ``DISK_TRIM_SLACK`` past that, so most writes
+        are plain inserts.
+        """
+        if not rows:
+            return
+        capacity = self.maxsize * DISK_CAPACITY_FACTOR
+        with self._db_lock:
+            db = self._connect()
+            assert db is not None
+            db.executemany("INSERT OR REPLACE INTO embeddings VALUES (?, ?, ?, ?)", rows)
+            # Replaced rows are counted too; the trim corrects the estimate
+            self._disk_rows += len(rows)
+            if self._disk_rows > capacity * (1 + DISK_TRIM_SLACK):
+                db.execute(
+                    "DELETE FROM embeddings WHERE rowid IN (SELECT rowid FROM embeddings "
+                    "ORDER BY created DESC LIMIT -1 OFFSET ?)",
+                    (capacity,),
+                )
+                self._disk_rows = db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+            db.commit()
+
+    def flush(self) -> None:
+        """Write the entries queued for the spill file now."""
+        with self._lock:
+            rows = self._take_spill_queue()
+        self._spill(rows)
+
+    def clear(self) -> None:
+        """Drop all entries, in memory and on disk."""
+        with self._lock:
+            self._entries.clear()
+            self._spill_queue.clear()
+        if self.spill_dir is not None:
+            with self._db_lock:
+                db = self._connect()
+                assert db is not None
+                db.execute("DELETE FROM embeddings")
+                db.commit()
+                self._disk_rows = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cache size and hit/miss counters.
+
+        Returns:
+            Counters plus ``size``, ``capacity`` and ``hit_rate``
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters["hits"] + counters["disk_hits"] + counters["misses"]
+        hits = counters["hits"] + counters["disk_hits"]
+        return {
+            **counters,
+            "size": size,
+            "capacity": self.maxsize,
+            "hit_rate": round(hits / lookups, 4) if lookups else 0.0,
+        }
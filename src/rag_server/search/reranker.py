@@ -0,0 +1,181 @@
+"""Cross-encoder reranking of retrieved matches."""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Tuple, cast
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.core.schemas import Match
+from rag_server.search.embedding_cache import text_digest
+from rag_server.search.query_cache import normalize_query
+
+if TYPE_CHECKING:
+    from sentence_transformers import CrossEncoder
+
+logger = get_logger(__name__)
+
+
+class Reranker:
+    """Rescores fused candidates with a cross-encoder, within a latency budget.
+
+    The (query, chunk) pairs are scored on the CPU in batches of
+    ``RAG_RERANK_BATCH_SIZE``. Before each batch, the first one included,
+    the time per pair measured on earlier batches is used to check that it
+    still fits ``RAG_RERANK_BUDGET_MS``. When it does not, the candidates
+    keep their RRF order. Batches are timed from ``warm_up`` on; before
+    any was timed, the first one runs. Scores are cached by normalized
+    query and chunk text hash (``RAG_RERANK_CACHE_SIZE`` entries, LRU), so
+    repeated and overlapping questions score only new chunks; batches
+    scored before a fallback are cached too. Thread-safe.
+    """
+
+    def __init__(self, settings: Settings, model: Optional[Any] = None):
+        """Initialize the reranker.
+
+        Args:
+            settings: Application settings
+            model: Cross-encoder (loaded on first use if None)
+        """
+        self.settings = settings
+        self.model: Optional["CrossEncoder"] = model
+        self.candidates = settings.RAG_RERANK_CANDIDATES
+        self.batch_size = settings.RAG_RERANK_BATCH_SIZE
+        self.budget_s = settings.RAG_RERANK_BUDGET_MS / 1000
+        self.maxsize = settings.RAG_RERANK_CACHE_SIZE
+        self._scores: "OrderedDict[Tuple[str, bytes], float]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "fallbacks": 0}
+        # Moving average of the seconds a batch takes per pair
+        self._pair_s = 0.0
+
+    def load_model(self) -> "CrossEncoder":
+        """Load the cross-encoder if not loaded yet (once, even if called concurrently)."""
+        with self._load_lock:
+            if self.model is None:
+                # Imports torch and transformers: seconds, so only when enabled
+                from sentence_transformers import CrossEncoder
+
+                logger.info("loading_rerank_model", model=self.settings.RAG_RERANK_MODEL)
+                start = time.perf_counter()
+                self.model = CrossEncoder(self.settings.RAG_RERANK_MODEL, device="cpu")
+                logger.info("rerank_model_loaded", seconds=round(time.perf_counter() - start, 2))
+        assert self.model is not None
+        return self.model
+
+    def warm_up(self) -> None:
+        """Load the model and time one full batch, so budget checks apply from the first query."""
+        model = self.load_model()
+        pairs = [("warm up", "warm up")] * self.batch_size
+        start = time.perf_counter()
+        model.predict(pairs, batch_size=len(pairs), show_progress_bar=False)
+        with self._lock:
+            self._pair_s = (time.perf_counter() - start) / len(pairs)
+
+    def rerank(
+        self, query: str, matches: List[Match], top_k: int
+    ) -> Tuple[List[Match], Dict[str, Any]]:
+        """Reorder matches by cross-encoder relevance.
+
+        Args:
+            query: Search query
+            matches: Fused candidates, best first
+            top_k: Number of matches to return
+
+        Returns:
+            ``(matches, stats)``: the ``top_k`` best by cross-encoder score
+            (the score replaces the RRF one, kept as ``rrf_score`` metadata),
+            or the first ``top_k`` candidates if scoring them all would
+            exceed the budget; stats
+            report ``reranked``, the counts of ``candidates``, ``scored``
+            and ``cached`` pairs, and the time taken in ``ms``
+        """
+        model = self.load_model()
+        start = time.perf_counter()
+        query = normalize_query(query)
+        keys = [(query, text_digest(match.snippet)) for match in matches]
+
+        scores: List[Optional[float]] = [None] * len(matches)
+        with self._lock:
+            for i, key in enumerate(keys):
+                score = self._scores.get(key)
+                if score is not None:
+                    self._scores.move_to_end(key)
+                    scores[i] = score
+            cached = sum(score is not None for score in scores)
+            self._counters["hits"] += cached
+            self._counters["misses"] += len(matches) - cached
+
+        pending = [i for i, score in enumerate(scores) if score is None]
+        for offset in range(0, len(pending), self.batch_size):
+            batch = pending[offset : offset + self.batch_size]
+            expected_s = self._pair_s * len(batch)
+            if time.perf_counter() - start + expected_s > self.budget_s:
+                break
+            batch_start = time.perf_counter()
+            predicted = model.predict(
+                [(query, matches[i].snippet) for i in batch],
+                batch_size=len(batch),
+                show_progress_bar=False,
+            )
+            pair_s = (time.perf_counter() - batch_start) / len(batch)
+            with self._lock:
+                self._pair_s = pair_s if not self._pair_s else (self._pair_s + pair_s) / 2
+                for i, score in zip(batch, predicted):
+                    scores[i] = float(score)
+                    self._put(keys[i], float(score))
+
+        stats: Dict[str, Any] = {
+            "reranked": all(score is not None for score in scores),
+            "candidates": len(matches),
+            "scored": sum(score is not None for score in scores) - cached,
+            "cached": cached,
+        }
+        stats["ms"] = round((time.perf_counter() - start) * 1000, 1)
+        if not stats["reranked"]:
+            with self._lock:
+                self._counters["fallbacks"] += 1
+            logger.warning("rerank_budget_exceeded", budget_ms=self.budget_s * 1000, **stats)
+            return matches[:top_k], stats
+
+        final = cast(List[float], scores)
+        order = sorted(range(len(matches)), key=lambda i: final[i], reverse=True)[:top_k]
+        reranked = [
+            matches[i].model_copy(
+                update={
+                    "score": final[i],
+                    "metadata": {**matches[i].metadata, "rrf_score": matches[i].score},
+                }
+            )
+            for i in order
+        ]
+        return reranked, stats
+
+    def _put(self, key: Tuple[str, bytes], score: float) -> None:
+        """Cache a score, evicting the least recently used (caller holds the lock)."""
+        if not self.maxsize:
+            return
+        self._scores[key] = score
+        self._scores.move_to_end(key)
+        while len(self._scores) > self.maxsize:
+            self._scores.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        """Report score cache size and hit/miss counters.
+
+        Returns:
+            Counters plus ``size``, ``capacity`` and ``hit_rate``
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._scores)
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "capacity": self.maxsize,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,120 @@
+"""Cache of retrieval results."""
+
+import sys
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.core.schemas import Match
+
+logger = get_logger(__name__)
+
+# Rough per-match overhead (model, dict and score objects) on top of its strings
+MATCH_OVERHEAD_BYTES = 600
+
+
+def _estimate_size(matches: List[Match]) -> int:
+    """Approximate the memory held by a cached result list."""
+    size = sys.getsizeof(matches)
+    for match in matches:
+        size += MATCH_OVERHEAD_BYTES + len(match.snippet) + 2 * len(match.path)
+    return size
+
+
+class RetrievalCache:
+    """Bounded LRU cache of fused retrieval results.
+
+    Keys include the index generation, so results from a replaced index can
+    never be served; the cache is also cleared whenever a generation is
+    published to free that memory at once. Bounded both by entry count
+    (``RAG_RESULT_CACHE_SIZE``, 0 disables) and by the approximate size of
+    the cached matches (``RAG_RESULT_CACHE_MAX_MB``). Thread-safe.
+    """
+
+    def __init__(self, settings: Settings):
+        """Initialize the cache.
+
+        Args:
+            settings: Application settings
+        """
+        self.maxsize = settings.RAG_RESULT_CACHE_SIZE
+        self.max_bytes = int(settings.RAG_RESULT_CACHE_MAX_MB * 1024 * 1024)
+        self._entries: "OrderedDict[Hashable, Tuple[List[Match], int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "clears": 0}
+
+    def get(self, key: Hashable) -> Optional[List[Match]]:
+        """Look up the results for a retrieval.
+
+        Args:
+            key: Generation, normalized query and search parameters
+
+        Returns:
+            A new list of the cached matches (do not modify them), or None
+        """
+        if not self.maxsize:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return list(entry[0])
+
+    def put(self, key: Hashable, matches: List[Match]) -> None:
+        """Store the results of a retrieval.
+
+        Args:
+            key: Generation, normalized query and search parameters
+            matches: Fused matches
+        """
+        if not self.maxsize:
+            return
+        size = _estimate_size(matches)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= previous[1]
+            self._entries[key] = (list(matches), size)
+            self._bytes += size
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self._bytes -= evicted_size
+                self._counters["evictions"] += 1
+
+    def clear(self) -> None:
+        """Drop all entries."""
+        with self._lock:
+            dropped = len(self._entries)
+            self._entries.clear()
+            self._bytes = 0
+            self._counters["clears"] += 1
+        logger.info("retrieval_cache_cleared", entries=dropped)
+
+    def stats(self) -> Dict[str, Any]:
+        """Report cache size and hit/miss counters.
+
+        Returns:
+            Counters plus ``size``, ``capacity``, ``bytes``, ``max_bytes`` and
+            ``hit_rate``
+        """
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+            used = self._bytes
+        lookups = counters["hits"] + counters["misses"]
+        return {
+            **counters,
+            "size": size,
+            "capacity": self.maxsize,
+            "bytes": used,
+            "max_bytes": self.max_bytes,
+            "hit_rate": round(counters["hits"] / lookups, 4) if lookups else 0.0,
+        }
@@ -1,28 +1,90 @@
 """Hybrid retrieval combining vector and keyword search."""
 
-from typing import Any, Dict, List
+import heapq
+import itertools
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, TypeVar, cast
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
 from rag_server.core.schemas import Match
-from rag_server.search.keyword_index import KeywordIndex
-from rag_server.search.vector_store import VectorStore
+from rag_server.search.encode_batcher import EncodeBatcher
+from rag_server.search.query_cache import QueryEmbeddingCache, normalize_query
+from rag_server.search.result_cache import RetrievalCache
+from rag_server.search.shards import SHARDS_DIR, Hits, IndexShard, Results, shard_for
 
 logger = get_logger(__name__)
 
+# Write added chunk texts to the mapped store once this many are held in memory
+CHUNK_SPILL_THRESHOLD = 50_000
+
+T = TypeVar("T")
+
 
 class HybridRetriever:
-    """Combines vector and keyword search with re-ranking."""
+    """Combines vector and keyword search with re-ranking.
 
-    def __init__(self, settings: Settings):
+    With ``RAG_INDEX_SHARDS`` above 1 the index is split into shards by
+    file path or repository (see ``shard_for``). Each shard is searched in
+    parallel on a thread pool (FAISS and the BM25 matrix products release
+    the GIL) and the per-shard top hits are merged by score before fusion.
+    Queries are embedded once for all shards, and so are chunks when
+    building; index updates and saves also run per shard in parallel, and
+    shards that a build did not touch are not rewritten.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        result_cache: Optional[RetrievalCache] = None,
+        encode_batcher: Optional[EncodeBatcher] = None,
+        shard_executor: Optional[ThreadPoolExecutor] = None,
+    ):
         """Initialize the retriever.
 
         Args:
             settings: Application settings
+            query_cache: Query embedding cache to share (a private one if omitted)
+            result_cache: Retrieval result cache; only for read-only snapshots,
+                since results are keyed by generation (no caching if omitted)
+            encode_batcher: Batcher coalescing concurrent query encodes
+            shard_executor: Pool running per-shard work (a private one is
+                created if omitted and the index is sharded)
         """
         self.settings = settings
-        self.vector_store = VectorStore(settings)
-        self.keyword_index = KeywordIndex(settings)
+        self.shards = [
+            IndexShard(settings, number, query_cache, encode_batcher)
+            for number in range(settings.RAG_INDEX_SHARDS)
+        ]
+        # The first shard's indices (the whole index unless sharded); its
+        # vector store embeds queries and chunks for every shard, so the
+        # chunk embedding cache sees all of them
+        self.chunks = self.shards[0].chunks
+        self.vector_store = self.shards[0].vector_store
+        self.keyword_index = self.shards[0].keyword_index
+        self.result_cache = result_cache
+        self._shard_executor = shard_executor
+        # Index generation this retriever was loaded from or is writing
+        self.generation: Optional[str] = None
+        # Published generation a writer started from (None: nothing was published)
+        self.base_generation: Optional[str] = None
+        # sha256 of the files added or modified since loading (None: deleted),
+        # and whether the index was cleared first so these are all its files
+        self.changed_files: Dict[str, Optional[str]] = {}
+        self.rebuilt = False
+
+    def _map_shards(self, fn: Callable[[IndexShard], T]) -> List[T]:
+        """Apply ``fn`` to every shard, in parallel when there are several."""
+        if len(self.shards) == 1:
+            return [fn(self.shards[0])]
+        if self._shard_executor is None:
+            self._shard_executor = ThreadPoolExecutor(
+                max_workers=len(self.shards), thread_name_prefix="shard"
+            )
+        return list(self._shard_executor.map(fn, self.shards))
 
     def build_indices(self, chunks: List[Dict[str, Any]]) -> None:
         """Build both vector and keyword indices.
@@ -31,41 +93,233 @@ class HybridRetriever:
             chunks: List of chunks to index
         """
         logger.info("building_indices")
-        self.vector_store.build_index(chunks)
-        self.keyword_index.build_index(chunks)
+        self.clear()
+        self.update_indices(chunks, [])
+        self.flush()
+
+    def clear(self) -> None:
+        """Drop all indexed chunks (before streaming a clean build)."""
+        for shard in self.shards:
+            shard.clear()
+        self.changed_files.clear()
+        self.rebuilt = True
+
+    def flush(self) -> None:
+        """Finish buffered additions (IVF-PQ training, BM25 weight refresh)."""
+        self._map_shards(IndexShard.flush)
+
+    def update_indices(self, chunks: List[Dict[str, Any]], removed_paths: Iterable[str]) -> None:
+        """Apply a delta to both indices without rebuilding them.
+
+        Chunks belonging to ``removed_paths`` (deleted or modified files) are
+        dropped by ID, then ``chunks`` (new or modified files) are embedded and
+        added. Chunks of untouched files are left as they are. Called once per
+        ingestion batch when streaming a build; ``flush`` finishes the build.
+
+        Args:
+            chunks: New chunks to index
+            removed_paths: Paths whose existing chunks should be dropped
+        """
+        removed_paths = list(removed_paths)
+        logger.info("updating_indices", removed_paths=len(removed_paths), added_chunks=len(chunks))
+        embeddings = self.vector_store.encode_chunks(chunks) if chunks else None
+
+        # Partition the delta by shard
+        shard_chunks: List[List[Dict[str, Any]]] = [[] for _ in self.shards]
+        shard_rows: List[List[int]] = [[] for _ in self.shards]
+        shard_removed: List[List[str]] = [[] for _ in self.shards]
+        for row, chunk in enumerate(chunks):
+            number = shard_for(chunk["metadata"]["path"], self.settings)
+            shard_chunks[number].append(chunk)
+            shard_rows[number].append(row)
+        for path in removed_paths:
+            shard_removed[shard_for(path, self.settings)].append(path)
+            self.changed_files[path] = None
+        for chunk in chunks:
+            self.changed_files[chunk["metadata"]["path"]] = chunk["metadata"].get("sha256")
+
+        def update(shard: IndexShard) -> None:
+            rows = shard_rows[shard.number]
+            shard.update(
+                shard_chunks[shard.number],
+                embeddings[rows] if embeddings is not None and rows else None,
+                shard_removed[shard.number],
+            )
+            # Bound memory on large builds by moving chunk texts to the mapped store
+            if shard.chunks.pending() >= CHUNK_SPILL_THRESHOLD:
+                shard.chunks.save()
+
+        self._map_shards(update)
+
+    def is_empty(self) -> bool:
+        """Check whether the indices hold any chunks.
+
+        Returns:
+            True if nothing is indexed
+        """
+        return not any(shard.chunks for shard in self.shards)
+
+    def index_stats(self) -> Dict[str, int]:
+        """Count the files and chunks currently indexed.
+
+        Returns:
+            Dict with ``files_indexed`` and ``chunks`` totals
+        """
+        return {
+            "files_indexed": sum(len(shard.chunks.paths()) for shard in self.shards),
+            "chunks": sum(len(shard.chunks) for shard in self.shards),
+        }
 
     def save(self) -> None:
-        """Save indices to disk."""
-        self.vector_store.save()
-        self.keyword_index.save()
+        """Save indices to disk (only the shards that changed)."""
+        self._map_shards(IndexShard.save)
+        if len(self.shards) > 1:
+            layout = self.settings.RAG_INDEX_DIR / SHARDS_DIR / "layout.json"
+            tmp_path = layout.with_suffix(".tmp")
+            tmp_path.write_text(json.dumps(self._shard_layout()))
+            os.replace(tmp_path, layout)
+
+    def _shard_layout(self) -> Dict[str, Any]:
+        """Describe how chunks are partitioned, to detect changed settings."""
+        return {"shards": len(self.shards), "by": self.settings.RAG_SHARD_BY}
 
     def load(self) -> bool:
         """Load indices from disk.
 
+        An index sharded differently than configured is not loaded, so the
+        next build is a clean one.
+
         Returns:
             True if loaded successfully
         """
-        vector_ok = self.vector_store.load()
-        keyword_ok = self.keyword_index.load()
-        return vector_ok and keyword_ok
+        if len(self.shards) > 1:
+            layout = self.settings.RAG_INDEX_DIR / SHARDS_DIR / "layout.json"
+            stored = json.loads(layout.read_text()) if layout.exists() else None
+            if stored != self._shard_layout():
+                if stored is not None or (self.settings.RAG_INDEX_DIR / "chunks").exists():
+                    logger.warning(
+                        "shard_layout_changed", stored=stored, configured=self._shard_layout()
+                    )
+                return False
+        return all(self._map_shards(IndexShard.load))
 
-    def retrieve(self, query: str, top_k: int = 8) -> List[Match]:
+    def retrieve(
+        self,
+        query: str,
+        top_k: int = 8,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[Match]:
         """Hybrid retrieval with RRF fusion.
 
         Args:
             query: Search query
             top_k: Number of results to return
+            nprobe: IVF lists to probe (vector index override)
+            ef_search: HNSW search breadth (vector index override)
 
         Returns:
             List of Match objects
         """
         logger.info("retrieving", query=query, top_k=top_k)
+        matches = self.retrieve_many([query], top_k, nprobe=nprobe, ef_search=ef_search)[0]
+        logger.info("retrieval_complete", matches=len(matches))
+        return matches
+
+    def retrieve_many(
+        self,
+        queries: List[str],
+        top_k: int = 8,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[Match]]:
+        """Hybrid retrieval for a batch of queries.
+
+        Queries that are not cached are embedded in one model batch, searched
+        with one FAISS call over the stacked embeddings and scored by one
+        sparse BM25 product, then fused per query as in ``retrieve``.
+
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            nprobe: IVF lists to probe (vector index override)
+            ef_search: HNSW search breadth (vector index override)
+
+        Returns:
+            One list of Match objects per query, in query order
+        """
+        normalized = [normalize_query(query) for query in queries]
+        keys = [(self.generation, query, top_k, nprobe, ef_search) for query in normalized]
+        results: List[Optional[List[Match]]] = [None] * len(queries)
+        if self.result_cache is not None:
+            results = [self.result_cache.get(key) for key in keys]
+
+        # Search each distinct uncached query once
+        pending = {query: key for query, key, r in zip(normalized, keys, results) if r is None}
+        if pending:
+            vector_results, keyword_results = self._search_shards(
+                list(pending), top_k * 2, nprobe, ef_search
+            )
+            fused = {
+                query: self._fuse(vector, keyword, top_k)
+                for query, vector, keyword in zip(pending, vector_results, keyword_results)
+            }
+            if self.result_cache is not None:
+                for query, key in pending.items():
+                    self.result_cache.put(key, fused[query])
+            results = [
+                matches if matches is not None else list(fused[query])
+                for query, matches in zip(normalized, results)
+            ]
+
+        logger.info("retrieval_batch_complete", queries=len(queries), searched=len(pending))
+        return cast(List[List[Match]], results)
+
+    def _search_shards(
+        self,
+        queries: List[str],
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ) -> Tuple[Results, Results]:
+        """Search every shard and merge their hits per query.
+
+        Returns:
+            ``(vector_results, keyword_results)``: the ``top_k`` best of all
+            shards for each query, by score
+        """
+        if len(self.shards) == 1:
+            return self.shards[0].search_many(queries, top_k, nprobe, ef_search, None)
+
+        embeddings = None if self.is_empty() else self.vector_store.encode_queries(queries)
+        per_shard = self._map_shards(
+            lambda shard: shard.search_many(queries, top_k, nprobe, ef_search, embeddings)
+        )
+
+        def merge(lists: Iterable[Hits]) -> Hits:
+            return heapq.nlargest(top_k, itertools.chain(*lists), key=lambda hit: hit[1])
 
-        # Get results from both indices
-        vector_results = self.vector_store.search(query, top_k * 2)
-        keyword_results = self.keyword_index.search(query, top_k * 2)
+        # BM25 scores use per-shard statistics, which hash partitioning keeps close
+        vector_results = [merge(hits) for hits in zip(*(vector for vector, _ in per_shard))]
+        keyword_results = [merge(hits) for hits in zip(*(keyword for _, keyword in per_shard))]
+        return vector_results, keyword_results
 
-        # Reciprocal Rank Fusion (RRF)
+    @staticmethod
+    def _fuse(
+        vector_results: List[Tuple[Dict[str, Any], float]],
+        keyword_results: List[Tuple[Dict[str, Any], float]],
+        top_k: int,
+    ) -> List[Match]:
+        """Combine vector and keyword rankings with Reciprocal Rank Fusion.
+
+        Args:
+            vector_results: Vector search results, best first
+            keyword_results: Keyword search results, best first
+            top_k: Number of results to return
+
+        Returns:
+            List of Match objects
+        """
         k = 60  # RRF constant
         scores: Dict[str, float] = {}
         doc_map: Dict[str, Dict[str, Any]] = {}
@@ -99,6 +353,4 @@ class HybridRetriever:
                     metadata=doc["metadata"],
                 )
             )
-
-        logger.info("retrieval_complete", matches=len(matches))
         return matches
@@ -0,0 +1,158 @@
+"""Index shards: independent partitions of the chunk, vector and keyword indices."""
+
+from pathlib import PurePosixPath
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import xxhash
+
+from rag_server.core.config import Settings
+from rag_server.core.logging import get_logger
+from rag_server.search.chunk_store import ChunkStore
+from rag_server.search.encode_batcher import EncodeBatcher
+from rag_server.search.keyword_index import KeywordIndex
+from rag_server.search.query_cache import QueryEmbeddingCache
+from rag_server.search.vector_store import VectorStore
+
+logger = get_logger(__name__)
+
+SHARDS_DIR = "shards"
+
+# (chunk, score) hits of one query, best first; and those of several queries
+Hits = List[Tuple[Dict[str, Any], float]]
+Results = List[Hits]
+
+
+def shard_for(path: str, settings: Settings) -> int:
+    """Pick the shard holding a file's chunks.
+
+    Args:
+        path: File path relative to the indexed root
+        settings: Application settings
+
+    Returns:
+        Shard number below ``RAG_INDEX_SHARDS``
+    """
+    shards = settings.RAG_INDEX_SHARDS
+    if shards == 1:
+        return 0
+    # With one repository per top-level directory, keep each repository together
+    key = PurePosixPath(path).parts[0] if settings.RAG_SHARD_BY == "repository" else path
+    return xxhash.xxh3_64_intdigest(key.encode("utf-8", "surrogatepass")) % shards
+
+
+class IndexShard:
+    """One partition of the index, stored and loaded on its own.
+
+    An unsharded index is a single shard in ``RAG_INDEX_DIR`` itself; shard
+    ``n`` of a sharded one lives in ``<RAG_INDEX_DIR>/shards/<n>``. Each
+    shard has its own chunk IDs, FAISS index and BM25 statistics.
+    """
+
+    def __init__(
+        self,
+        settings: Settings,
+        number: int,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        encode_batcher: Optional[EncodeBatcher] = None,
+    ):
+        """Initialize the shard.
+
+        Args:
+            settings: Application settings (``RAG_INDEX_DIR`` of the whole index)
+            number: Shard number
+            query_cache: Query embedding cache to share
+            encode_batcher: Batcher coalescing concurrent query encodes
+        """
+        if settings.RAG_INDEX_SHARDS > 1:
+            shard_dir = settings.RAG_INDEX_DIR / SHARDS_DIR / f"{number:02d}"
+            settings = settings.model_copy(update={"RAG_INDEX_DIR": shard_dir})
+        self.settings = settings
+        self.number = number
+        self.chunks = ChunkStore(settings)
+        self.vector_store = VectorStore(settings, self.chunks, query_cache, encode_batcher)
+        self.keyword_index = KeywordIndex(settings, self.chunks)
+        # Whether the shard changed since it was loaded (unchanged ones are not saved)
+        self.dirty = True
+
+    def clear(self) -> None:
+        """Drop all indexed chunks."""
+        self.vector_store.clear()
+        self.keyword_index.clear()
+        self.dirty = True
+
+    def flush(self) -> None:
+        """Finish buffered additions (IVF-PQ training, BM25 weight refresh)."""
+        self.vector_store.flush()
+        self.keyword_index.flush()
+
+    def update(
+        self,
+        chunks: List[Dict[str, Any]],
+        embeddings: Optional[np.ndarray],
+        removed_paths: List[str],
+    ) -> None:
+        """Drop the chunks of ``removed_paths``, then add ``chunks``.
+
+        Args:
+            chunks: New chunks (their ``id`` is assigned here)
+            embeddings: Embeddings of ``chunks``, if already computed
+            removed_paths: Paths whose existing chunks should be dropped
+        """
+        stale_ids = self.chunks.ids_for_paths(removed_paths)
+        if not chunks and not stale_ids:
+            return
+
+        next_id = self.chunks.next_id()
+        for offset, chunk in enumerate(chunks):
+            chunk["id"] = next_id + offset
+
+        self.vector_store.remove_ids(stale_ids)
+        self.keyword_index.remove_ids(stale_ids)
+        self.vector_store.add_chunks(chunks, embeddings)
+        self.keyword_index.add_chunks(chunks)
+        self.dirty = True
+
+    def save(self) -> None:
+        """Save the shard to disk if it changed."""
+        if not self.dirty:
+            return
+        self.settings.RAG_INDEX_DIR.mkdir(parents=True, exist_ok=True)
+        self.vector_store.save()
+        self.keyword_index.save()
+        self.chunks.save()
+        self.dirty = False
+
+    def load(self) -> bool:
+        """Load the shard from disk.
+
+        Returns:
+            True if loaded successfully
+        """
+        if not self.chunks.load():
+            return False
+        self.dirty = False
+        if not self.chunks:
+            return True  # a shard no file hashed to has no vector or keyword index
+        vector_ok = self.vector_store.load()
+        keyword_ok = self.keyword_index.load()
+        return vector_ok and keyword_ok
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+        query_embeddings: Optional[np.ndarray],
+    ) -> Tuple[Results, Results]:
+        """Search the shard's vector and keyword indices.
+
+        Returns:
+            ``(vector_results, keyword_results)``, one list per query each
+        """
+        vector_results = self.vector_store.search_many(
+            queries, top_k, nprobe=nprobe, ef_search=ef_search, query_embeddings=query_embeddings
+        )
+        keyword_results = self.keyword_index.search_many(queries, top_k)
+        return vector_results, keyword_results
@@ -0,0 +1,78 @@
+"""Code-aware tokenizer for keyword search."""
+
+import re
+from typing import FrozenSet, List
+
+# Runs of letters, digits and underscores; everything else is a separator
+_WORD_RE = re.compile(r"\w+")
+
+# Subwords of an identifier: acronyms ("HTTPServer" -> "HTTP", "Server"),
+# capitalized and lowercase words, and digit runs. Underscores never match.
+_SUBWORD_RE = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+STOPWORDS: FrozenSet[str] = frozenset(
+    {
+        "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have",
+        "if", "in", "into", "is", "it", "its", "no", "not", "of", "on", "or", "so", "such",
+        "that", "the", "their", "then", "there", "these", "they", "this", "to", "was", "were",
+        "will", "with",
+    }
+)  # fmt: skip
+
+
+class CodeTokenizer:
+    """Split text into lowercase terms, breaking identifiers into subwords.
+
+    ``getUserById(`` and ``get_user_by_id`` both yield ``get``, ``user``,
+    ``by``, ``id`` plus the compound ``getuserbyid``, so natural-language
+    queries and exact identifier queries both match. Punctuation is dropped,
+    as are tokens shorter than ``min_length`` or longer than ``max_length``
+    (minified code, hashes, base64 blobs).
+    """
+
+    def __init__(self, stopwords: bool = False, min_length: int = 2, max_length: int = 64):
+        """Initialize the tokenizer.
+
+        Args:
+            stopwords: Drop common English stopwords
+            min_length: Shortest token to keep
+            max_length: Longest token to keep
+        """
+        self.stopwords = STOPWORDS if stopwords else frozenset()
+        self.min_length = min_length
+        self.max_length = max_length
+
+    @property
+    def signature(self) -> str:
+        """Identify the tokenizer configuration an index was built with."""
+        return f"code-v1:stop={bool(self.stopwords)}:min={self.min_length}:max={self.max_length}"
+
+    def tokenize(self, text: str) -> List[str]:
+        """Tokenize text for indexing and querying.
+
+        Args:
+            text: Text to tokenize
+
+        Returns:
+            List of tokens
+        """
+        tokens: List[str] = []
+        append = tokens.append
+        stopwords = self.stopwords
+        min_length = self.min_length
+        max_length = self.max_length
+
+        for word in _WORD_RE.findall(text):
+            # Fast path: plain lowercase words and numbers need no splitting
+            if word.isalnum() and (word.islower() or word.isdigit()) or not word.isascii():
+                parts = [word.lower()]
+            else:
+                parts = [part.lower() for part in _SUBWORD_RE.findall(word)]
+                if len(parts) > 1:
+                    parts.append("".join(parts))
+
+            for part in parts:
+                if min_length <= len(part) <= max_length and part not in stopwords:
+                    append(part)
+
+        return tokens
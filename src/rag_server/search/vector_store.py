@@ -1,141 +1,599 @@
 """Vector store adapter for FAISS."""
 
 import json
-import pickle
-from pathlib import Path
-from typing import Any, Dict, List, Optional, Tuple
+import os
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Set, Tuple, cast
 
 import faiss
 import numpy as np
-from sentence_transformers import SentenceTransformer
 
 from rag_server.core.config import Settings
 from rag_server.core.logging import get_logger
+from rag_server.search.chunk_store import ChunkStore
+from rag_server.search.embedding_backends import embedding_model_id, shared_embedding_model
+from rag_server.search.embedding_cache import ChunkEmbeddingCache, text_digest
+from rag_server.search.encode_batcher import EncodeBatcher
+from rag_server.search.query_cache import QueryEmbeddingCache, normalize_query
+
+if TYPE_CHECKING:
+    from sentence_transformers import SentenceTransformer
 
 logger = get_logger(__name__)
 
+# Tombstoned vectors (HNSW cannot delete) tolerated before the graph is rebuilt
+TOMBSTONE_COMPACT_RATIO = 0.25
+
 
 class VectorStore:
     """FAISS-based vector store for semantic search."""
 
-    def __init__(self, settings: Settings):
+    def __init__(
+        self,
+        settings: Settings,
+        documents: Optional[ChunkStore] = None,
+        query_cache: Optional[QueryEmbeddingCache] = None,
+        encode_batcher: Optional[EncodeBatcher] = None,
+    ):
         """Initialize the vector store.
 
         Args:
             settings: Application settings
+            documents: Chunk store shared with other indices (a private one if omitted)
+            query_cache: Query embedding cache shared across index generations
+                (a private one if omitted)
+            encode_batcher: Batcher coalescing concurrent query encodes
+                (queries are encoded directly if omitted)
         """
         self.settings = settings
         self.index_dir = settings.RAG_INDEX_DIR
-        self.model: Optional[SentenceTransformer] = None
-        self.index: faiss.Optional[Index] = None
-        self.documents: List[Dict[str, Any]] = []
+        self.model: Optional["SentenceTransformer"] = None
+        self.index: Optional[faiss.IndexIDMap2] = None
+        self.documents = documents if documents is not None else ChunkStore(settings)
+        self.query_cache = query_cache if query_cache is not None else QueryEmbeddingCache(settings)
+        self.encode_batcher = encode_batcher
+        self.embedding_cache = ChunkEmbeddingCache(settings)
+        # Whether every vector was added in this process (a clean build)
+        self._built_here = True
+        self._mapped = False
+        self.tombstones: Set[int] = set()
+        self._tombstone_selector: Optional[faiss.IDSelector] = None
+        # Metric of the current index: RAG_VECTOR_METRIC for new builds, the
+        # stored index's own metric once one is loaded
+        self.metric = settings.RAG_VECTOR_METRIC
+        # Embeddings held back until there are enough to train the index
+        self._untrained: List[Tuple[np.ndarray, np.ndarray]] = []
 
     def load_model(self) -> None:
-        """Load the embedding model."""
+        """Load the embedding model (the process-wide one) if not loaded yet.
+
+        Called on first use rather than by ``load``, so opening an index does
+        not wait for torch to import and the model to initialize.
+        """
         if self.model is None:
-            logger.info("loading_embedding_model", model=self.settings.RAG_EMBEDDING_MODEL)
-            self.model = SentenceTransformer(self.settings.RAG_EMBEDDING_MODEL)
-            logger.info("model_loaded")
+            self.model = shared_embedding_model(self.settings)
 
     def build_index(self, chunks: List[Dict[str, Any]]) -> None:
         """Build FAISS index from chunks.
 
         Args:
-            chunks: List of chunks with content and metadata
+            chunks: List of chunks with content, metadata and a unique integer ``id``
         """
-        self.load_model()
-        assert self.model is not None
-
         logger.info("building_index", chunks=len(chunks))
 
+        self.clear()
+        self.add_chunks(chunks)
+        self.flush()
+
+        logger.info("index_built", vectors=self.index.ntotal if self.index is not None else 0)
+
+    def clear(self) -> None:
+        """Drop the index and all chunks."""
+        self.index = None
+        self._mapped = False
+        self._untrained = []
+        self._built_here = True
+        self.metric = self.settings.RAG_VECTOR_METRIC
+        self.documents.clear()
+        self._set_tombstones(set())
+
+    def encode_chunks(self, chunks: List[Dict[str, Any]]) -> np.ndarray:
+        """Embed chunk contents (no index state is touched).
+
+        Args:
+            chunks: List of chunks with content
+
+        Returns:
+            float32 embeddings, one row per chunk (unit length for the cosine metric)
+        """
+        embeddings = self._embed_chunks(chunks)
+        if self.metric == "cosine":
+            faiss.normalize_L2(embeddings)
+        return embeddings
+
+    def _embed_chunks(self, chunks: List[Dict[str, Any]]) -> np.ndarray:
+        """Embed chunk contents as the model returns them, through the cache."""
         # Extract texts for embedding
         texts = [chunk["content"] for chunk in chunks]
-        self.documents = chunks
+        if not texts or not self.embedding_cache.enabled:
+            return self._encode_texts(texts)
+
+        # Only texts not embedded by an earlier build go to the model
+        digests = [text_digest(text) for text in texts]
+        embeddings, missing = self.embedding_cache.lookup(digests)
+        logger.debug("generating_embeddings", chunks=len(texts), cached=len(texts) - len(missing))
+        if not missing:
+            assert embeddings is not None
+            return embeddings
+
+        # Encode each distinct text once
+        first: Dict[bytes, int] = {}
+        for i in missing:
+            first.setdefault(digests[i], i)
+        encoded = self._encode_texts([texts[i] for i in first.values()])
+        self.embedding_cache.add(list(first), encoded)
+
+        if embeddings is None:
+            embeddings = np.zeros((len(texts), encoded.shape[1]), dtype="float32")
+        rows = {digest: row for row, digest in enumerate(first)}
+        embeddings[missing] = encoded[[rows[digests[i]] for i in missing]]
+        return embeddings
+
+    def _encode_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode chunk texts with the model."""
+        self.load_model()
+        assert self.model is not None
 
         # Generate embeddings in batches
-        logger.info("generating_embeddings")
         embeddings = self.model.encode(
             texts,
-            show_progress_bar=True,
+            show_progress_bar=len(texts) > 1000,
             batch_size=32,
             convert_to_numpy=True,
         )
+        return embeddings.astype("float32")
+
+    def add_chunks(
+        self, chunks: List[Dict[str, Any]], embeddings: Optional[np.ndarray] = None
+    ) -> None:
+        """Embed chunks and add them to the index under their ``id``.
+
+        Args:
+            chunks: List of chunks with content, metadata and a unique integer ``id``
+            embeddings: Embeddings from ``encode_chunks``, if already computed
+        """
+        if not chunks:
+            return
+
+        if embeddings is None:
+            embeddings = self.encode_chunks(chunks)
+        ids = np.array([chunk["id"] for chunk in chunks], dtype="int64")
+        self.documents.add(chunks)
+
+        # Trained indices are created once a full training sample has arrived
+        if self.index is None and self._needs_training():
+            self._untrained.append((embeddings, ids))
+            if sum(len(e) for e, _ in self._untrained) >= self.settings.RAG_INDEX_TRAIN_SAMPLE:
+                self.flush()
+            return
+
+        # Create FAISS index on first use; IDs let us remove chunks later
+        if self.index is None:
+            self.index = self.create_index(embeddings)
+
+        self._ensure_writable()
+        self.index.add_with_ids(embeddings, ids)
+
+    def flush(self) -> None:
+        """Create the index from embeddings held back for training, if any."""
+        if not self._untrained:
+            return
+
+        embeddings = np.vstack([e for e, _ in self._untrained])
+        ids = np.concatenate([i for _, i in self._untrained])
+        self._untrained = []
+        self.index = self.create_index(embeddings)
+        self.index.add_with_ids(embeddings, ids)
+
+    def _needs_training(self) -> bool:
+        """Whether the configured index learns its encoding from the data."""
+        storage = self.settings.RAG_VECTOR_STORAGE
+        return self.settings.RAG_VECTOR_INDEX == "ivf_pq" or storage in ("sq8", "pq")
+
+    def create_index(self, sample: np.ndarray) -> faiss.IndexIDMap2:
+        """Create an empty index of the configured type, trained if needed.
+
+        With ``RAG_VECTOR_STORAGE`` other than ``fp32`` the index searches
+        compressed codes and re-scores a shortlist of ``RAG_REFINE_K_FACTOR``
+        times the requested results exactly against float32 copies of the
+        vectors. The copies are only paged in for shortlisted rows when the
+        index is memory-mapped.
+
+        Args:
+            sample: Embeddings to train on (a random subset is used if large)
+
+        Returns:
+            Empty ID-mapped FAISS index
+        """
+        kind = self.settings.RAG_VECTOR_INDEX
+        storage = self.settings.RAG_VECTOR_STORAGE
+        metric = faiss.METRIC_INNER_PRODUCT if self.metric == "cosine" else faiss.METRIC_L2
+        n_vectors, dimension = sample.shape
+        index: faiss.Index
+
+        pq_m, pq_nbits = self.settings.RAG_PQ_M, self.settings.RAG_PQ_NBITS
+        pq_usable = n_vectors >= 2**pq_nbits and dimension % pq_m == 0
+        if storage == "pq" and kind != "ivf_pq" and not pq_usable:
+            logger.warning(
+                "pq_unavailable_using_sq8", vectors=n_vectors, dimension=dimension, pq_m=pq_m
+            )
+            storage = "sq8"
+        scalar_types = {
+            "fp16": faiss.ScalarQuantizer.QT_fp16,
+            "sq8": faiss.ScalarQuantizer.QT_8bit,
+        }
+
+        if kind == "hnsw":
+            if storage in scalar_types:
+                index = faiss.IndexHNSWSQ(
+                    dimension, scalar_types[storage], self.settings.RAG_HNSW_M, metric
+                )
+            elif storage == "pq":
+                index = faiss.IndexHNSWPQ(
+                    dimension, pq_m, self.settings.RAG_HNSW_M, pq_nbits, metric
+                )
+            else:
+                index = faiss.IndexHNSWFlat(dimension, self.settings.RAG_HNSW_M, metric)
+            index.hnsw.efConstruction = self.settings.RAG_HNSW_EF_CONSTRUCTION
+            index.hnsw.efSearch = self.settings.RAG_HNSW_EF_SEARCH
+        elif kind == "ivf_pq":
+            nlist = self.settings.RAG_IVF_NLIST or int(4 * np.sqrt(n_vectors))
+            # k-means wants ~39 points per centroid; PQ needs 2^nbits points
+            nlist = max(1, min(nlist, n_vectors // 39))
+            if not pq_usable:
+                logger.warning(
+                    "ivf_pq_unavailable_using_flat",
+                    vectors=n_vectors,
+                    dimension=dimension,
+                    pq_m=pq_m,
+                )
+                index = faiss.IndexFlat(dimension, metric)
+            else:
+                index = faiss.IndexIVFPQ(
+                    faiss.IndexFlat(dimension, metric), dimension, nlist, pq_m, pq_nbits, metric
+                )
+                index.nprobe = self.settings.RAG_IVF_NPROBE
+        elif storage in scalar_types:
+            index = faiss.IndexScalarQuantizer(dimension, scalar_types[storage], metric)
+        elif storage == "pq":
+            # A single inverted list scans every code like IndexPQ, but unlike
+            # IndexPQ accepts an ID selector for removed vectors
+            index = faiss.IndexIVFPQ(
+                faiss.IndexFlat(dimension, metric), dimension, 1, pq_m, pq_nbits, metric
+            )
+        else:
+            index = faiss.IndexFlat(dimension, metric)
+
+        if not index.is_trained:
+            train_size = min(n_vectors, self.settings.RAG_INDEX_TRAIN_SAMPLE)
+            rng = np.random.default_rng(0)
+            train = sample[rng.choice(n_vectors, size=train_size, replace=False)]
+            logger.info("training_index", kind=kind, storage=storage, vectors=train_size)
+            index.train(train)
+
+        if storage != "fp32":
+            index = faiss.IndexRefineFlat(index)
+            index.k_factor = self.settings.RAG_REFINE_K_FACTOR
+
+        return faiss.IndexIDMap2(index)
+
+    def _inner_index(self) -> Tuple[faiss.Index, Optional[faiss.IndexRefine]]:
+        """Return the searched index under the ID map, and its refine wrapper if any."""
+        assert self.index is not None
+        inner = faiss.downcast_index(self.index.index)
+        if isinstance(inner, faiss.IndexRefine):
+            return faiss.downcast_index(inner.base_index), inner
+        return inner, None
+
+    def remove_ids(self, ids: List[int]) -> None:
+        """Remove chunks from the index by ID.
+
+        HNSW graphs and re-scored (compressed storage) indices cannot delete
+        vectors, so their IDs are tombstoned and filtered at search time until
+        the index is compacted.
+
+        Args:
+            ids: Chunk IDs to remove
+        """
+        self.flush()
+        if self.index is None or not ids:
+            return
+
+        self._ensure_writable()
+        self.documents.remove(ids)
 
-        # Create FAISS index
-        dimension = embeddings.shape[1]
-        self.index = faiss.IndexFlatL2(dimension)
-        self.index.add(embeddings.astype("float32"))
+        inner, refine = self._inner_index()
+        if refine is not None or isinstance(inner, faiss.IndexHNSW):
+            self._set_tombstones(self.tombstones | set(ids))
+            if len(self.tombstones) > TOMBSTONE_COMPACT_RATIO * self.index.ntotal:
+                self._compact()
+            logger.info("vectors_tombstoned", tombstones=len(self.tombstones))
+            return
+
+        removed = self.index.remove_ids(np.array(ids, dtype="int64"))
+        logger.info("vectors_removed", removed=int(removed), vectors=self.index.ntotal)
 
-        logger.info("index_built", vectors=self.index.ntotal)
+    def _ensure_writable(self) -> None:
+        """Replace a memory-mapped index with an in-memory copy before mutating it.
+
+        FAISS aborts the process when a mapped index is modified.
+        """
+        if self._mapped:
+            logger.info("loading_index_for_update", path=str(self.index_dir))
+            index = faiss.read_index(str(self.index_dir / "faiss.index"))
+            self.index = cast(faiss.IndexIDMap2, index)
+            self._mapped = False
+
+    def _set_tombstones(self, tombstones: Set[int]) -> None:
+        """Replace the tombstone set and the search-time selector excluding it."""
+        self.tombstones = tombstones
+        if tombstones:
+            batch = faiss.IDSelectorBatch(np.array(sorted(tombstones), dtype="int64"))
+            self._tombstone_selector = faiss.IDSelectorNot(batch)
+            self._tombstone_selector.batch = batch  # keep the wrapped selector alive
+        else:
+            self._tombstone_selector = None
+
+    def _compact(self) -> None:
+        """Rebuild the index from its live vectors, dropping tombstones."""
+        assert self.index is not None
+
+        inner = faiss.downcast_index(self.index.index)
+        vectors = inner.reconstruct_n(0, inner.ntotal)
+        ids = faiss.vector_to_array(self.index.id_map)
+        live = ~np.isin(ids, np.array(sorted(self.tombstones), dtype="int64"))
+
+        logger.info("compacting_index", live=int(live.sum()), tombstones=len(self.tombstones))
+        self.index = self.create_index(vectors[live])
+        self.index.add_with_ids(vectors[live], ids[live])
+        self._set_tombstones(set())
 
     def save(self) -> None:
-        """Save index and documents to disk."""
+        """Save the index to disk (chunks are saved by their ChunkStore)."""
+        self.flush()
         if self.index is None:
             logger.warning("no_index_to_save")
             return
 
         index_path = self.index_dir / "faiss.index"
-        docs_path = self.index_dir / "documents.pkl"
+        tmp_path = self.index_dir / "faiss.index.tmp"
 
-        faiss.write_index(self.index, str(index_path))
-        with open(docs_path, "wb") as f:
-            pickle.dump(self.documents, f)
+        # Replace atomically so mapped readers keep the previous file
+        faiss.write_index(self.index, str(tmp_path))
+        os.replace(tmp_path, index_path)
+        if self._built_here:
+            # Forget cached embeddings of chunks that are no longer indexed
+            self.embedding_cache.compact()
 
         logger.info("index_saved", path=str(self.index_dir))
 
     def load(self) -> bool:
-        """Load index and documents from disk.
+        """Memory-map the index from disk.
+
+        The shared ChunkStore must already be loaded.
 
         Returns:
             True if loaded successfully
         """
         index_path = self.index_dir / "faiss.index"
-        docs_path = self.index_dir / "documents.pkl"
 
-        if not index_path.exists() or not docs_path.exists():
+        if not index_path.exists():
             logger.warning("index_not_found")
             return False
 
         try:
-            self.load_model()
-            self.index = faiss.read_index(str(index_path))
-            with open(docs_path, "rb") as f:
-                self.documents = pickle.load(f)
+            self.index = cast(
+                faiss.IndexIDMap2, faiss.read_index(str(index_path), faiss.IO_FLAG_MMAP_IFC)
+            )
+            self._mapped = True
+            self._built_here = False
+            self.metric = "cosine" if self.index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+            if self.metric != self.settings.RAG_VECTOR_METRIC:
+                logger.warning(
+                    "vector_metric_mismatch",
+                    index=self.metric,
+                    configured=self.settings.RAG_VECTOR_METRIC,
+                    hint="rebuild the index to switch metrics",
+                )
+            ids = faiss.vector_to_array(self.index.id_map)
+            self._set_tombstones(
+                {int(i) for i in np.setdiff1d(ids, self.documents.ids(), assume_unique=True)}
+            )
             logger.info("index_loaded", vectors=self.index.ntotal)
             return True
         except Exception as e:
             logger.error("index_load_error", error=str(e))
             return False
 
-    def search(self, query: str, top_k: int = 8) -> List[Tuple[Dict[str, Any], float]]:
+    def encode_query(self, query: str) -> np.ndarray:
+        """Embed a search query.
+
+        Args:
+            query: Search query
+
+        Returns:
+            float32 array of shape ``(1, dim)`` (read-only; may be shared)
+        """
+        query = normalize_query(query)
+        model_name = embedding_model_id(self.settings)
+        cached = self.query_cache.get(model_name, query)
+        if cached is not None:
+            return cached
+
+        embedding = self._encode_query_texts([query])
+        self.query_cache.put(model_name, query, embedding)
+        return embedding
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Embed several search queries, encoding cache misses in one batch.
+
+        Args:
+            queries: Search queries
+
+        Returns:
+            float32 array of shape ``(len(queries), dim)``
+        """
+        model_name = embedding_model_id(self.settings)
+        normalized = [normalize_query(query) for query in queries]
+        rows: List[Optional[np.ndarray]] = [
+            self.query_cache.get(model_name, query) for query in normalized
+        ]
+        missing = sorted({query for query, row in zip(normalized, rows) if row is None})
+        encoded: Dict[str, np.ndarray] = {}
+        if missing:
+            embeddings = self._encode_query_texts(missing)
+            for query, embedding in zip(missing, embeddings):
+                encoded[query] = embedding[np.newaxis, :].copy()
+                self.query_cache.put(model_name, query, encoded[query])
+        return np.vstack(
+            [row if row is not None else encoded[q] for q, row in zip(normalized, rows)]
+        )
+
+    def _encode_query_texts(self, texts: List[str]) -> np.ndarray:
+        """Encode normalized queries, through the batcher when there is one."""
+        self.load_model()
+        assert self.model is not None
+        if self.encode_batcher is not None:
+            return self.encode_batcher.encode(self.model, texts)
+        return self.model.encode(texts, batch_size=64, convert_to_numpy=True).astype("float32")
+
+    def search(
+        self,
+        query: str,
+        top_k: int = 8,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        query_embedding: Optional[np.ndarray] = None,
+    ) -> List[Tuple[Dict[str, Any], float]]:
         """Search for similar chunks.
 
         Args:
             query: Search query
             top_k: Number of results to return
+            nprobe: IVF lists to probe (overrides RAG_IVF_NPROBE)
+            ef_search: HNSW search breadth (overrides RAG_HNSW_EF_SEARCH)
+            query_embedding: Embedding from ``encode_query``, if already computed
 
         Returns:
             List of (document, score) tuples
         """
-        if self.index is None or not self.documents:
-            logger.warning("no_index_loaded")
-            return []
+        return self.search_many(
+            [query], top_k, nprobe=nprobe, ef_search=ef_search, query_embeddings=query_embedding
+        )[0]
+
+    def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 8,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        query_embeddings: Optional[np.ndarray] = None,
+    ) -> List[List[Tuple[Dict[str, Any], float]]]:
+        """Search for similar chunks for several queries with one index search.
 
-        self.load_model()
-        assert self.model is not None
+        Args:
+            queries: Search queries
+            top_k: Number of results to return per query
+            nprobe: IVF lists to probe (overrides RAG_IVF_NPROBE)
+            ef_search: HNSW search breadth (overrides RAG_HNSW_EF_SEARCH)
+            query_embeddings: Stacked embeddings from ``encode_queries``, if
+                already computed
 
-        # Encode query
-        query_embedding = self.model.encode([query], convert_to_numpy=True)
+        Returns:
+            One list of (document, score) tuples per query. Scores are cosine
+            similarities for the cosine metric, where hits below
+            ``RAG_MIN_VECTOR_SCORE`` are dropped, and ``1 / (1 + L2 distance)``
+            otherwise
+        """
+        self.flush()
+        if self.index is None or not self.documents:
+            logger.warning("no_index_loaded")
+            return [[] for _ in queries]
+
+        # Encode queries
+        if query_embeddings is None:
+            query_embeddings = self.encode_queries(queries)
+        # Cached query embeddings stay as the model returned them
+        min_score = -np.inf
+        if self.metric == "cosine":
+            query_embeddings = query_embeddings.copy()
+            faiss.normalize_L2(query_embeddings)
+            if self.settings.RAG_MIN_VECTOR_SCORE is not None:
+                min_score = self.settings.RAG_MIN_VECTOR_SCORE
 
         # Search
-        distances, indices = self.index.search(query_embedding.astype("float32"), top_k)
+        distances, indices = self.index.search(
+            query_embeddings,
+            top_k,
+            params=self._search_params(nprobe, ef_search),
+        )
 
         # Prepare results
-        results: List[Tuple[Dict[str, Any], float]] = []
-        for dist, idx in zip(distances[0], indices[0]):
-            if idx < len(self.documents):
-                # Convert distance to similarity score (inverse)
-                score = 1.0 / (1.0 + float(dist))
-                results.append((self.documents[int(idx)], score))
+        results: List[List[Tuple[Dict[str, Any], float]]] = []
+        for row_distances, row_indices in zip(distances, indices):
+            row: List[Tuple[Dict[str, Any], float]] = []
+            for dist, idx in zip(row_distances, row_indices):
+                if self.metric == "cosine":
+                    score = float(dist)
+                    if score < min_score:
+                        break  # hits are sorted: the rest score lower
+                else:
+                    # Convert distance to similarity score (inverse)
+                    score = 1.0 / (1.0 + float(dist))
+                doc = self.documents.get(int(idx))
+                if doc is not None:
+                    row.append((doc, score))
+            results.append(row)
 
         return results
+
+    def _search_params(
+        self, nprobe: Optional[int], ef_search: Optional[int]
+    ) -> Optional[faiss.SearchParameters]:
+        """Build per-query FAISS search parameters for the loaded index type.
+
+        Args:
+            nprobe: IVF lists to probe
+            ef_search: HNSW search breadth
+
+        Returns:
+            Search parameters, or None to use the index defaults
+        """
+        assert self.index is not None
+        inner, refine = self._inner_index()
+
+        # The ID map translates the selector for the index directly below it;
+        # below a refine wrapper it has to be translated here
+        sel = self._tombstone_selector
+        if refine is not None and sel is not None:
+            sel = faiss.IDSelectorTranslated(self.index.id_map, sel)
+
+        params: Optional[faiss.SearchParameters] = None
+        if isinstance(inner, faiss.IndexHNSW):
+            params = faiss.SearchParametersHNSW(
+                efSearch=ef_search or self.settings.RAG_HNSW_EF_SEARCH, sel=sel
+            )
+        elif isinstance(inner, faiss.IndexIVF):
+            params = faiss.SearchParametersIVF(
+                nprobe=nprobe or self.settings.RAG_IVF_NPROBE, sel=sel
+            )
+        elif sel is not None:
+            params = faiss.SearchParameters(sel=sel)
+        if refine is None:
+            return params
+
+        refine_params = faiss.IndexRefineSearchParameters(
+            k_factor=self.settings.RAG_REFINE_K_FACTOR, base_index_params=params
+        )
+        # SWIG does not keep Python references alive for pointer members
+        refine_params.referenced_objects = [params, sel]
+        return refine_params
@@ -1,6 +1,9 @@
 """FastAPI application factory."""
 
-from typing import Optional
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, List, Optional
 
 from fastapi import Depends, FastAPI, Header, HTTPException, Request
 from fastapi.responses import JSONResponse
@@ -8,6 +11,8 @@ from fastapi.responses import JSONResponse
 from rag_server.api import routes_admin, routes_index, routes_query
 from rag_server.core.config import Settings, get_settings
 from rag_server.core.logging import configure_logging, get_logger
+from rag_server.ingest.indexer import run_indexing
+from rag_server.ingest.watcher import IndexWatcher
 
 logger = get_logger(__name__)
 
@@ -33,6 +38,34 @@ def api_key_guard(
     return True
 
 
+def create_watcher(settings: Settings) -> Optional[IndexWatcher]:
+    """Create the live reindexing watcher if ``RAG_WATCH_ROOT`` is set.
+
+    Args:
+        settings: Application settings
+
+    Returns:
+        Watcher feeding changed paths into incremental index updates, or None
+    """
+    if settings.RAG_WATCH_ROOT is None:
+        return None
+
+    root = settings.RAG_WATCH_ROOT.resolve()
+    generations = routes_index.get_generations(settings)
+    jobs = routes_index.get_job_manager()
+
+    # Queued behind (and serialized with) API-triggered builds
+    def reindex(paths: List[Path]) -> None:
+        job = jobs.submit(
+            "watch",
+            lambda: run_indexing(settings, generations, root, paths=paths),
+            params={"root": str(root), "paths": len(paths)},
+        )
+        job.future.result()
+
+    return IndexWatcher(settings, root, reindex)
+
+
 def create_app() -> FastAPI:
     """Create and configure the FastAPI application.
 
@@ -47,12 +80,32 @@ def create_app() -> FastAPI:
     if settings.LANGSMITH_TRACING.lower() == "true":
         logger.info("langsmith_enabled", project=settings.LANGCHAIN_PROJECT, tracing=True)
 
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        if settings.RAG_WARMUP:
+            # Serve liveness checks (and queue queries) while this runs
+            generations = routes_index.get_generations(settings)
+            threading.Thread(target=generations.warm_up, name="warmup", daemon=True).start()
+        watcher = create_watcher(settings)
+        app.state.watcher = watcher
+        if watcher is not None:
+            watcher.start()
+        yield
+        if watcher is not None:
+            watcher.stop()
+        if routes_index._generations is not None:
+            # Query embeddings evicted since the last spill batch
+            routes_index._generations.query_cache.flush()
+        await routes_query.close_llm_client()
+
     # Create app
     app = FastAPI(
         title="RAG Server",
         version="0.1.0",
         description="Code-Knowledge RAG Server - Retrieval-Augmented Generation for codebases",
+        lifespan=lifespan,
     )
+    app.state.watcher = None
 
     # Add exception handler
     @app.exception_handler(Exception)
@@ -1,9 +1,28 @@
 """API endpoint tests."""
 
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
 import pytest
 from fastapi.testclient import TestClient
 
+from rag_server.api import routes_index, routes_query
+from rag_server.api.routes_index import get_generations, get_job_manager
+from rag_server.api.routes_query import get_llm_client
+from rag_server.core.config import Settings, get_settings
+from rag_server.core.schemas import Match
+from rag_server.ingest.indexer import run_indexing
+from rag_server.ingest.jobs import IndexJobManager
+from rag_server.llm.context_packer import count_tokens, pack_context
+from rag_server.llm.errors import LLMGenerationError
+from rag_server.llm.openai_client import OpenAIClient
+from rag_server.llm.prompt_templates import build_grounding_prompt
+from rag_server.search.generations import IndexGenerations
 from rag_server.server import create_app
+from tests.test_search import FakeEncoder
 
 
 @pytest.fixture
@@ -43,3 +62,335 @@ def test_authorized_request_missing_root(client):
         json={"root": "/nonexistent"},
     )
     assert response.status_code == 400
+
+
+def test_readiness_after_warmup(tmp_path, monkeypatch):
+    """Test liveness is immediate and readiness follows the background warmup."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path)
+    generations = IndexGenerations(settings, model=FakeEncoder())
+    # The lifespan warms up the global instance
+    monkeypatch.setattr(routes_index, "_generations", generations)
+
+    app = create_app()
+    assert generations.warmup["status"] == "pending"
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        for _ in range(100):
+            response = client.get("/health/ready")
+            if response.status_code == 200:
+                break
+            time.sleep(0.02)
+        assert response.status_code == 200
+        assert response.json()["status"] == "ready"
+        assert response.json()["warmup_s"] is not None
+
+
+def test_background_build_job(tmp_path, monkeypatch):
+    """Test a build queued with wait=false reports its status and is queryable."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index", RAG_API_KEY="test-api-key-123"
+    )
+    settings.RAG_INDEX_DIR.mkdir()
+    generations = IndexGenerations(settings, model=FakeEncoder())
+    monkeypatch.setattr(routes_index, "_generations", generations)
+    root = tmp_path / "code"
+    root.mkdir()
+    (root / "auth.py").write_text("def login(user):\n    return check_password(user)\n")
+
+    app = create_app()
+    app.dependency_overrides[get_settings] = lambda: settings
+    app.dependency_overrides[get_generations] = lambda: generations
+    jobs = IndexJobManager()
+    app.dependency_overrides[get_job_manager] = lambda: jobs
+    headers = {"x-api-key": "test-api-key-123"}
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/index/build", headers=headers, json={"root": str(root), "wait": False}
+        )
+        assert response.status_code == 202
+        job_id = response.json()["id"]
+
+        for _ in range(100):
+            job = client.get(f"/index/jobs/{job_id}", headers=headers).json()
+            if job["status"] in ("succeeded", "failed"):
+                break
+            time.sleep(0.05)
+        assert job["status"] == "succeeded"
+        assert job["result"]["files_indexed"] == 1
+
+        response = client.post("/query", headers=headers, json={"q": "login", "top_k": 1})
+        assert response.json()["matches"][0]["path"] == "auth.py"
+        cached = client.post("/query", headers=headers, json={"q": " login", "top_k": 1})
+        assert cached.json() == response.json()
+        stats = client.get("/cache/stats").json()["retrieval_results"]
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+        # Publishing a new generation invalidates cached results
+        (root / "auth.py").write_text("def login(user):\n    return verify_token(user)\n")
+        client.post("/index/build", headers=headers, json={"root": str(root), "clean": False})
+        assert client.get("/cache/stats").json()["retrieval_results"]["size"] == 0
+        response = client.post("/query", headers=headers, json={"q": "login", "top_k": 1})
+        assert "verify_token" in response.json()["matches"][0]["snippet"]
+        assert client.get("/index/jobs/unknown", headers=headers).status_code == 404
+
+
+class FakeStreamingLLM:
+    """Local stand-in for an LLM client that streams its answer."""
+
+    def __init__(self, fragments, fail_after=None):
+        self.fragments = fragments
+        self.fail_after = fail_after
+        self.prompts = []
+
+    async def astream(self, prompt, max_tokens=512):
+        self.prompts.append(prompt)
+        for i, fragment in enumerate(self.fragments):
+            if i == self.fail_after:
+                raise RuntimeError("provider went away")
+            await asyncio.sleep(0)
+            yield fragment
+
+
+def _parse_sse(body):
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
+
+def test_answer_stream_sends_matches_tokens_and_citations(tmp_path):
+    """Test /answer/stream emits matches, streamed tokens, citations and timings."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index", RAG_API_KEY="test-api-key-123"
+    )
+    settings.RAG_INDEX_DIR.mkdir()
+    generations = IndexGenerations(settings, model=FakeEncoder())
+    root = tmp_path / "code"
+    root.mkdir()
+    (root / "auth.py").write_text("def login(user):\n    return check_password(user)\n")
+    run_indexing(settings, generations, root, clean=True)
+
+    llm = FakeStreamingLLM(["Passwords are checked ", "in auth.py:1-2", "."])
+    app = create_app()
+    app.dependency_overrides[get_settings] = lambda: settings
+    app.dependency_overrides[get_generations] = lambda: generations
+    app.dependency_overrides[get_llm_client] = lambda: llm
+    headers = {"x-api-key": "test-api-key-123"}
+    client = TestClient(app)
+
+    response = client.post("/answer/stream", headers=headers, json={"q": "login"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.headers["server-timing"].startswith("retrieval;dur=")
+    events = _parse_sse(response.text)
+    assert [name for name, _ in events] == ["matches"] + ["token"] * 3 + ["citations", "done"]
+    assert events[0][1][0]["path"] == "auth.py"
+    assert "".join(data["text"] for name, data in events if name == "token") == (
+        "Passwords are checked in auth.py:1-2."
+    )
+    assert events[4][1] == [{"path": "auth.py", "start_line": 1, "end_line": 2}]
+    done = events[-1][1]
+    assert done["retrieval_ms"] <= done["first_token_ms"] <= done["total_ms"]
+    assert "check_password" in llm.prompts[0]
+
+    # A provider failure mid-answer ends the stream with an error event
+    app.dependency_overrides[get_llm_client] = lambda: FakeStreamingLLM(["a", "b"], fail_after=1)
+    events = _parse_sse(client.post("/answer/stream", headers=headers, json={"q": "login"}).text)
+    assert [name for name, _ in events] == ["matches", "token", "error"]
+
+    # So does a client that cannot be created, which /answer reports as 502
+    unconfigured = OpenAIClient(settings.model_copy(update={"OPENAI_API_KEY": ""}))
+    app.dependency_overrides[get_llm_client] = lambda: unconfigured
+    events = _parse_sse(client.post("/answer/stream", headers=headers, json={"q": "login"}).text)
+    assert [name for name, _ in events] == ["matches", "error"]
+    assert "OPENAI_API_KEY" in events[-1][1]["detail"]
+    assert client.post("/answer", headers=headers, json={"q": "login"}).status_code == 502
+
+
+class MockOpenAIHandler(BaseHTTPRequestHandler):
+    """Answers chat completions like the OpenAI API, over keep-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self):
+        server = self.server
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with server.lock:
+            server.bodies.append(body)
+            server.in_flight += 1
+            server.max_in_flight = max(server.max_in_flight, server.in_flight)
+        time.sleep(0.05)
+        with server.lock:
+            server.in_flight -= 1
+        payload = json.dumps(
+            {
+                "id": "chatcmpl-test",
+                "object": "chat.completion",
+                "created": 0,
+                "model": body["model"],
+                "choices": [
+                    {
+                        "index": 0,
+                        "message": {"role": "assistant", "content": "see auth.py:1-2"},
+                        "finish_reason": "stop",
+                    }
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+class MockOpenAIServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), MockOpenAIHandler)
+        self.lock = threading.Lock()
+        self.connections = self.in_flight = self.max_in_flight = 0
+        self.bodies = []
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+def test_llm_client_is_shared_and_pools_connections(monkeypatch):
+    """Test the OpenAI client is app-wide, reuses connections and caps concurrency."""
+    server = MockOpenAIServer()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    settings = Settings(
+        RAG_LLM_PROVIDER="openai",
+        OPENAI_API_KEY="sk-test",
+        OPENAI_BASE_URL=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        RAG_OPENAI_CONCURRENCY=2,
+    )
+    monkeypatch.setattr(routes_query, "_llm_client", None)
+    llm = get_llm_client(settings)
+    assert get_llm_client(settings) is llm
+
+    async def answer_all():
+        answers = await asyncio.gather(
+            *(llm.generate(f"question {i}", max_tokens=64) for i in range(8))
+        )
+        await routes_query.close_llm_client()
+        return answers
+
+    try:
+        answers = asyncio.run(answer_all())
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert answers == ["see auth.py:1-2"] * 8
+    assert [body["max_completion_tokens"] for body in server.bodies] == [64] * 8
+    assert server.max_in_flight == 2
+    assert server.connections == 2  # eight calls over the two pooled connections
+    assert routes_query._llm_client is None
+
+
+class FirstWordEncoder(FakeEncoder):
+    """Embeds texts by their first word, so rephrasings of a question match."""
+
+    def encode(self, texts, **kwargs):
+        return super().encode([text.split()[0] for text in texts], **kwargs)
+
+
+class CountingLLM:
+    """Local stand-in for an LLM client that counts its generations."""
+
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def generate(self, prompt, max_tokens=512):
+        if self.fail:
+            raise LLMGenerationError("provider went away")
+        self.calls += 1
+        return f"Answer {self.calls}: see auth.py:1-2"
+
+
+def test_answer_cache_serves_paraphrases_until_cited_file_changes(tmp_path):
+    """Test /answer reuses answers to similar questions and drops them when files change."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index", RAG_API_KEY="test-api-key-123"
+    )
+    settings.RAG_INDEX_DIR.mkdir()
+    generations = IndexGenerations(settings, model=FirstWordEncoder())
+    root = tmp_path / "code"
+    root.mkdir()
+    (root / "auth.py").write_text("def login(user):\n    return check_password(user)\n")
+    run_indexing(settings, generations, root, clean=True)
+
+    llm = CountingLLM()
+    app = create_app()
+    app.dependency_overrides[get_settings] = lambda: settings
+    app.dependency_overrides[get_generations] = lambda: generations
+    app.dependency_overrides[get_llm_client] = lambda: llm
+    headers = {"x-api-key": "test-api-key-123"}
+    client = TestClient(app)
+
+    first = client.post("/answer", headers=headers, json={"q": "login flow"}).json()
+    again = client.post("/answer", headers=headers, json={"q": "login steps"}).json()
+    assert llm.calls == 1
+    assert again == first
+    assert first["metadata"]["context"]["blocks"] == 1
+    # A different answer length is a different answer
+    client.post("/answer", headers=headers, json={"q": "login flow", "max_tokens": 100})
+    assert llm.calls == 2
+    stats = client.get("/cache/stats").json()["answers"]
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+
+    # Failed generations are reported, not cached
+    llm.fail = True
+    response = client.post("/answer", headers=headers, json={"q": "login", "max_tokens": 50})
+    assert response.status_code == 502
+    assert client.get("/cache/stats").json()["answers"]["size"] == 2
+    llm.fail = False
+
+    # Rewriting the cited file invalidates its answers
+    (root / "auth.py").write_text("def login(user):\n    return verify_token(user)\n")
+    run_indexing(settings, generations, root, clean=False)
+    assert client.get("/cache/stats").json()["answers"]["size"] == 0
+    fresh = client.post("/answer", headers=headers, json={"q": "login steps"}).json()
+    assert llm.calls == 3
+    assert fresh["final"] == "Answer 3: see auth.py:1-2"
+
+
+def test_context_packing_merges_overlaps_and_respects_budget():
+    """Test overlapping snippets are sent once and the context fits its token budget."""
+    body = [f"    step_{i} = run(step_{i - 1})" for i in range(1, 41)]
+    matches = [
+        Match(score=0.9, path="a.py", start_line=1, end_line=20, snippet="\n".join(body[:20])),
+        Match(score=0.8, path="b.py", start_line=1, end_line=2, snippet="x = 1\ny = 2"),
+        Match(score=0.7, path="a.py", start_line=15, end_line=40, snippet="\n".join(body[14:])),
+    ]
+    model = "gpt-4o-mini"
+
+    context, stats = pack_context(matches, 10_000, model)
+    assert (stats["blocks"], stats["merged"], stats["truncated"]) == (2, 1, 0)
+    assert context.startswith("[1] File: a.py (lines 1-40)\n")
+    assert "[2] File: b.py (lines 1-2)" in context
+    assert context.count("step_15 = run(step_14)") == 1
+    assert stats["tokens"] == count_tokens(context, model) < stats["unpacked_tokens"]
+
+    # A tight budget keeps the best block's leading lines and drops the rest
+    context, stats = pack_context(matches, 120, model)
+    assert stats["tokens"] <= 120
+    assert (stats["blocks"], stats["truncated"], stats["dropped"]) == (1, 1, 1)
+    assert "step_1 = run(step_0)" in context and "b.py" not in context
+
+    # The budget shrinks so that prompt plus answer fit the context window
+    settings = Settings(RAG_CONTEXT_TOKEN_BUDGET=3000, RAG_LLM_CONTEXT_WINDOW=1024)
+    prompt, stats = build_grounding_prompt("how are steps run?", matches, settings, 800)
+    assert stats["prompt_tokens"] + 800 <= 1024
+    assert stats["saved_tokens"] == stats["unpacked_tokens"] - stats["tokens"] > 0
+    assert "how are steps run?" in prompt
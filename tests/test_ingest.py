@@ -0,0 +1,267 @@
+"""Ingestion pipeline tests."""
+
+import os
+import threading
+
+import pytest
+
+from rag_server.core.config import Settings
+from rag_server.ingest.indexer import run_indexing
+from rag_server.ingest.pipeline import IngestionPipeline
+from rag_server.ingest.watcher import IndexWatcher
+from rag_server.search.generations import GenerationConflictError, IndexGenerations
+from rag_server.search.retriever import HybridRetriever
+from rag_server.search.shards import shard_for
+from tests.test_search import FakeEncoder
+
+
+@pytest.fixture
+def source_tree(tmp_path):
+    """Directory of small Python files to ingest."""
+    root = tmp_path / "src"
+    root.mkdir()
+    for i in range(12):
+        lines = [f"def function_{i}_{n}(value):\n    return value + {n}\n" for n in range(40)]
+        (root / f"module_{i}.py").write_text("\n".join(lines))
+    return root
+
+
+@pytest.mark.parametrize("executor", ["thread", "process"])
+def test_streaming_batches_cover_whole_files(tmp_path, source_tree, executor):
+    """Test parallel ingestion streams every chunk in batches of whole files."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path,
+        RAG_INDEX_DIR=tmp_path / "index",
+        RAG_CHUNK_SIZE=200,
+        RAG_INGEST_EXECUTOR=executor,
+        RAG_INGEST_BATCH_CHUNKS=10,
+    )
+    settings.RAG_INDEX_DIR.mkdir()
+    reference, _ = IngestionPipeline(settings).ingest(source_tree, clean=True, workers=1)
+
+    batches = []
+    chunks, stats = IngestionPipeline(settings).ingest(
+        source_tree,
+        clean=True,
+        on_batch=lambda batch, paths: batches.append((batch, paths)),
+        workers=4,
+    )
+
+    assert chunks == []
+    assert len(batches) > 1
+    assert stats["chunks"] == len(reference)
+    assert stats["stages"]["files_processed"] == 12
+    for batch, paths in batches:
+        assert {chunk["metadata"]["path"] for chunk in batch} == set(paths)
+    streamed = sorted(
+        (chunk["metadata"]["path"], chunk["start_line"], chunk["content"])
+        for batch, _ in batches
+        for chunk in batch
+    )
+    assert streamed == sorted(
+        (chunk["metadata"]["path"], chunk["start_line"], chunk["content"]) for chunk in reference
+    )
+
+
+def test_incremental_run_skips_files_by_stat(tmp_path, source_tree):
+    """Test unchanged files are not read and touched files are not re-chunked."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index")
+    settings.RAG_INDEX_DIR.mkdir()
+    # Backdate files so their stats are outside the racy window
+    for path in source_tree.iterdir():
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    pipeline = IngestionPipeline(settings)
+    pipeline.ingest(source_tree, clean=True)
+
+    _, stats = pipeline.ingest(source_tree)
+    assert stats["stages"]["files_unchanged"] == 12
+    assert stats["stages"]["files_processed"] == 0
+
+    os.utime(source_tree / "module_0.py", ns=(2_000_000_000, 2_000_000_000))
+    (source_tree / "module_1.py").write_text("def replaced():\n    pass\n")
+    (source_tree / "module_2.py").unlink()
+    _, stats = pipeline.ingest(source_tree)
+    assert stats["stages"]["files_processed"] == 2
+    assert stats["changed_paths"] == ["module_1.py"]
+    assert stats["deleted_paths"] == ["module_2.py"]
+
+
+def test_targeted_ingest_only_checks_given_paths(tmp_path, source_tree):
+    """Test watcher-style ingestion of specific paths keeps other files' state."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index")
+    settings.RAG_INDEX_DIR.mkdir()
+    pipeline = IngestionPipeline(settings)
+    pipeline.ingest(source_tree, clean=True)
+
+    (source_tree / "module_3.py").write_text("def edited():\n    pass\n")
+    (source_tree / "module_4.py").unlink()
+    (source_tree / "pkg").mkdir()
+    (source_tree / "pkg" / "new.py").write_text("def added():\n    pass\n")
+    _, stats = pipeline.ingest(
+        source_tree,
+        paths=[source_tree / "module_3.py", source_tree / "module_4.py", source_tree / "pkg"],
+    )
+
+    assert stats["stages"]["files_discovered"] == 2
+    assert sorted(stats["changed_paths"]) == ["module_3.py", os.path.join("pkg", "new.py")]
+    assert stats["deleted_paths"] == ["module_4.py"]
+    pipeline.changes.load()
+    assert len(pipeline.changes.files) == 12
+
+
+@pytest.mark.parametrize("backend", ["inotify", "polling"])
+def test_watcher_debounces_changes_into_batches(tmp_path, backend):
+    """Test the watcher batches a burst of changes and reports queue metrics."""
+    root = tmp_path / "watched"
+    (root / "node_modules").mkdir(parents=True)
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path,
+        RAG_INDEX_DIR=tmp_path / "index",
+        RAG_WATCH_BACKEND=backend,
+        RAG_WATCH_DEBOUNCE_MS=200,
+        RAG_WATCH_POLL_INTERVAL_S=0.1,
+    )
+    batches = []
+    batch_done = threading.Event()
+
+    def handler(paths):
+        batches.append(paths)
+        batch_done.set()
+
+    watcher = IndexWatcher(settings, root, handler)
+    watcher.start(initial_scan=False)
+    try:
+        for i in range(5):
+            (root / f"file_{i}.py").write_text(f"value = {i}\n")
+        (root / "node_modules" / "ignored.js").write_text("ignored")
+        assert batch_done.wait(timeout=10)
+    finally:
+        watcher.stop()
+
+    assert len(batches) == 1
+    assert set(batches[0]) == {root / f"file_{i}.py" for i in range(5)}
+    stats = watcher.stats()
+    assert stats["backend"] == backend
+    assert stats["batches"] == 1
+    assert stats["queue_depth"] == 0
+    assert stats["paths_dispatched"] == 5
+
+
+def test_generations_swap_atomically_and_are_collected(tmp_path, source_tree):
+    """Test builds publish new generations while old snapshots stay readable."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index")
+    generations = IndexGenerations(settings, model=FakeEncoder())
+
+    def backdate():
+        # Outside the racy window, so unchanged files are skipped by stat
+        for path in source_tree.iterdir():
+            os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+
+    backdate()
+    run_indexing(settings, generations, source_tree, clean=True)
+    first = generations.snapshot()
+    assert first.generation == generations.current() == "gen-000001"
+    first_chunks = settings.RAG_INDEX_DIR / "generations" / "gen-000001" / "chunks"
+    first_segments = {path.name: path.read_bytes() for path in first_chunks.glob("text-*.bin")}
+
+    (source_tree / "module_0.py").write_text("def rewritten_entrypoint():\n    pass\n")
+    backdate()
+    run_indexing(settings, generations, source_tree)
+    second = generations.snapshot()
+    assert second.generation == "gen-000002"
+    # New texts went to a new blob segment; the published ones are shared, unchanged
+    second_chunks = settings.RAG_INDEX_DIR / "generations" / "gen-000002" / "chunks"
+    assert len(list(second_chunks.glob("text-*.bin"))) == len(first_segments) + 1
+    for name, data in first_segments.items():
+        assert os.path.samefile(first_chunks / name, second_chunks / name)
+        assert (first_chunks / name).read_bytes() == data
+
+    # The old snapshot still serves its own, untouched generation
+    old_contents = {chunk["content"] for chunk in first.chunks.values()}
+    new_contents = {chunk["content"] for chunk in second.chunks.values()}
+    assert not any("rewritten_entrypoint" in content for content in old_contents)
+    assert any("rewritten_entrypoint" in content for content in new_contents)
+    assert first.retrieve("function_0_1", top_k=1)
+    assert len(first.chunks) != len(second.chunks)
+
+    # Nothing changed: no new generation
+    run_indexing(settings, generations, source_tree)
+    assert generations.current() == "gen-000002"
+
+    # A build another process has in progress survives this one's publish
+    other_process = IndexGenerations(settings, model=FakeEncoder())
+    other_build = other_process.begin(clean=True)
+    (source_tree / "module_1.py").unlink()
+    run_indexing(settings, generations, source_tree)
+    kept = sorted(path.name for path in (settings.RAG_INDEX_DIR / "generations").iterdir())
+    assert kept == ["gen-000002", "gen-000003", "gen-000004"]
+    assert generations.current() == "gen-000004"
+    other_process.abort(other_build)
+    assert "module_1.py" not in generations.snapshot().chunks.paths()
+
+
+def test_publish_discards_builds_overtaken_by_another_publish(tmp_path, source_tree):
+    """Test a build is not published over one published after it began."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index")
+    generations = IndexGenerations(settings, model=FakeEncoder())
+    run_indexing(settings, generations, source_tree, clean=True)
+
+    # Both start from gen-000001; the later-numbered one publishes first
+    older = generations.begin(clean=False)
+    other_process = IndexGenerations(settings, model=FakeEncoder())
+    newer = other_process.begin(clean=False)
+    newer.save()
+    other_process.publish(newer)
+
+    older.save()
+    with pytest.raises(GenerationConflictError):
+        generations.publish(older)
+    assert generations.current() == newer.generation == "gen-000003"
+    assert generations.snapshot().generation == "gen-000003"
+
+    # The published generation survives collection; the overtaken one is gone
+    generations.collect_garbage()
+    kept = sorted(path.name for path in (settings.RAG_INDEX_DIR / "generations").iterdir())
+    assert kept == ["gen-000001", "gen-000003"]
+
+    # Builds started from the new pointer publish normally
+    (source_tree / "module_0.py").unlink()
+    run_indexing(settings, generations, source_tree)
+    assert generations.current() == "gen-000004"
+
+
+def test_sharded_build_rewrites_only_changed_shards(tmp_path, source_tree):
+    """Test a sharded index spreads files over shards and rebuilds them independently."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / "index", RAG_INDEX_SHARDS=3)
+    generations = IndexGenerations(settings, model=FakeEncoder())
+    (source_tree / "module_7.py").write_text("needle_in_module_seven")
+    for path in source_tree.iterdir():
+        os.utime(path, ns=(1_000_000_000, 1_000_000_000))
+    run_indexing(settings, generations, source_tree, clean=True)
+    first = generations.snapshot()
+    assert first.index_stats()["files_indexed"] == 12
+    assert all(len(shard.chunks.paths()) > 0 for shard in first.shards)
+    assert first.retrieve("needle_in_module_seven", top_k=1)[0].path == "module_7.py"
+
+    (source_tree / "module_7.py").write_text("rewritten_entrypoint")
+    os.utime(source_tree / "module_7.py", ns=(1_000_000_000, 1_000_000_000))
+    run_indexing(settings, generations, source_tree)
+    second = generations.snapshot()
+    assert second.retrieve("rewritten_entrypoint", top_k=1)[0].path == "module_7.py"
+
+    # Shards without module_7.py keep the previous generation's (hard-linked) files
+    changed = shard_for("module_7.py", settings)
+    for shard, previous in zip(second.shards, first.shards):
+        same = os.path.samefile(
+            shard.settings.RAG_INDEX_DIR / "faiss.index",
+            previous.settings.RAG_INDEX_DIR / "faiss.index",
+        )
+        assert same == (shard.number != changed)
+
+    # A different shard count is not loaded: the next build starts clean
+    resharded = HybridRetriever(
+        settings.model_copy(
+            update={"RAG_INDEX_DIR": generations.current_dir(), "RAG_INDEX_SHARDS": 2}
+        )
+    )
+    assert not resharded.load()
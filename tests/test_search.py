@@ -0,0 +1,595 @@
+"""Search index tests."""
+
+import hashlib
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import faiss
+import numpy as np
+import pytest
+from rank_bm25 import BM25Okapi
+
+from rag_server.core.config import Settings
+from rag_server.core.schemas import Match
+from rag_server.search.chunk_store import BLOB_MAX_SEGMENTS, ChunkStore
+from rag_server.search.embedding_backends import embedding_model_id, embedding_parity
+from rag_server.search.embedding_cache import ChunkEmbeddingCache, text_digest
+from rag_server.search.encode_batcher import EncodeBatcher
+from rag_server.search.keyword_index import KeywordIndex
+from rag_server.search.query_cache import DISK_CAPACITY_FACTOR, QueryEmbeddingCache
+from rag_server.search.reranker import Reranker
+from rag_server.search.result_cache import RetrievalCache
+from rag_server.search.retriever import HybridRetriever
+from rag_server.search.tokenizer import CodeTokenizer
+
+
+class FakeEncoder:
+    """Deterministic stand-in for SentenceTransformer (no model download)."""
+
+    dimension = 16
+
+    def encode(self, texts, **kwargs):
+        vectors = []
+        for text in texts:
+            seed = int.from_bytes(hashlib.sha256(text.encode()).digest()[:4], "little")
+            vectors.append(np.random.default_rng(seed).random(self.dimension))
+        return np.array(vectors, dtype="float32")
+
+
+def _chunk(path, content, start_line=1):
+    return {
+        "content": content,
+        "start_line": start_line,
+        "end_line": start_line,
+        "metadata": {"path": path, "language": "python", "sha256": ""},
+    }
+
+
+CORPUS = [
+    _chunk("auth.py", "def login(user): check password for user"),
+    _chunk("auth.py", "def logout(user): clear session", start_line=2),
+    _chunk("db.py", "connect to the database and open a session"),
+    _chunk("cache.py", "simple lru cache for user lookups"),
+    _chunk("README.md", "the server indexes code and answers questions"),
+]
+
+
+@pytest.fixture
+def settings(tmp_path):
+    """Settings pointing at a temporary index directory."""
+    return Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path)
+
+
+@pytest.fixture
+def retriever(settings):
+    """Retriever with a fake embedding model."""
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = FakeEncoder()
+    return retriever
+
+
+def test_keyword_scores_match_bm25okapi(settings):
+    """Test BM25 scores agree with rank_bm25."""
+    index = KeywordIndex(settings)
+    chunks = [dict(chunk, id=i) for i, chunk in enumerate(CORPUS)]
+    index.build_index(chunks)
+
+    reference = BM25Okapi([index.tokenizer.tokenize(chunk["content"]) for chunk in chunks])
+    expected = reference.get_scores(index.tokenizer.tokenize("user session"))
+
+    for doc, score in index.search("user session", top_k=len(chunks)):
+        assert score == pytest.approx(expected[doc["id"]])
+
+
+MORE_CORPUS = [
+    _chunk("token.py", "issue a session token for the user"),
+    _chunk("token.py", "refresh the user token before it expires", start_line=2),
+    _chunk("pool.py", "database connection pool with a session per request"),
+]
+
+PARITY_QUERIES = ["user session", "database", "token token user", "lru cache", "missing"]
+
+
+def _assert_matches_bm25okapi(index, chunks):
+    """Assert an index scores every query like BM25Okapi built on ``chunks``."""
+    reference = BM25Okapi([index.tokenizer.tokenize(chunk["content"]) for chunk in chunks])
+    for query in PARITY_QUERIES:
+        expected = reference.get_scores(index.tokenizer.tokenize(query))
+        expected_by_id = {c["id"]: s for c, s in zip(chunks, expected) if s > 0}
+        results = index.search(query, top_k=len(chunks))
+        assert {doc["id"]: score for doc, score in results} == pytest.approx(expected_by_id)
+
+
+@pytest.mark.parametrize(
+    "removed, columns", [([2], 8), ([0, 3, 6], 5)], ids=["masked", "compacted"]
+)
+def test_keyword_scores_match_bm25okapi_after_removal(settings, removed, columns):
+    """Test BM25 scores agree with rank_bm25 on what is left after removals."""
+    index = KeywordIndex(settings)
+    chunks = [dict(chunk, id=i) for i, chunk in enumerate(CORPUS + MORE_CORPUS)]
+    index.build_index(chunks)
+
+    index.remove_ids(removed)
+    # Removing more than DEAD_COMPACT_RATIO of the documents drops their columns
+    assert len(index.live) == columns
+    _assert_matches_bm25okapi(index, [c for c in chunks if c["id"] not in removed])
+
+
+def test_keyword_scores_match_bm25okapi_after_reload(settings, retriever):
+    """Test BM25 scores agree with rank_bm25 after updates and a save/load round trip."""
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    retriever.update_indices(
+        [dict(chunk) for chunk in MORE_CORPUS], removed_paths=["db.py", "cache.py"]
+    )
+    retriever.save()
+
+    loaded = HybridRetriever(settings)
+    loaded.vector_store.model = FakeEncoder()
+    assert loaded.load()
+    _assert_matches_bm25okapi(loaded.keyword_index, list(loaded.chunks.values()))
+
+
+def test_incremental_update_keeps_unchanged_files(retriever):
+    """Test a delta update replaces only the affected files' chunks."""
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+
+    retriever.update_indices(
+        [_chunk("db.py", "connect to postgres with a pool")],
+        removed_paths=["db.py", "cache.py"],
+    )
+
+    assert retriever.chunks.paths() == {"auth.py", "README.md", "db.py"}
+    assert retriever.vector_store.index.ntotal == 4
+    assert len(retriever.chunks) == 4
+    assert retriever.keyword_index.search("postgres")[0][0]["metadata"]["path"] == "db.py"
+    assert not retriever.keyword_index.search("lru")
+
+
+def test_incremental_update_matches_rebuild(settings, retriever):
+    """Test BM25 statistics after a delta equal those of a fresh build."""
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    retriever.update_indices([_chunk("new.py", "user session token")], removed_paths=["db.py"])
+
+    rebuilt = KeywordIndex(settings)
+    rebuilt.build_index(list(retriever.chunks.values()))
+
+    assert retriever.keyword_index.search("user session") == rebuilt.search("user session")
+
+
+def test_build_keeps_most_frequent_terms_under_vocab_cap(tmp_path):
+    """Test a capped build keeps the terms in the most chunks, not the first seen."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path, RAG_BM25_MAX_VOCAB=3)
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = FakeEncoder()
+    # The first chunk alone would fill the vocabulary with "def", "login" and "user"
+    retriever.build_indices([dict(chunk) for chunk in CORPUS + MORE_CORPUS])
+
+    index = retriever.keyword_index
+    assert set(index.vocab) == {"user", "session", "the"}
+    assert not index.search("login")
+
+    # Once full, the vocabulary stays fixed for incremental updates
+    retriever.update_indices([_chunk("new.py", "login and logout")], removed_paths=[])
+    assert set(index.vocab) == {"user", "session", "the"}
+    assert not index.search("login")
+
+
+def test_hnsw_removal_tombstones_and_compacts(tmp_path):
+    """Test HNSW indices hide removed chunks and compact once enough are dropped."""
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path, RAG_VECTOR_INDEX="hnsw")
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = FakeEncoder()
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    store = retriever.vector_store
+
+    store.remove_ids([0])
+    assert store.tombstones == {0}
+    results = store.search(CORPUS[0]["content"], top_k=len(CORPUS), ef_search=16)
+    assert 0 not in [doc["id"] for doc, _ in results]
+    assert len(results) == len(CORPUS) - 1
+
+    store.remove_ids([1, 2])
+    assert not store.tombstones
+    assert store.index.ntotal == 2
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw"])
+@pytest.mark.parametrize("storage", ["fp16", "sq8", "pq"])
+def test_compressed_storage_rescores_exactly(tmp_path, kind, storage):
+    """Test compressed vector storage returns exact scores and hides removed chunks."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path,
+        RAG_INDEX_DIR=tmp_path,
+        RAG_VECTOR_INDEX=kind,
+        RAG_VECTOR_STORAGE=storage,
+        RAG_PQ_M=4,
+    )
+    corpus = [_chunk(f"m{i}.py", f"def function_{i}(): return {i}") for i in range(300)]
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = FakeEncoder()
+    retriever.build_indices([dict(chunk) for chunk in corpus])
+    retriever.save()
+
+    store = HybridRetriever(settings).vector_store
+    store.model = FakeEncoder()
+    store.documents.load()
+    assert store.load()
+    assert isinstance(faiss.downcast_index(store.index.index), faiss.IndexRefine)
+
+    query = corpus[7]["content"]
+    doc, score = store.search(query, top_k=1)[0]
+    assert doc["id"] == 7 and score == pytest.approx(1.0)  # exact distance 0
+
+    store.remove_ids([7])
+    assert 7 not in [doc["id"] for doc, _ in store.search(query, top_k=5)]
+
+
+@pytest.mark.parametrize("kind", ["flat", "hnsw", "ivf_pq"])
+def test_cosine_metric_scores_and_threshold(tmp_path, kind):
+    """Test the cosine metric returns similarities and cuts off weak vector hits."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path,
+        RAG_INDEX_DIR=tmp_path,
+        RAG_VECTOR_INDEX=kind,
+        RAG_VECTOR_METRIC="cosine",
+        RAG_MIN_VECTOR_SCORE=0.99,
+        RAG_PQ_M=4,
+    )
+    corpus = [_chunk(f"m{i}.py", f"def function_{i}(): return {i}") for i in range(300)]
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = FakeEncoder()
+    retriever.build_indices([dict(chunk) for chunk in corpus])
+    retriever.save()
+    assert retriever.vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT
+
+    results = retriever.vector_store.search(corpus[3]["content"], top_k=10)
+    assert results[0][0]["id"] == 3
+    if kind != "ivf_pq":  # PQ scores are approximate
+        assert results[0][1] == pytest.approx(1.0, abs=1e-3)
+        assert len(results) == 1  # every other hit is below the threshold
+
+    # A stored index keeps its metric until it is rebuilt
+    store = HybridRetriever(settings.model_copy(update={"RAG_VECTOR_METRIC": "l2"})).vector_store
+    store.model = FakeEncoder()
+    store.documents.load()
+    assert store.load() and store.metric == "cosine"
+    assert store.search(corpus[3]["content"], top_k=1)[0][0]["id"] == 3
+
+
+class CenteredEncoder(FakeEncoder):
+    """FakeEncoder with zero-mean components, so some cosine similarities are negative."""
+
+    def encode(self, texts, **kwargs):
+        return super().encode(texts, **kwargs) - 0.5
+
+
+@pytest.mark.parametrize("floor", [None, 0.0])
+def test_min_vector_score_zero_is_a_real_floor(tmp_path, floor):
+    """Test RAG_MIN_VECTOR_SCORE=0 drops negative similarities and unset keeps them."""
+    settings = Settings(
+        RAG_DATA_DIR=tmp_path,
+        RAG_INDEX_DIR=tmp_path,
+        RAG_VECTOR_METRIC="cosine",
+        RAG_MIN_VECTOR_SCORE=floor,
+    )
+    corpus = [_chunk(f"m{i}.py", f"def function_{i}(): return {i}") for i in range(20)]
+    retriever = HybridRetriever(settings)
+    retriever.vector_store.model = CenteredEncoder()
+    retriever.build_indices([dict(chunk) for chunk in corpus])
+
+    scores = [score for _, score in retriever.vector_store.search("query", top_k=len(corpus))]
+    if floor is None:
+        assert len(scores) == len(corpus) and min(scores) < 0
+    else:
+        assert 0 < len(scores) < len(corpus) and min(scores) >= 0
+
+
+def test_code_tokenizer_splits_identifiers():
+    """Test camelCase and snake_case identifiers match natural-language queries."""
+    tokenizer = CodeTokenizer()
+
+    assert tokenizer.tokenize("user = getUserById(id)") == [
+        "user", "get", "user", "by", "id", "getuserbyid", "id"
+    ]
+    assert tokenizer.tokenize("def get_user_by_id():") == [
+        "def", "get", "user", "by", "id", "getuserbyid"
+    ]
+    assert tokenizer.tokenize("HTTPServer.parseJSON") == [
+        "http", "server", "httpserver", "parse", "json", "parsejson"
+    ]
+
+
+def test_save_load_and_update_mapped_index(settings, retriever):
+    """Test a saved index reloads from the mapped format and accepts deltas."""
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    retriever.save()
+
+    loaded = HybridRetriever(settings)
+    loaded.vector_store.model = FakeEncoder()
+    assert loaded.load()
+    assert loaded.chunks[0] == dict(CORPUS[0], id=0)
+    assert loaded.keyword_index.search("session") == retriever.keyword_index.search("session")
+
+    loaded.update_indices([_chunk("db.py", "connect to postgres")], removed_paths=["db.py"])
+    loaded.save()
+
+    reloaded = HybridRetriever(settings)
+    reloaded.vector_store.model = FakeEncoder()
+    assert reloaded.load()
+    assert reloaded.index_stats() == {"files_indexed": 4, "chunks": 5}
+    assert reloaded.chunks.ids_for_paths(["db.py"]) == [len(CORPUS)]
+    assert reloaded.keyword_index.search("postgres")[0][0]["content"] == "connect to postgres"
+
+
+def test_chunk_store_writes_new_texts_to_new_segments(settings):
+    """Test saves add blob segments, never rewrite them, and merge all but the first."""
+    store = ChunkStore(settings)
+    store.add(dict(chunk, id=i) for i, chunk in enumerate(CORPUS))
+    store.save()
+    (first,) = sorted(store.store_dir.glob("text-*.bin"))
+    first_inode = first.stat().st_ino
+
+    for n in range(1, BLOB_MAX_SEGMENTS + 1):
+        store.add([dict(_chunk("new.py", f"added text {n}"), id=len(CORPUS) + n)])
+        store.save()
+        store_dir_segments = sorted(store.store_dir.glob("text-*.bin"))
+        # The save that would exceed the limit merges the segments after the first
+        assert len(store_dir_segments) == (n + 1 if n < BLOB_MAX_SEGMENTS else 2)
+        assert first.stat().st_ino == first_inode
+
+    reloaded = ChunkStore(settings)
+    assert reloaded.load()
+    assert [chunk["content"] for chunk in reloaded.values()] == [
+        chunk["content"] for chunk in CORPUS
+    ] + [f"added text {n}" for n in range(1, BLOB_MAX_SEGMENTS + 1)]
+
+    # Dropping most texts compacts the blob into one new segment
+    reloaded.remove(range(len(CORPUS) + 1))
+    reloaded.save()
+    assert sorted(store.store_dir.glob("text-*.bin")) == [
+        store.store_dir / f"text-{BLOB_MAX_SEGMENTS + 1:06d}.bin"
+    ]
+    assert reloaded[len(CORPUS) + 2]["content"] == "added text 2"
+
+
+class CountingEncoder(FakeEncoder):
+    """FakeEncoder that counts its calls and the texts it encodes."""
+
+    def __init__(self):
+        self.calls = 0
+        self.texts = 0
+
+    def encode(self, texts, **kwargs):
+        self.calls += 1
+        self.texts += len(texts)
+        return super().encode(texts, **kwargs)
+
+
+def test_retrieve_many_matches_single_queries(retriever):
+    """Test batched retrieval returns what one retrieval per query does, in one encode."""
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    retriever.vector_store.model = encoder = CountingEncoder()
+    queries = ["login user", "database session", "login  user", "zzz unknown"]
+    batch = retriever.retrieve_many(queries, top_k=3)
+    assert encoder.calls == 1  # three distinct queries, one model batch
+
+    for query, matches in zip(queries, batch):
+        single = retriever.retrieve(query, top_k=3)
+        assert [(m.path, m.start_line) for m in matches] == [
+            (m.path, m.start_line) for m in single
+        ]
+        assert [m.score for m in matches] == pytest.approx([m.score for m in single])
+
+    keyword = retriever.keyword_index
+    for query, results in zip(queries, keyword.search_many(queries, top_k=3)):
+        single = keyword.search(query, top_k=3)
+        assert [doc["id"] for doc, _ in results] == [doc["id"] for doc, _ in single]
+
+
+def test_encode_batcher_coalesces_concurrent_queries(tmp_path):
+    """Test concurrent query encodes are coalesced into one model batch."""
+    settings = Settings(RAG_INDEX_DIR=tmp_path, RAG_EMBED_BATCH_WINDOW_MS=50)
+    store = HybridRetriever(settings, encode_batcher=EncodeBatcher(settings)).vector_store
+    store.model = encoder = CountingEncoder()
+    queries = [f"query number {i}" for i in range(4)]
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        embeddings = list(pool.map(store.encode_query, queries))
+
+    assert encoder.calls == 1
+    for query, embedding in zip(queries, embeddings):
+        assert np.allclose(embedding, FakeEncoder().encode([query]))
+    assert store.encode_batcher.stats()["max_batch_seen"] == 4
+
+
+def test_chunk_embeddings_are_reused_across_builds(tmp_path):
+    """Test unchanged chunk texts are not re-encoded by later builds."""
+    def build(name, corpus):
+        settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path / name)
+        settings.RAG_INDEX_DIR.mkdir()
+        retriever = HybridRetriever(settings)
+        retriever.vector_store.model = encoder = CountingEncoder()
+        retriever.build_indices([dict(chunk) for chunk in corpus])
+        retriever.save()
+        return retriever, encoder
+
+    first, encoder = build("first", CORPUS)
+    assert encoder.texts == len(CORPUS)
+
+    # A clean rebuild of the same texts never calls the model
+    second, encoder = build("second", CORPUS + [dict(CORPUS[0])])
+    assert encoder.texts == 0
+    vectors = second.vector_store.index.index.reconstruct_n(0, len(CORPUS))
+    assert np.allclose(vectors, FakeEncoder().encode([c["content"] for c in CORPUS]))
+
+    changed = [_chunk("auth.py", "def login(user): check token for user")] + CORPUS[1:]
+    third, encoder = build("third", changed)
+    assert encoder.texts == 1
+    # The new text was added next to the old ones
+    cached, missing = third.vector_store.embedding_cache.lookup(
+        [text_digest(chunk["content"]) for chunk in CORPUS + changed[:1]]
+    )
+    assert missing == []
+    assert np.allclose(cached, FakeEncoder().encode([c["content"] for c in CORPUS + changed[:1]]))
+
+    # A much smaller clean build drops the entries it did not use
+    _, encoder = build("fourth", CORPUS[:1])
+    assert encoder.texts == 0
+    fresh = HybridRetriever(Settings(RAG_DATA_DIR=tmp_path)).vector_store.embedding_cache
+    assert fresh.lookup([text_digest(CORPUS[0]["content"])])[1] == []
+    assert fresh.lookup([text_digest(changed[0]["content"])])[1] == [0]
+
+
+def test_query_embedding_cache(tmp_path):
+    """Test query embeddings are cached, spilled to disk and expired."""
+    settings = Settings(
+        RAG_INDEX_DIR=tmp_path / "index",
+        RAG_QUERY_CACHE_SIZE=2,
+        RAG_QUERY_CACHE_DIR=tmp_path / "cache",
+    )
+    store = HybridRetriever(settings).vector_store
+    store.model = encoder = CountingEncoder()
+
+    first = store.encode_query("open  the session")
+    # Whitespace variants share an entry; cached arrays are read-only
+    assert np.array_equal(store.encode_query("open the session "), first)
+    assert encoder.calls == 1
+    assert not first.flags.writeable
+
+    store.encode_query("login user")
+    store.encode_query("close database")  # evicts "open the session" to the spill queue
+    assert store.query_cache.stats()["evictions"] == 1
+    assert np.array_equal(store.encode_query("open the session"), first)
+    assert encoder.calls == 3
+
+    # The spill file survives a restart
+    store.query_cache.flush()
+    store.query_cache = QueryEmbeddingCache(settings)
+    store.encode_query("login user")
+    stats = store.query_cache.stats()
+    assert (stats["disk_hits"], stats["misses"]) == (1, 0)
+
+    expiring = QueryEmbeddingCache(settings.model_copy(update={"RAG_QUERY_CACHE_TTL_S": 0.01}))
+    expiring.put("m", "q", first.copy())
+    time.sleep(0.02)
+    assert expiring.get("m", "q") is None
+    assert expiring.stats()["expired"] == 1
+
+    # Evictions are written in batches; the table is trimmed once well over capacity
+    spilling = QueryEmbeddingCache(settings.model_copy(update={"RAG_QUERY_CACHE_DIR": tmp_path}))
+    for i in range(40):
+        spilling.put("m", f"query {i}", first.copy())
+    db_path = tmp_path / "query_embeddings.sqlite"
+    rows = sqlite3.connect(str(db_path)).execute("SELECT COUNT(*) FROM embeddings").fetchone()
+    assert rows[0] == 2 * DISK_CAPACITY_FACTOR
+    assert spilling.get("m", "query 37") is not None  # queued, not written yet
+    assert spilling.stats()["disk_hits"] == 1
+
+
+def test_retrieval_cache_bounds_and_generation_keys(tmp_path):
+    """Test retrieval results are evicted by count and size and keyed by generation."""
+    matches = [Match(score=1.0, path="a.py", start_line=1, end_line=2, snippet="x" * 1000)]
+    cache = RetrievalCache(Settings(RAG_RESULT_CACHE_SIZE=2))
+    cache.put("a", matches)
+    entry_bytes = cache.stats()["bytes"]
+    cache.put("b", matches)
+    assert cache.get("a") == matches  # "b" is now least recently used
+    cache.put("c", matches)
+    assert cache.get("b") is None
+    stats = cache.stats()
+    assert (stats["size"], stats["evictions"], stats["bytes"]) == (2, 1, 2 * entry_bytes)
+
+    # Two and a half entries' worth of bytes hold two; a bigger result is not cached
+    small = RetrievalCache(Settings(RAG_RESULT_CACHE_MAX_MB=2.5 * entry_bytes / (1024 * 1024)))
+    for key in "abc":
+        small.put(key, matches)
+    assert [small.get(key) is not None for key in "abc"] == [False, True, True]
+    small.put("big", matches * 3)
+    assert small.get("big") is None and small.stats()["size"] == 2
+
+    # Results are keyed by generation: a new one never sees the old results
+    settings = Settings(RAG_DATA_DIR=tmp_path, RAG_INDEX_DIR=tmp_path)
+    retriever = HybridRetriever(settings, result_cache=RetrievalCache(settings))
+    retriever.vector_store.model = FakeEncoder()
+    retriever.build_indices([dict(chunk) for chunk in CORPUS])
+    retriever.generation = "gen-000001"
+    first = retriever.retrieve("user session", top_k=3)
+    assert retriever.retrieve("user session", top_k=3) == first
+    retriever.generation = "gen-000002"
+    retriever.retrieve("user session", top_k=3)
+    stats = retriever.result_cache.stats()
+    assert (stats["hits"], stats["misses"], stats["size"]) == (1, 2, 2)
+    retriever.result_cache.clear()
+    assert retriever.result_cache.stats()["size"] == 0
+
+
+def test_embedding_backends_are_cached_separately(tmp_path):
+    """Test each embedding backend gets its own model id and chunk cache."""
+    torch_settings = Settings(RAG_DATA_DIR=tmp_path)
+    int8_settings = Settings(
+        RAG_DATA_DIR=tmp_path, RAG_EMBEDDING_BACKEND="onnx_int8", RAG_ONNX_QUANTIZATION="avx2"
+    )
+    assert embedding_model_id(torch_settings) == torch_settings.RAG_EMBEDDING_MODEL
+    assert embedding_model_id(int8_settings).endswith("#onnx_int8-avx2")
+    assert (
+        ChunkEmbeddingCache(torch_settings).cache_dir
+        != ChunkEmbeddingCache(int8_settings).cache_dir
+    )
+
+    texts = [chunk["content"] for chunk in CORPUS]
+    assert embedding_parity(FakeEncoder(), FakeEncoder(), texts)["min_cosine"] == pytest.approx(1)
+
+
+class FakeCrossEncoder:
+    """Scores a pair by how many query words the text contains."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.pairs = []
+
+    def predict(self, pairs, batch_size=32, **kwargs):
+        time.sleep(self.delay)
+        self.pairs.extend(pairs)
+        return np.array([sum(w in text for w in query.split()) for query, text in pairs])
+
+
+def test_reranker_reorders_caches_scores_and_falls_back_past_budget():
+    """Test cross-encoder reranking, its score cache and the RRF fallback."""
+    texts = ["unrelated text", "session cache", "open a user session", "user"]
+    matches = [
+        Match(score=1.0 / (61 + i), path=f"f{i}.py", start_line=1, end_line=1, snippet=text)
+        for i, text in enumerate(texts)
+    ]
+    model = FakeCrossEncoder()
+    reranker = Reranker(Settings(RAG_RERANK_BATCH_SIZE=2), model=model)
+
+    reranked, stats = reranker.rerank("user session", matches, top_k=2)
+    assert [m.path for m in reranked] == ["f2.py", "f1.py"]
+    assert reranked[0].score == 2 and reranked[0].metadata["rrf_score"] == matches[2].score
+    assert (stats["reranked"], stats["scored"], stats["cached"]) == (True, 4, 0)
+
+    # Scores are cached by query and chunk text
+    reranked, stats = reranker.rerank(" user  session", matches[1:], top_k=2)
+    assert (stats["scored"], stats["cached"]) == (0, 3)
+    assert len(model.pairs) == 4
+
+    # Once the next batch would not fit the budget, the RRF order is kept
+    slow = Reranker(
+        Settings(RAG_RERANK_BATCH_SIZE=2, RAG_RERANK_BUDGET_MS=30), model=FakeCrossEncoder(0.05)
+    )
+    reranked, stats = slow.rerank("user session", matches, top_k=2)
+    assert reranked == matches[:2]
+    assert (stats["reranked"], stats["scored"]) == (False, 2)
+    # Timed batches tell that not even the first one fits: nothing is scored
+    reranked, stats = slow.rerank("open session", matches, top_k=2)
+    assert reranked == matches[:2]
+    assert (stats["reranked"], stats["scored"]) == (False, 0)
+    assert slow.stats()["fallbacks"] == 2
+
+    # Warming up times a batch, so even the first query is checked
+    warmed = Reranker(
+        Settings(RAG_RERANK_BATCH_SIZE=2, RAG_RERANK_BUDGET_MS=30), model=FakeCrossEncoder(0.05)
+    )
+    warmed.warm_up()
+    assert warmed.rerank("user session", matches, top_k=2)[1]["scored"] == 0